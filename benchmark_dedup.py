@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for element dedup
+Compares the old linear add_unique_element scan with the grid-backed
+UniqueElementSet on synthetic 1k/5k-box pages and checks both keep exactly
+the same elements.
+
+Usage: python benchmark_dedup.py [--seed N] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+
+from spatial_dedup import UniqueElementSet, add_unique_element_linear
+
+
+def synthetic_page(count, seed, page_width=1920, page_height=None):
+    """
+    Boxes shaped like a real dashboard: mostly buttons/links/inputs, some
+    nested wrappers around them, and a few oversized containers
+    """
+    rng = random.Random(seed)
+    if page_height is None:
+        # Keep density roughly constant as the page grows
+        page_height = max(1080, count * 6)
+    boxes = []
+    while len(boxes) < count:
+        kind = rng.random()
+        if kind < 0.7:
+            width, height = rng.uniform(20, 300), rng.uniform(10, 60)
+        elif kind < 0.95:
+            width, height = rng.uniform(100, 700), rng.uniform(40, 350)
+        else:
+            width, height = rng.uniform(800, 1900), rng.uniform(300, 1000)
+        x = rng.uniform(0, page_width - min(width, page_width - 1))
+        y = rng.uniform(0, page_height)
+        box = {'label': f"Element {len(boxes)}", 'x': x, 'y': y, 'width': width, 'height': height}
+        boxes.append(box)
+        # Nested duplicates, as the keyword passes return wrappers and children
+        if rng.random() < 0.3 and len(boxes) < count:
+            pad = rng.uniform(0, 6)
+            boxes.append({'label': f"Wrapper {len(boxes)}", 'x': x - pad, 'y': y - pad,
+                          'width': width + 2 * pad, 'height': height + 2 * pad})
+    return boxes
+
+
+def run_linear(boxes):
+    found = []
+    for box in boxes:
+        add_unique_element_linear(found, box)
+    return found
+
+
+def run_grid(boxes):
+    unique = UniqueElementSet()
+    for box in boxes:
+        unique.add(box)
+    return unique.elements
+
+
+def best_of(func, boxes, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(boxes)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark element dedup strategies")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000])
+    args = parser.parse_args()
+
+    print(f"{'boxes':>6} {'kept':>6} {'linear ms':>10} {'grid ms':>9} {'speedup':>8}")
+    for count in args.sizes:
+        boxes = synthetic_page(count, args.seed)
+        linear_time, linear_found = best_of(run_linear, boxes, args.repeat)
+        grid_time, grid_found = best_of(run_grid, boxes, args.repeat)
+        if [b['label'] for b in linear_found] != [b['label'] for b in grid_found]:
+            raise SystemExit(f"Mismatch at {count} boxes: grid kept a different element set")
+        print(f"{count:>6} {len(grid_found):>6} {linear_time * 1000:>10.2f} "
+              f"{grid_time * 1000:>9.2f} {linear_time / grid_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Per-pass detection benchmark over saved HTML snapshots
+Loads each page of the snapshot corpus (detection_snapshots/: a small login
+page, a typical dashboard and a 5k-node stress page) in headless Chrome and
+runs every detection pass of scan_geico_site on its own: the collector
+restricted to that pass, then its Python filter into a fresh
+UniqueElementSet. The passes map onto the old scan loop as
+
+    inputs, buttons, links, selects, textareas   tag passes
+    patterns, keywords                           keyword XPaths
+    roles                                        role/onclick/tabindex elements
+    products                                     "products to quote" walk
+    productKeywords, exactPhrases, general       aggressive product search
+
+For each pass it reports the wall time (collector round trip and Python
+filter), the WebDriver calls it made, and how many candidates it collected
+and kept. The full detection (all passes in one collector call, as the
+pipeline runs it) is reported as 'all' for comparison.
+
+Usage: python benchmark_detection.py [--corpus detection_snapshots] [--repeat 5]
+                                     [--json detection.json] [snapshot.html ...]
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from element_detector import DETECTION_PASSES, collect_candidates, detect_elements
+from scan_metrics import ScanMetrics, instrument_driver
+from spatial_dedup import UniqueElementSet
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'detection_snapshots')
+
+
+def launch_driver():
+    # Imported here so --help works without selenium installed
+    from selenium import webdriver
+    from browser_pool import chrome_options
+    return webdriver.Chrome(options=chrome_options(0))
+
+
+def calls(metrics):
+    return sum(metrics.summary()['webdriver_calls'].values())
+
+
+def run_pass(driver, metrics, name, filter_pass):
+    """One isolated pass: (collect seconds, filter seconds, calls, candidates, kept)"""
+    metrics.reset()
+    started = time.perf_counter()
+    batch = collect_candidates(driver, [name])
+    collected = time.perf_counter()
+    unique = UniqueElementSet()
+    filter_pass(batch, unique.add)
+    finished = time.perf_counter()
+    candidates = len(batch['passes'].get(name, []))
+    return collected - started, finished - collected, calls(metrics), candidates, len(unique.elements)
+
+
+def run_all(driver, metrics):
+    """The full detection as the pipeline runs it"""
+    metrics.reset()
+    unique = UniqueElementSet()
+    filter_times = {}
+    started = time.perf_counter()
+    nodes = detect_elements(driver, unique.add,
+                            lambda stage, seconds: filter_times.__setitem__(stage, seconds))
+    total = time.perf_counter() - started
+    collect = filter_times.get('detect_collect', 0.0)
+    return collect, total - collect, calls(metrics), nodes, len(unique.elements)
+
+
+def summarize(samples):
+    """Median/best milliseconds over the repeats of one pass"""
+    collect = [s[0] * 1000 for s in samples]
+    filters = [s[1] * 1000 for s in samples]
+    wall = [c + f for c, f in zip(collect, filters)]
+    return {
+        'wall_ms': round(statistics.median(wall), 2),
+        'best_ms': round(min(wall), 2),
+        'collect_ms': round(statistics.median(collect), 2),
+        'filter_ms': round(statistics.median(filters), 3),
+        'webdriver_calls': samples[-1][2],
+        'candidates': samples[-1][3],
+        'kept': samples[-1][4],
+    }
+
+
+def benchmark_snapshot(driver, metrics, path, repeat):
+    driver.get(Path(path).resolve().as_uri())
+    page_nodes = driver.execute_script("return document.getElementsByTagName('*').length")
+    # One untimed round so the collector script and page layout are warm
+    run_all(driver, metrics)
+
+    passes = {}
+    for name, filter_pass in DETECTION_PASSES:
+        passes[name] = summarize([run_pass(driver, metrics, name, filter_pass) for _ in range(repeat)])
+    passes['all'] = summarize([run_all(driver, metrics) for _ in range(repeat)])
+    isolated = {name: result for name, result in passes.items() if name != 'all'}
+    dominant = max(isolated, key=lambda name: isolated[name]['wall_ms'])
+    return {'snapshot': os.path.basename(path), 'page_nodes': page_nodes,
+            'passes': passes, 'dominant_pass': dominant}
+
+
+def print_table(result):
+    print(f"\n{result['snapshot']} ({result['page_nodes']} nodes), dominant pass: {result['dominant_pass']}")
+    print(f"{'pass':<16}{'wall ms':>10}{'best ms':>10}{'collect':>10}{'filter':>10}"
+          f"{'calls':>8}{'found':>8}{'kept':>8}")
+    for name, p in result['passes'].items():
+        print(f"{name:<16}{p['wall_ms']:>10.2f}{p['best_ms']:>10.2f}{p['collect_ms']:>10.2f}"
+              f"{p['filter_ms']:>10.3f}{p['webdriver_calls']:>8}{p['candidates']:>8}{p['kept']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pass element detection benchmark on saved snapshots")
+    parser.add_argument('snapshots', nargs='*', help="HTML files (default: every page in --corpus)")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per pass")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    snapshots = args.snapshots or sorted(glob.glob(os.path.join(args.corpus, '*.html')))
+    if not snapshots:
+        print(f"No snapshots found in {args.corpus}")
+        return 1
+
+    metrics = ScanMetrics()
+    driver = instrument_driver(launch_driver(), metrics)
+    results = []
+    try:
+        browser = driver.capabilities.get('browserVersion', 'unknown')
+        print(f"Chrome {browser}, {args.repeat} runs per pass")
+        for path in snapshots:
+            result = benchmark_snapshot(driver, metrics, path, args.repeat)
+            results.append(result)
+            print_table(result)
+    finally:
+        driver.quit()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'browser': browser, 'repeat': args.repeat, 'snapshots': results}, f, indent=2)
+        print(f"\nWrote {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
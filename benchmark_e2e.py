@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of scan_geico_site against the offline fixture site
+Starts fixture_site.FixtureSite, points the HTTPS scanner at it through
+SCANNER_START_URL and runs full quotes (gateway -> login -> dashboard ->
+Commercial Auto -> zip -> USDOT -> result) in a real Chrome. Per run it
+reports:
+
+- quote time: start of the scan until the quote flow reaches 'result'
+- time spent in each quote-flow state
+- capture frames/s and detection passes/s (pipeline stage rates)
+- detection time per pass (p50/p95) and WebDriver calls
+
+Needs Chrome/chromedriver and the scanner's requirements; no request
+leaves the machine.
+
+Usage: python benchmark_e2e.py [--runs 3] [--latency 0.1] [--api-latency 0.3]
+                               [--dom-size 2000] [--timeout 180] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from fixture_site import FixtureSite
+
+
+def wait_for_result(session, timeout):
+    """Seconds until the quote flow reached 'result', or None on timeout/exit"""
+    # Imported here, once main() has set up the scanner's environment
+    from quote_flow import RESULT
+    started = time.time()
+    while time.time() - started < timeout:
+        flow = session.flow
+        if flow is not None and flow.state == RESULT:
+            return time.time() - started
+        if session.thread is not None and not session.running:
+            return None
+        time.sleep(0.1)
+    return None
+
+
+def run_quote(scanner, run, timeout):
+    scanner.scan_metrics.reset()
+    session_id = f'bench-{run}'
+    started = time.time()
+    session, _ = scanner.session_pool.start(session_id, scanner.scan_geico_site)
+    quote_s = wait_for_result(session, timeout)
+    elapsed = time.time() - started
+
+    pipeline = session.pipeline.summary() if session.pipeline is not None else {'stages': {}, 'uptime_s': 0}
+    stages = pipeline['stages']
+    uptime = pipeline['uptime_s'] or elapsed
+    latency = scanner.scan_metrics.summary()
+    result = {
+        'run': run,
+        'completed': quote_s is not None,
+        'quote_s': round(quote_s, 2) if quote_s is not None else None,
+        'states_s': session.flow.summary()['states_s'] if session.flow is not None else {},
+        'capture_fps': round(stages.get('capture', {}).get('iterations', 0) / uptime, 1),
+        'detections_per_s': round(stages.get('detection', {}).get('detections', 0) / uptime, 2),
+        'dropped_frames': stages.get('capture', {}).get('dropped', 0),
+        'detection_ms': latency['stages_ms'].get('detection', {}),
+        'detect_collect_ms': latency['stages_ms'].get('detect_collect', {}),
+        'capture_ms': latency['stages_ms'].get('capture', {}),
+        'webdriver_calls': sum(latency['webdriver_calls'].values()),
+        'waits': session.waits.summary()['waiting_s'],
+        'status': session.status,
+    }
+    scanner.session_pool.stop(session_id, wait=30)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end scanner benchmark on the fixture site")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds before each page response")
+    parser.add_argument('--asset-latency', type=float, default=0.05)
+    parser.add_argument('--api-latency', type=float, default=0.3, help="seconds before each fetch() response")
+    parser.add_argument('--dom-size', type=int, default=2000, help="filler nodes per page")
+    parser.add_argument('--timeout', type=float, default=180.0, help="seconds allowed per quote")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    site = FixtureSite(latency=args.latency, asset_latency=args.asset_latency,
+                       api_latency=args.api_latency, dom_size=args.dom_size).start()
+    # The scanner reads its configuration at import time
+    os.environ['SCANNER_START_URL'] = site.url
+    os.environ.setdefault('SCANNER_PROFILE_WARM_URLS', site.url)
+    os.environ.setdefault('SCANNER_LOG_CONSOLE', '0')
+    import geico_scanner_https_enhanced as scanner
+
+    print(f"Fixture site {site.url}: latency {args.latency}s, api latency {args.api_latency}s, "
+          f"dom size {args.dom_size}")
+    results = []
+    try:
+        for run in range(1, args.runs + 1):
+            result = run_quote(scanner, run, args.timeout)
+            results.append(result)
+            detection = result['detection_ms']
+            print(f"run {run}: quote {result['quote_s']}s  capture {result['capture_fps']} fps  "
+                  f"detections {result['detections_per_s']}/s  detection p50 {detection.get('p50')}ms "
+                  f"p95 {detection.get('p95')}ms  waiting {result['waits']}s  "
+                  f"webdriver calls {result['webdriver_calls']}")
+            print(f"       states: {result['states_s']}")
+    finally:
+        scanner.browser_pool.shutdown()
+        site.stop()
+
+    completed = [r['quote_s'] for r in results if r['completed']]
+    summary = {
+        'fixture': {'latency': args.latency, 'asset_latency': args.asset_latency,
+                    'api_latency': args.api_latency, 'dom_size': args.dom_size},
+        'runs': results,
+        'completed': len(completed),
+        'mean_quote_s': round(sum(completed) / len(completed), 2) if completed else None,
+        'mean_capture_fps': round(sum(r['capture_fps'] for r in results) / len(results), 1) if results else None,
+        'page_hits': site.hits,
+    }
+    print(f"{len(completed)}/{len(results)} quotes completed, mean quote time {summary['mean_quote_s']}s, "
+          f"mean capture {summary['mean_capture_fps']} fps")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Wrote {args.json}")
+    return 0 if len(completed) == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
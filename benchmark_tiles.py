@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Bandwidth benchmark for the tile stream
+Renders a synthetic steady page (a dashboard full of text-like detail with
+a blinking caret and a ticking clock), runs every frame through the
+FrameEncoder and FrameBroadcaster as the pipeline does, and compares the
+bytes of sending each frame whole with the bytes tile_events() sends a
+client that holds the previous frame. Needs Pillow.
+
+Usage: python benchmark_tiles.py [--frames 60] [--size 1920x1080] [--view 1280x720]
+                                 [--tile 64] [--format png]
+"""
+
+import argparse
+import base64
+import io
+import random
+import time
+
+from PIL import Image, ImageDraw
+
+from frame_capture import MIME_TYPES, PIL_FORMATS, frame_hash
+from frame_encoding import FrameEncoder, ViewerSizes
+from frame_stream import FrameBroadcaster, tile_events
+
+
+def dimensions(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def steady_page(size, seed):
+    """Static background: header bar, a form panel and rows of 'text'"""
+    rng = random.Random(seed)
+    width, height = size
+    page = Image.new('RGB', size, (244, 246, 250))
+    draw = ImageDraw.Draw(page)
+    draw.rectangle((0, 0, width, 70), fill=(21, 76, 145))
+    draw.rectangle((width // 8, 120, width * 7 // 8, height - 80), fill=(255, 255, 255), outline=(200, 205, 215))
+    for y in range(150, height - 110, 22):
+        x = width // 8 + 30
+        while x < width * 7 // 8 - 60:
+            word = rng.randint(12, 70)
+            shade = rng.randint(40, 120)
+            draw.rectangle((x, y, x + word, y + 9), fill=(shade, shade, shade + 20))
+            x += word + rng.randint(6, 14)
+    draw.rectangle((width // 8 + 30, height - 160, width // 8 + 330, height - 120), outline=(120, 130, 150))
+    return page
+
+
+def render_frame(page, index, image_format, quality):
+    """The page with the caret on every other frame and the clock ticking"""
+    frame = page.copy()
+    draw = ImageDraw.Draw(frame)
+    width, height = frame.size
+    if index % 2 == 0:
+        draw.rectangle((width // 8 + 40, height - 154, width // 8 + 42, height - 126), fill=(0, 0, 0))
+    draw.text((width - 120, 28), time.strftime('%H:%M:', time.gmtime(0)) + f"{index % 60:02d}", fill=(255, 255, 255))
+    buffered = io.BytesIO()
+    frame.save(buffered, format=PIL_FORMATS.get(image_format, 'PNG'), quality=quality)
+    data = base64.b64encode(buffered.getvalue()).decode()
+    return {'base64': data, 'hash': frame_hash(data), 'format': image_format,
+            'mime': MIME_TYPES[image_format], 'size': len(buffered.getvalue()), 'timings': {}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare whole-frame and changed-tile live view bandwidth")
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--size', type=dimensions, default=(1920, 1080), help="capture size, WxH")
+    parser.add_argument('--view', type=dimensions, help="viewer size, WxH (default: capture size)")
+    parser.add_argument('--tile', type=int, default=64)
+    parser.add_argument('--format', choices=sorted(MIME_TYPES), default='png')
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    sizes = ViewerSizes()
+    if args.view:
+        sizes.report('benchmark', *args.view, streaming=True)
+    encoder = FrameEncoder(sizes, roi=False, tile=args.tile, quality=args.quality)
+    broadcaster = FrameBroadcaster()
+    events = tile_events(broadcaster, keepalive=0.05)
+    page = steady_page(args.size, args.seed)
+
+    full_bytes = tile_bytes = tiles_sent = full_events = 0
+    encode_time = 0.0
+    with sizes.tile_stream():
+        for index in range(args.frames):
+            frame = render_frame(page, index, args.format, args.quality)
+            started = time.perf_counter()
+            frame = encoder.encode(frame)
+            encode_time += time.perf_counter() - started
+            broadcaster.publish_frame(frame)
+            event = next(events)
+            full_bytes += len(frame['base64'])
+            tile_bytes += len(event)
+            tiles_sent += event.count('"base64"')
+            full_events += '"full": true' in event
+
+    steady = args.frames - full_events
+    print(f"{args.frames} frames of {frame['width']}x{frame['height']} {args.format}, {args.tile}px tiles")
+    print(f"{'stream':<14}{'KB sent':>10}{'KB/frame':>10}{'tiles/frame':>13}")
+    print(f"{'whole frames':<14}{full_bytes / 1024:>10.1f}{full_bytes / 1024 / args.frames:>10.2f}{'':>13}")
+    print(f"{'tile deltas':<14}{tile_bytes / 1024:>10.1f}{tile_bytes / 1024 / args.frames:>10.2f}"
+          f"{(tiles_sent - full_events) / max(1, steady):>13.1f}")
+    print(f"\n{full_bytes / tile_bytes:.1f}x less sent ({full_events} full frame(s)), "
+          f"{encode_time * 1000 / args.frames:.1f} ms encode+hash per frame")
+
+
+if __name__ == '__main__':
+    main()
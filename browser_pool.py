@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Warm Chrome pool for the Geico scanner
+Launching Chrome, creating its profile and starting chromedriver takes
+several seconds, and scan_geico_site used to pay that on every start. The pool
+keeps SCANNER_WARM_BROWSERS idle browsers already launched, sized and carrying
+the navigator.webdriver stealth script, so a new scan takes one immediately
+and a background thread launches the replacement.
+
+Browsers are never handed out twice: a finished scan quits its browser (it
+holds that quote's cookies and login), reaps the process tree it launched and
+removes the profile. Each profile starts as a clone of the warmed template in
+profile_cache.py, so GEICO's static assets come from Chrome's disk cache.
+"""
+
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from process_cleanup import (driver_process_tree, terminate, sweep_orphans,
+                             remove_stale_profiles, OrphanSweeper)
+from profile_cache import ProfileTemplate
+from scanner_logging import get_logger
+from session_registry import allocate_port, release_port, DEBUG_PORT_BASE, DEBUG_PORT_COUNT
+
+log = get_logger('browser_pool')
+
+WARM_BROWSERS = int(os.environ.get('SCANNER_WARM_BROWSERS', '1'))
+# Idle browsers older than this are recycled rather than handed out
+WARM_MAX_IDLE = float(os.environ.get('SCANNER_WARM_MAX_IDLE', '600'))
+
+WINDOW_SIZE = (1920, 1080)
+
+# Hides navigator.webdriver on every document the browser loads
+STEALTH_SCRIPT = '''
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+'''
+
+
+def chrome_options(debug_port, profile_dir=None):
+    """Chrome options the scanner runs with (headless, own profile and DevTools port)"""
+    options = Options()
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument(f'--window-size={WINDOW_SIZE[0]},{WINDOW_SIZE[1]}')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    # Re-enable headless for server environment
+    options.add_argument('--headless=new')
+    # Add more arguments to fix Chrome startup issues
+    options.add_argument('--disable-setuid-sandbox')
+    options.add_argument(f'--remote-debugging-port={debug_port}')
+    options.add_argument('--disable-extensions')
+    if profile_dir:
+        options.add_argument(f'--user-data-dir={profile_dir}')
+    # Add more options to prevent conflicts
+    options.add_argument('--disable-gpu')
+    options.add_argument('--disable-software-rasterizer')
+    options.add_argument('--disable-features=VizDisplayCompositor')
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    return options
+
+
+class WarmBrowser:
+    """One launched Chrome with its profile dir and DevTools port"""
+
+    def __init__(self, driver, profile_dir, debug_port):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.debug_port = debug_port
+        self.launched = time.time()
+        self.launch_seconds = 0.0
+        # chromedriver and the Chrome processes it started, reaped on close
+        self.processes = driver_process_tree(driver)
+
+    def is_healthy(self):
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        # Renderers started since launch belong to the tree too
+        self.processes.update(driver_process_tree(self.driver))
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        leftover = terminate(self.processes)
+        if leftover:
+            log.debug("Reaped %s processes left after quit on port %s", len(leftover), self.debug_port)
+        if self.profile_dir and os.path.exists(self.profile_dir):
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class WarmBrowserPool:
+    """
+    Idle pre-launched browsers plus a background filler thread. acquire()
+    returns a warm browser when one is ready and falls back to launching
+    one on the spot; either way the pool refills in the background.
+    """
+
+    def __init__(self, size=WARM_BROWSERS, max_idle=WARM_MAX_IDLE, debug_port_base=DEBUG_PORT_BASE):
+        self.size = size
+        self.max_idle = max_idle
+        self.debug_port_base = debug_port_base
+        self.lock = threading.Lock()
+        self.idle = deque()
+        self.ports = set()  # DevTools ports of every browser this pool launched and hasn't closed
+        self.profiles = set()  # Their profile dirs, so the orphan sweeper leaves them alone
+        self.sweeper = OrphanSweeper(self.active_profiles)
+        self.template = ProfileTemplate()
+        self.launching = 0
+        self.wake = threading.Event()
+        self.thread = None
+        self.running = False
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Clear leftovers from earlier runs and start warming browsers"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        # Reap scanner browsers leaked by earlier runs, then keep sweeping
+        sweep_orphans(self.active_profiles())
+        remove_stale_profiles(self.active_profiles())
+        self.sweeper.start()
+        self.thread = threading.Thread(target=self._fill, name='warm-browser-pool', daemon=True)
+        self.thread.start()
+        self.wake.set()
+
+    def _allocate_port(self):
+        # Reserved across processes too, so two scanner servers never share a port
+        port = allocate_port(self.debug_port_base, DEBUG_PORT_COUNT)
+        with self.lock:
+            self.ports.add(port)
+        return port
+
+    def active_profiles(self):
+        with self.lock:
+            return set(self.profiles)
+
+    def launch(self):
+        """Launch one browser with the stealth script installed"""
+        started = time.time()
+        port = self._allocate_port()
+        profile_dir = None
+        try:
+            profile_dir = self.template.clone()
+            with self.lock:
+                self.profiles.add(profile_dir)
+        except Exception as e:
+            log.warning("Could not create temp directory, running without user-data-dir: %s", e)
+        driver = None
+        try:
+            driver = webdriver.Chrome(options=chrome_options(port, profile_dir))
+            driver.set_window_size(*WINDOW_SIZE)
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_SCRIPT})
+        except Exception:
+            if driver is not None:
+                WarmBrowser(driver, profile_dir, port).close()
+            elif profile_dir:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+            self._release(port, profile_dir)
+            raise
+        browser = WarmBrowser(driver, profile_dir, port)
+        browser.launch_seconds = time.time() - started
+        log.info("Launched Chrome on DevTools port %s in %.2fs", port, browser.launch_seconds)
+        return browser
+
+    def _refresh_template(self):
+        """Warm a new profile template when the current one is missing or old"""
+        if not self.template.enabled or self.template.is_fresh():
+            return
+        port = self._allocate_port()
+        try:
+            self.template.refresh(lambda profile_dir: webdriver.Chrome(options=chrome_options(port, profile_dir)))
+        finally:
+            self._release(port, None)
+
+    def _fill(self):
+        while self.running:
+            self.wake.wait(timeout=30)
+            self.wake.clear()
+            self._refresh_template()
+            self._recycle_stale()
+            while self.running:
+                with self.lock:
+                    if len(self.idle) + self.launching >= self.size:
+                        break
+                    self.launching += 1
+                try:
+                    browser = self.launch()
+                except Exception as e:
+                    log.error("Could not warm a browser: %s", e)
+                    with self.lock:
+                        self.launching -= 1
+                    time.sleep(5)
+                    break
+                with self.lock:
+                    self.launching -= 1
+                    if self.running:
+                        self.idle.append(browser)
+                        browser = None
+                if browser is not None:
+                    self.close(browser)
+
+    def _recycle_stale(self):
+        cutoff = time.time() - self.max_idle
+        with self.lock:
+            stale = [b for b in self.idle if b.launched < cutoff]
+            for browser in stale:
+                self.idle.remove(browser)
+        for browser in stale:
+            log.info("Recycling idle browser on port %s", browser.debug_port)
+            self.close(browser)
+
+    def acquire(self):
+        """A ready browser for a new scan; the caller owns it from here on"""
+        if not self.running:
+            self.start()
+        browser = None
+        while True:
+            with self.lock:
+                candidate = self.idle.popleft() if self.idle else None
+            if candidate is None:
+                break
+            if candidate.is_healthy():
+                browser = candidate
+                break
+            log.warning("Discarding dead warm browser on port %s", candidate.debug_port)
+            self.close(candidate)
+
+        if browser is not None:
+            self.hits += 1
+            log.info("Using warm browser on port %s (idle %.1fs)",
+                     browser.debug_port, time.time() - browser.launched)
+        else:
+            self.misses += 1
+            log.info("No warm browser ready, launching one now")
+            browser = self.launch()
+        self.wake.set()
+        return browser
+
+    def _release(self, port, profile_dir):
+        release_port(port)
+        with self.lock:
+            self.ports.discard(port)
+            self.profiles.discard(profile_dir)
+
+    def close(self, browser):
+        """Quit a browser from this pool, reap its processes and free its port"""
+        browser.close()
+        self._release(browser.debug_port, browser.profile_dir)
+
+    def shutdown(self):
+        self.running = False
+        self.wake.set()
+        self.sweeper.stop()
+        with self.lock:
+            idle = list(self.idle)
+            self.idle.clear()
+        for browser in idle:
+            self.close(browser)
+
+    def summary(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'launching': self.launching,
+                'hits': self.hits,
+                'misses': self.misses,
+                'profile_template': self.template.summary(),
+            }
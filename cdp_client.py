@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Asyncio DevTools Protocol client for the Geico scanner hot loop
+Selenium sends one HTTP request to chromedriver per command and waits for the
+answer on the calling thread, so each session has at most one command in
+flight. This client talks to Chrome's DevTools websocket directly from a
+single asyncio event loop shared by every session in the process: commands
+are pipelined (many outstanding per connection, matched back by id) and page
+events such as Page.loadEventFired and DOM.documentUpdated are delivered to
+subscribers instead of being polled for. CDPDriver keeps the page's
+navigation state from those events, so the quote flow's waits (waits.py) can
+tell a navigation committed or a page is still loading without a round trip.
+
+CDPDriver wraps one connection in the few WebDriver methods the hot loop
+uses (execute_script, execute_cdp_cmd, get_screenshot_as_base64/png), so
+capture_frame, DomChangeWatcher and detect_elements run over it unchanged.
+Everything else, and every session when the `websockets` package is missing
+or the connection fails, keeps using Selenium.
+
+Configure with SCANNER_DRIVER_BACKEND: 'cdp' (default, falls back to
+Selenium) or 'selenium'.
+"""
+
+import asyncio
+import base64
+import itertools
+import json
+import os
+import threading
+import time
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from cdp_screencast import find_page_websocket_url
+from scanner_logging import get_logger
+
+log = get_logger('cdp')
+
+DRIVER_BACKEND = os.environ.get('SCANNER_DRIVER_BACKEND', 'cdp').lower()
+
+COMMAND_TIMEOUT = 30.0
+
+
+class CDPError(Exception):
+    """A DevTools command returned an error, or a script threw"""
+
+
+class CDPEngine:
+    """
+    One asyncio event loop on a daemon thread, shared by every CDP
+    connection in the process. Scan threads hand it coroutines through
+    run(); nothing on the loop blocks, so dozens of sessions share it.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.loop is not None:
+                return self.loop
+            ready = threading.Event()
+
+            def run():
+                self.loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self.loop)
+                ready.set()
+                self.loop.run_forever()
+
+            self.thread = threading.Thread(target=run, name='cdp-engine', daemon=True)
+            self.thread.start()
+            ready.wait()
+            return self.loop
+
+    def submit(self, coro):
+        """Schedule a coroutine on the engine loop; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    def run(self, coro, timeout=COMMAND_TIMEOUT):
+        """Run a coroutine on the engine loop and wait for its result"""
+        return self.submit(coro).result(timeout)
+
+
+engine = CDPEngine()
+
+
+class CDPConnection:
+    """
+    One DevTools websocket. call() may be awaited concurrently; responses
+    are matched to their command ids by the reader task.
+    """
+
+    def __init__(self, ws, url):
+        self.ws = ws
+        self.url = url
+        self.ids = itertools.count(1)
+        self.pending = {}  # command id -> Future
+        self.listeners = {}  # event name -> [callback(params)]
+        self.reader = None
+        self.closed = False
+
+    @classmethod
+    async def open(cls, url):
+        # Chrome rejects clients that send an Origin header unless
+        # --remote-allow-origins is set; websockets sends none by default
+        ws = await websockets.connect(url, max_size=None, ping_interval=None)
+        connection = cls(ws, url)
+        connection.reader = asyncio.ensure_future(connection._read())
+        return connection
+
+    async def _read(self):
+        try:
+            async for message in self.ws:
+                payload = json.loads(message)
+                if 'id' in payload:
+                    future = self.pending.pop(payload['id'], None)
+                    if future is None or future.done():
+                        continue
+                    if 'error' in payload:
+                        error = payload['error']
+                        future.set_exception(CDPError(f"{error.get('message')} ({error.get('code')})"))
+                    else:
+                        future.set_result(payload.get('result', {}))
+                elif 'method' in payload:
+                    for callback in list(self.listeners.get(payload['method'], ())):
+                        try:
+                            callback(payload.get('params', {}))
+                        except Exception as e:
+                            log.warning("Listener for %s failed: %s", payload['method'], e)
+        except Exception as e:
+            if not self.closed:
+                log.warning("Connection to %s lost: %s", self.url, e)
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CDPError('DevTools connection closed'))
+            self.pending.clear()
+
+    async def call(self, method, params=None, timeout=COMMAND_TIMEOUT):
+        if self.closed:
+            raise CDPError('DevTools connection closed')
+        command_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[command_id] = future
+        await self.ws.send(json.dumps({'id': command_id, 'method': method, 'params': params or {}}))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(command_id, None)
+
+    async def pipeline(self, calls, timeout=COMMAND_TIMEOUT):
+        """Send every (method, params) at once and return the results in order"""
+        return await asyncio.gather(*(self.call(method, params, timeout) for method, params in calls))
+
+    def on(self, event, callback):
+        self.listeners.setdefault(event, []).append(callback)
+
+    async def close(self):
+        self.closed = True
+        await self.ws.close()
+        if self.reader is not None:
+            await asyncio.gather(self.reader, return_exceptions=True)
+
+
+def _script_expression(script, args):
+    # Same calling convention as WebDriver's execute_script: the script is a
+    # function body that sees its arguments as `arguments`
+    return f"(function() {{\n{script}\n}}).apply(null, {json.dumps(list(args))})"
+
+
+class CDPDriver:
+    """
+    Synchronous WebDriver-shaped facade over one CDPConnection for the scan
+    thread. Tracks the main frame's navigations, loads and document
+    replacements from events (on the engine thread), so callers can check
+    them with page_state() without a round trip.
+    """
+
+    def __init__(self, connection, metrics=None, frame_id=None, url=None):
+        self.connection = connection
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.frame_id = frame_id  # Main frame; iframe navigations are ignored
+        self.url = url
+        self.navigations = 0  # Documents committed in the main frame
+        self.loads = 0
+        self.document_updates = 0
+        self.loading = False  # Between a committed navigation and its load event
+        self.last_event = time.monotonic()
+        connection.on('Page.frameNavigated', self._on_frame_navigated)
+        connection.on('Page.navigatedWithinDocument', self._on_navigated_within_document)
+        connection.on('Page.loadEventFired', self._on_load)
+        connection.on('DOM.documentUpdated', self._on_document_updated)
+
+    def _on_frame_navigated(self, params):
+        frame = params.get('frame', {})
+        if frame.get('parentId'):
+            return
+        with self.lock:
+            self.frame_id = frame.get('id', self.frame_id)
+            self.url = frame.get('url', self.url)
+            self.navigations += 1
+            self.loading = True
+            self.last_event = time.monotonic()
+
+    def _on_navigated_within_document(self, params):
+        if params.get('frameId') != self.frame_id:
+            return
+        with self.lock:
+            self.url = params.get('url', self.url)
+            self.last_event = time.monotonic()
+
+    def _on_load(self, params):
+        with self.lock:
+            self.loads += 1
+            self.loading = False
+            self.last_event = time.monotonic()
+
+    def _on_document_updated(self, params):
+        with self.lock:
+            self.document_updates += 1
+            self.last_event = time.monotonic()
+        # Chrome only reports the next replacement once the new document has
+        # been requested
+        asyncio.ensure_future(self._request_document())
+
+    async def _request_document(self):
+        try:
+            await self.connection.call('DOM.getDocument', {'depth': 0})
+        except Exception as e:
+            log.debug("DOM.getDocument after a document update failed: %s", e)
+
+    def page_state(self):
+        """
+        Navigation state from the page events: url, navigations, loads,
+        document_updates, loading and idle_ms (since the last of them), or
+        None once the connection is gone and the events stopped
+        """
+        if not self.alive:
+            return None
+        with self.lock:
+            return {
+                'url': self.url,
+                'navigations': self.navigations,
+                'loads': self.loads,
+                'document_updates': self.document_updates,
+                'loading': self.loading,
+                'idle_ms': (time.monotonic() - self.last_event) * 1000,
+            }
+
+    @property
+    def alive(self):
+        return not self.connection.closed
+
+    def _count(self, method):
+        if self.metrics is not None:
+            self.metrics.count_call(f'cdp:{method}')
+
+    def execute_cdp_cmd(self, method, params=None):
+        self._count(method)
+        return engine.run(self.connection.call(method, params))
+
+    def execute_script(self, script, *args):
+        result = self.execute_cdp_cmd('Runtime.evaluate', {
+            'expression': _script_expression(script, args),
+            'returnByValue': True,
+            'awaitPromise': True,
+        })
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            message = details.get('exception', {}).get('description') or details.get('text')
+            raise CDPError(f"Script error: {message}")
+        return result.get('result', {}).get('value')
+
+    def get_screenshot_as_base64(self):
+        return self.execute_cdp_cmd('Page.captureScreenshot', {'format': 'png'})['data']
+
+    def get_screenshot_as_png(self):
+        return base64.b64decode(self.get_screenshot_as_base64())
+
+    def close(self):
+        if not self.connection.closed:
+            try:
+                engine.run(self.connection.close(), timeout=5)
+            except Exception:
+                pass
+
+
+def open_cdp_driver(port, target_id=None, metrics=None):
+    """
+    CDPDriver attached to the page target_id on DevTools `port`, or None when
+    the backend is disabled or unavailable (the caller stays on Selenium)
+    """
+    if DRIVER_BACKEND != 'cdp':
+        return None
+    if websockets is None:
+        log.info("websockets is not installed; the hot loop stays on Selenium")
+        return None
+    started = time.perf_counter()
+    try:
+        url = find_page_websocket_url(port, target_id)
+        connection = engine.run(CDPConnection.open(url), timeout=10)
+        # DOM.documentUpdated only fires once the document has been requested
+        results = engine.run(connection.pipeline([('Page.enable', None), ('DOM.enable', None),
+                                                  ('DOM.getDocument', {'depth': 0}),
+                                                  ('Page.getFrameTree', None)]))
+    except Exception as e:
+        log.warning("Could not attach to DevTools port %s, using Selenium: %s", port, e)
+        return None
+    log.info("Attached to %s in %.1fms", url, (time.perf_counter() - started) * 1000)
+    frame = results[-1]['frameTree']['frame']
+    return CDPDriver(connection, metrics, frame['id'], frame['url'])
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+CDP screencast capture backend for the Geico scanner
+Instead of pulling a screenshot every loop iteration, this asks Chrome to push
+compressed frames with Page.startScreencast over the DevTools websocket that
+--remote-debugging-port exposes. Chrome only sends a frame when the page
+repaints, so the frame rate reflects real paints rather than WebDriver latency.
+
+websocket-client is already installed as a Selenium dependency.
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+
+import websocket
+
+from frame_capture import MIME_TYPES, frame_hash
+from scanner_logging import get_logger
+
+log = get_logger('screencast')
+
+# Largest frame Chrome should push; it downscales to fit
+SCREENCAST_MAX_WIDTH = int(os.environ.get('SCANNER_SCREENCAST_MAX_WIDTH', '1920'))
+SCREENCAST_MAX_HEIGHT = int(os.environ.get('SCANNER_SCREENCAST_MAX_HEIGHT', '1080'))
+
+# Screencast only supports jpeg and png
+SCREENCAST_FORMATS = ('jpeg', 'png')
+
+
+def find_page_websocket_url(port, target_id=None, host='127.0.0.1'):
+    """
+    Look up the DevTools websocket URL of a page target. chromedriver window
+    handles are DevTools target ids, so pass driver.current_window_handle to
+    attach to the tab the scanner is driving.
+    """
+    with urllib.request.urlopen(f"http://{host}:{port}/json", timeout=5) as response:
+        targets = json.loads(response.read().decode())
+    pages = [t for t in targets if t.get('type') == 'page' and t.get('webSocketDebuggerUrl')]
+    for target in pages:
+        if target_id and target.get('id') == target_id:
+            return target['webSocketDebuggerUrl']
+    if not pages:
+        raise RuntimeError(f"No page targets on DevTools port {port}")
+    return pages[0]['webSocketDebuggerUrl']
+
+
+class ScreencastCapture:
+    """
+    Receives Page.screencastFrame events on a background thread and keeps
+    the latest frame. Frames use the same dict shape as capture_frame, so
+    the scan loop can use either backend interchangeably.
+    """
+
+    def __init__(self, port=9222, target_id=None, image_format='jpeg', quality=80,
+                 max_width=SCREENCAST_MAX_WIDTH, max_height=SCREENCAST_MAX_HEIGHT, every_nth_frame=1):
+        self.port = port
+        self.target_id = target_id
+        self.image_format = image_format if image_format in SCREENCAST_FORMATS else 'jpeg'
+        self.quality = quality
+        self.max_width = max_width
+        self.max_height = max_height
+        self.full_size = (max_width, max_height)
+        self.every_nth_frame = every_nth_frame
+
+        self.ws = None
+        self.thread = None
+        self.running = False
+        self.condition = threading.Condition()
+        self.frame = None
+        self.sequence = 0
+        self.frame_times = deque(maxlen=240)
+        self.last_error = None
+        self._next_id = 0
+        self._send_lock = threading.Lock()
+
+    def _send(self, method, params=None):
+        with self._send_lock:
+            self._next_id += 1
+            self.ws.send(json.dumps({'id': self._next_id, 'method': method, 'params': params or {}}))
+            return self._next_id
+
+    def start(self):
+        url = find_page_websocket_url(self.port, self.target_id)
+        # Chrome rejects websocket clients that send an Origin header unless
+        # --remote-allow-origins is set, so don't send one
+        self.ws = websocket.create_connection(url, timeout=10, suppress_origin=True)
+        self.ws.settimeout(1.0)
+        self.running = True
+        self.thread = threading.Thread(target=self._reader, daemon=True)
+        self.thread.start()
+        self._send('Page.enable')
+        self._start_screencast()
+        log.info("Started on %s (%s, q=%s, max %sx%s)", url, self.image_format, self.quality,
+                 self.max_width, self.max_height)
+
+    def _start_screencast(self):
+        self._send('Page.startScreencast', {
+            'format': self.image_format,
+            'quality': self.quality,
+            'maxWidth': self.max_width,
+            'maxHeight': self.max_height,
+            'everyNthFrame': self.every_nth_frame
+        })
+
+    def resize(self, size):
+        """
+        Have Chrome scale the frames it pushes to fit size (width, height);
+        None goes back to the size the screencast started with
+        """
+        max_width, max_height = size or self.full_size
+        if (max_width, max_height) == (self.max_width, self.max_height) or not self.is_alive():
+            return
+        self.max_width, self.max_height = max_width, max_height
+        self._send('Page.stopScreencast')
+        self._start_screencast()
+        log.info("Frames now scaled to fit %sx%s", max_width, max_height)
+
+    def _reader(self):
+        while self.running:
+            try:
+                message = self.ws.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
+            except Exception as e:
+                if self.running:
+                    self.last_error = str(e)
+                    log.warning("Connection lost: %s", e)
+                self.running = False
+                break
+
+            try:
+                payload = json.loads(message)
+            except ValueError:
+                continue
+            if payload.get('method') != 'Page.screencastFrame':
+                continue
+
+            params = payload['params']
+            received = time.perf_counter()
+            # Chrome stops sending until each frame is acknowledged
+            try:
+                self._send('Page.screencastFrameAck', {'sessionId': params['sessionId']})
+            except Exception as e:
+                self.last_error = str(e)
+
+            data = params['data']
+            hashed = time.perf_counter()
+            digest = frame_hash(data)
+            hash_ms = round((time.perf_counter() - hashed) * 1000, 2)
+            frame = {
+                'base64': data,
+                'hash': digest,
+                'format': self.image_format,
+                'mime': MIME_TYPES[self.image_format],
+                'size': len(data) * 3 // 4 - data[-2:].count('='),
+                'metadata': params.get('metadata', {}),
+                'limit': (self.max_width, self.max_height),
+                'timings': {
+                    'capture_ms': 0.0,
+                    'encode_ms': 0.0,
+                    'hash_ms': hash_ms,
+                    'total_ms': round((time.perf_counter() - received) * 1000, 2),
+                    'path': 'screencast'
+                },
+            }
+            with self.condition:
+                self.frame = frame
+                self.sequence += 1
+                self.frame_times.append(time.time())
+                self.condition.notify_all()
+
+    def is_alive(self):
+        return self.running and self.thread is not None and self.thread.is_alive()
+
+    def latest_frame(self):
+        """Return (sequence, frame) for the newest pushed frame without blocking"""
+        with self.condition:
+            return self.sequence, self.frame
+
+    def wait_for_frame(self, last_sequence, timeout):
+        """Block until a frame newer than last_sequence arrives (or timeout)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence != last_sequence or not self.running, timeout)
+            return self.sequence, self.frame
+
+    def fps(self, window=1.0):
+        """Paint-driven frame rate over the last `window` seconds"""
+        cutoff = time.time() - window
+        with self.condition:
+            return sum(1 for t in self.frame_times if t >= cutoff)
+
+    def stop(self):
+        if not self.ws:
+            return
+        try:
+            self._send('Page.stopScreencast')
+        except Exception:
+            pass
+        self.running = False
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+        if self.thread:
+            self.thread.join(timeout=2)
+        self.ws = None
+        log.info("Stopped")
@@ -8,8 +8,11 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 import time
 
+from session_registry import debugger_address
+
+# Attach to a scanner session: --session <id> or SCANNER_SESSION
 chrome_options = Options()
-chrome_options.add_experimental_option("debuggerAddress", "127.0.0.1:9222")
+chrome_options.add_experimental_option("debuggerAddress", debugger_address())
 
 try:
     driver = webdriver.Chrome(options=chrome_options)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+DOM change tracking for the Geico scanner loops
+Injects a MutationObserver (plus scroll, resize, load and input listeners)
+that keeps a version counter for the page's DOM, layout and scroll position.
+The Python side polls the counters with one cheap execute_script call and
+re-runs element detection only when something actually moved.
+
+Used by scan_geico_site and geico_scanner_commercial_auto_fix.scan_loop.
+"""
+
+from scanner_logging import get_logger
+
+log = get_logger('dom_watch')
+
+# Installs the observer on first run (and again after every navigation, since
+# a new document drops window state). Other injected scripts (text_index.py)
+# prepend this to key their caches on the same version counter.
+DOM_WATCH_INSTALL = r"""
+var state = window.__scannerDomState;
+if (!state) {
+    state = window.__scannerDomState = {
+        documentId: Date.now().toString(36) + Math.random().toString(36).slice(2),
+        version: 0,
+        domVersion: 0,
+        layoutVersion: 0,
+        scrollVersion: 0,
+        lastChange: Date.now()
+    };
+    var bump = function(kind) {
+        state[kind] += 1;
+        state.version += 1;
+        state.lastChange = Date.now();
+    };
+    // Mutation callbacks are already batched per microtask
+    new MutationObserver(function() { bump('domVersion'); }).observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true
+    });
+    // Form values change without any DOM mutation
+    document.addEventListener('input', function() { bump('domVersion'); }, true);
+    document.addEventListener('change', function() { bump('domVersion'); }, true);
+    // Layout can move without mutations: resizes, late images/fonts, transitions
+    window.addEventListener('resize', function() { bump('layoutVersion'); });
+    window.addEventListener('load', function() { bump('layoutVersion'); }, true);
+    document.addEventListener('transitionend', function() { bump('layoutVersion'); }, true);
+    document.addEventListener('animationend', function() { bump('layoutVersion'); }, true);
+    if (window.ResizeObserver && document.documentElement) {
+        new ResizeObserver(function() { bump('layoutVersion'); }).observe(document.documentElement);
+    }
+    window.addEventListener('scroll', function() { bump('scrollVersion'); }, true);
+}
+"""
+
+# Installs if needed, then returns the counters
+DOM_WATCH_SCRIPT = DOM_WATCH_INSTALL + r"""
+return {
+    documentId: state.documentId,
+    version: state.version,
+    domVersion: state.domVersion,
+    layoutVersion: state.layoutVersion,
+    scrollVersion: state.scrollVersion,
+    idleMs: Date.now() - state.lastChange,
+    url: window.location.href
+};
+"""
+
+
+class DomChangeWatcher:
+    """
+    Tracks the injected DOM version for one driver. poll() returns True when
+    the page changed since the previous poll (including navigating to a new
+    document); the first poll always reports a change.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.last_token = None
+        self.state = None
+        self.polls = 0
+        self.changes = 0
+
+    def poll(self):
+        state = self.driver.execute_script(DOM_WATCH_SCRIPT)
+        self.polls += 1
+        self.state = state
+        token = (state['documentId'], state['version'])
+        if token == self.last_token:
+            return False
+        self.last_token = token
+        self.changes += 1
+        return True
+
+    def changed(self):
+        """
+        poll() that treats a failed check as a change, so callers re-detect
+        rather than keep showing stale elements
+        """
+        try:
+            return self.poll()
+        except Exception as e:
+            log.warning("Could not read DOM version: %s", e)
+            self.last_token = None
+            return True
+
+    def reset(self):
+        """Force the next poll to report a change"""
+        self.last_token = None
+
+    @property
+    def version(self):
+        return self.state['version'] if self.state else None
+
+    def summary(self):
+        return {
+            'polls': self.polls,
+            'changes': self.changes,
+            'state': self.state,
+        }
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Single round-trip element detector for the Geico scanner
+Injects one JavaScript collector that gathers every candidate the detection
+passes in scan_geico_site look at (label, bounding box, tag, role, visibility)
+and returns them in a single execute_script call. The Python size filters and
+add_unique_element then run over that batch instead of making is_displayed(),
+.rect, .text and get_attribute() round trips for every hit.
+"""
+
+import time
+
+from scanner_logging import get_logger
+
+log = get_logger('detection')
+
+# Keyword tuples for the clickable text pattern pass (all parts must match)
+IMPORTANT_TEXTS = [
+    ("start", "quote"),
+    ("search", "policy"),
+    ("look", "prior", "quote"),
+    ("private", "passenger", "auto"),
+    ("motorcycle", "atv"),
+    ("commercial", "auto"),
+    ("commercial", "truck"),
+    ("get", "quote"),
+    ("continue", "quote"),
+    ("view", "policy"),
+    ("make", "payment"),
+    ("starter", "quote"),
+    ("manage", "policy"),
+    ("claim", "center"),
+    ("pay", "bill"),
+    ("get", "id", "card"),
+    ("private", "passenger"),
+    ("motorcycle",),
+    ("atv",),
+    ("off-road",),
+    ("off", "road"),
+    ("commercial",),
+    ("trucking",),
+    ("auto",)
+]
+
+# Single keywords searched in buttons, links, divs and spans
+SINGLE_KEYWORDS = [
+    "start", "quote", "policy", "search", "private", "passenger",
+    "motorcycle", "commercial", "auto", "truck", "manage", "claim",
+    "atv", "off-road", "trucking"
+]
+
+# Product labels searched in the first text node of any element
+PRODUCT_KEYWORDS = ['private passenger', 'motorcycle', 'atv', 'off-road', 'off road', 'commercial', 'trucking']
+
+# Words that identify product buttons below the "products to quote" heading
+PRODUCTS_SECTION_KEYWORDS = ['private passenger', 'motorcycle', 'atv', 'off-road', 'commercial', 'trucking']
+
+EXACT_PHRASES = [
+    "Private Passenger Auto",
+    "Motorcycle/ATV/Off-road",
+    "Commercial Auto/Trucking"
+]
+
+# Keywords for the general text sweep over the first 200 text-bearing elements
+TARGET_KEYWORDS = [
+    "private passenger", "motorcycle", "atv", "off-road", "off road",
+    "commercial auto", "commercial trucking", "trucking"
+]
+
+# The collector returns {nodes: [...], passes: {name: [node index, ...]}}.
+# Every node is measured once even if several passes select it, and each pass
+# lists its hits in the same order the old XPath queries returned them.
+COLLECTOR_SCRIPT = r"""
+var cfg = arguments[0];
+var nodes = [];
+var indexOf = new Map();
+var textCache = new Map();
+var firstTextCache = new Map();
+
+function lowerText(el) {
+    // XPath string value of '.', i.e. textContent
+    var t = textCache.get(el);
+    if (t === undefined) {
+        t = (el.textContent || '').toLowerCase();
+        textCache.set(el, t);
+    }
+    return t;
+}
+
+function firstTextNode(el) {
+    // XPath text() in a string context: the first child text node
+    var t = firstTextCache.get(el);
+    if (t === undefined) {
+        t = null;
+        for (var c = el.firstChild; c; c = c.nextSibling) {
+            if (c.nodeType === 3) { t = c.nodeValue.toLowerCase(); break; }
+        }
+        firstTextCache.set(el, t);
+    }
+    return t;
+}
+
+function isVisible(el) {
+    if (!el.getClientRects().length) return false;
+    var style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.visibility === 'collapse') return false;
+    if (parseFloat(style.opacity) === 0) return false;
+    if (el.tagName === 'INPUT' && (el.getAttribute('type') || '').toLowerCase() === 'hidden') return false;
+    return true;
+}
+
+function isClickable(el, levels, tags) {
+    // Mirrors the old Python walk: element plus parents, checking attributes
+    var current = el;
+    for (var i = 0; i < levels && current && current.nodeType === 1; i++) {
+        if (tags.indexOf(current.tagName.toLowerCase()) !== -1) return true;
+        var role = current.getAttribute('role');
+        if (current.getAttribute('onclick') || role === 'button' || role === 'link' ||
+            current.getAttribute('tabindex') ||
+            window.getComputedStyle(current).cursor === 'pointer') {
+            return true;
+        }
+        current = current.parentElement;
+    }
+    return false;
+}
+
+function record(el) {
+    var idx = indexOf.get(el);
+    if (idx !== undefined) return idx;
+    var visible = isVisible(el);
+    var r = el.getBoundingClientRect();
+    var node = {
+        tag: el.tagName.toLowerCase(),
+        role: el.getAttribute('role') || '',
+        type: (el.getAttribute('type') || '').toLowerCase(),
+        name: el.getAttribute('name') || '',
+        id: el.id || '',
+        placeholder: el.getAttribute('placeholder') || '',
+        ariaLabel: el.getAttribute('aria-label') || '',
+        value: el.getAttribute('value') || '',
+        text: visible ? (el.innerText || '').trim() : '',
+        visible: visible,
+        x: r.left + window.scrollX,
+        y: r.top + window.scrollY,
+        width: r.width,
+        height: r.height
+    };
+    idx = nodes.length;
+    nodes.push(node);
+    indexOf.set(el, idx);
+    return idx;
+}
+
+function collect(list, filter) {
+    var out = [];
+    for (var i = 0; i < list.length; i++) {
+        if (!filter || filter(list[i])) out.push(record(list[i]));
+    }
+    return out;
+}
+
+function collectOrdered(list, groups, matches, matchedGroups) {
+    // One entry per element, at the first keyword group that matches it;
+    // later repeats would always be rejected by add_unique_element anyway
+    var seen = new Set();
+    var out = [];
+    for (var g = 0; g < groups.length; g++) {
+        for (var i = 0; i < list.length; i++) {
+            var el = list[i];
+            if (!seen.has(el) && matches(el, groups[g])) {
+                seen.add(el);
+                out.push(record(el));
+                if (matchedGroups) matchedGroups.push(g);
+            }
+        }
+    }
+    return out;
+}
+
+function containsAll(text, parts) {
+    if (text === null) return false;
+    for (var p = 0; p < parts.length; p++) {
+        if (text.indexOf(parts[p]) === -1) return false;
+    }
+    return true;
+}
+
+function wants(name) {
+    // cfg.passes restricts the collector to some passes (benchmarks); null runs all
+    return !cfg.passes || cfg.passes.indexOf(name) !== -1;
+}
+
+var passes = {};
+var all = document.getElementsByTagName('*');
+
+if (wants('inputs')) passes.inputs = collect(document.getElementsByTagName('input'));
+if (wants('buttons')) passes.buttons = collect(document.getElementsByTagName('button'));
+if (wants('links')) passes.links = collect(document.getElementsByTagName('a'));
+if (wants('selects')) passes.selects = collect(document.getElementsByTagName('select'));
+if (wants('textareas')) passes.textareas = collect(document.getElementsByTagName('textarea'));
+
+if (wants('patterns')) {
+    var patternHosts = document.querySelectorAll(
+        'button, a, span[role="button"], div[role="button"], div[tabindex]');
+    passes.patterns = collectOrdered(patternHosts, cfg.importantTexts, function(el, parts) {
+        return containsAll(lowerText(el), parts);
+    });
+}
+
+if (wants('keywords')) {
+    var keywordHosts = document.querySelectorAll('button, a, div, span');
+    passes.keywords = collectOrdered(keywordHosts, cfg.singleKeywords, function(el, kw) {
+        return lowerText(el).indexOf(kw) !== -1;
+    });
+}
+
+if (wants('roles')) {
+    passes.roles = collect(document.querySelectorAll(
+        'span[role="button"], span[role="link"], div[role="button"], div[role="link"], ' +
+        '[onclick], [ng-click], [class*="button"], [class*="btn"], [tabindex]'));
+}
+
+// "products to quote" heading: walk up 5 containers collecting product buttons
+passes.products = [];
+for (var i = 0; i < all.length && wants('products'); i++) {
+    var heading = all[i];
+    var own = firstTextNode(heading);
+    if (own === null || own.indexOf('products to quote') === -1 || !isVisible(heading)) continue;
+    var parent = heading;
+    for (var level = 0; level < 5 && parent.parentElement; level++) {
+        parent = parent.parentElement;
+        var children = parent.getElementsByTagName('*');
+        for (var c = 0; c < children.length; c++) {
+            var childText = firstTextNode(children[c]);
+            if (childText === null) continue;
+            for (var k = 0; k < cfg.productsSectionKeywords.length; k++) {
+                if (childText.indexOf(cfg.productsSectionKeywords[k]) !== -1) {
+                    passes.products.push(record(children[c]));
+                    break;
+                }
+            }
+        }
+    }
+}
+
+if (wants('productKeywords')) {
+    passes.productKeywords = collectOrdered(all, cfg.productKeywords, function(el, kw) {
+        var own = firstTextNode(el);
+        return own !== null && own.indexOf(kw) !== -1;
+    });
+}
+
+if (wants('exactPhrases')) {
+    passes.exactPhraseGroups = [];
+    passes.exactPhrases = collectOrdered(all, cfg.exactPhrases, function(el, phrase) {
+        var own = firstTextNode(el);
+        return own !== null && own.replace(/\s+/g, ' ').trim() === phrase;
+    }, passes.exactPhraseGroups);
+}
+
+var textHosts = [];
+for (var i = 0; i < all.length && textHosts.length < 200 && wants('general'); i++) {
+    var tag = all[i].tagName;
+    if (tag !== 'SCRIPT' && tag !== 'STYLE' && firstTextNode(all[i]) !== null) textHosts.push(all[i]);
+}
+if (wants('general')) passes.general = collect(textHosts);
+
+// Clickability is only needed for nodes in the text sweeps
+var clickable3 = {};
+var clickable4 = {};
+(passes.productKeywords || []).forEach(function(idx) { clickable3[idx] = true; });
+(passes.general || []).forEach(function(idx) { clickable4[idx] = true; });
+indexOf.forEach(function(idx, el) {
+    if (!nodes[idx].visible) return;
+    if (clickable3[idx]) nodes[idx].clickable3 = isClickable(el, 3, ['a', 'button']);
+    if (clickable4[idx]) nodes[idx].clickable4 = isClickable(el, 4, ['a', 'button', 'input']);
+});
+
+return {nodes: nodes, passes: passes};
+"""
+
+
+def collector_config(passes=None):
+    """
+    Keyword tables passed to the collector script. passes limits the
+    collector to those DETECTION_PASSES names (None collects every pass).
+    """
+    return {
+        'passes': list(passes) if passes is not None else None,
+        'importantTexts': [list(parts) for parts in IMPORTANT_TEXTS],
+        'singleKeywords': SINGLE_KEYWORDS,
+        'productKeywords': PRODUCT_KEYWORDS,
+        'productsSectionKeywords': PRODUCTS_SECTION_KEYWORDS,
+        'exactPhrases': [phrase.lower() for phrase in EXACT_PHRASES],
+    }
+
+
+def collect_candidates(driver, passes=None):
+    """
+    Run the collector in the page and return the raw batch
+    One execute_script call regardless of how many elements the page has
+    """
+    batch = driver.execute_script(COLLECTOR_SCRIPT, collector_config(passes))
+    if not batch:
+        return {'nodes': [], 'passes': {}}
+    return batch
+
+
+def _box(node, label):
+    return {
+        'label': label,
+        'x': node['x'],
+        'y': node['y'],
+        'width': node['width'],
+        'height': node['height']
+    }
+
+
+def _pass_nodes(batch, name):
+    nodes = batch['nodes']
+    for idx in batch['passes'].get(name, []):
+        node = nodes[idx]
+        if node['visible']:
+            yield node
+
+
+def filter_inputs(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'inputs'):
+        if node['width'] > 20 and node['height'] > 10:
+            input_type = node['type'] or 'text'
+            if input_type in ['hidden']:
+                continue
+
+            # Create descriptive label
+            label = f"Input [{input_type}]"
+            if node['placeholder']:
+                label = node['placeholder']
+            elif node['name']:
+                label = f"Input: {node['name']}"
+            elif node['id']:
+                label = f"Input: {node['id']}"
+
+            add_unique_element(_box(node, label))
+
+
+def filter_buttons(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'buttons'):
+        if node['width'] > 30 and node['height'] > 20:
+            btn_text = node['text'] or node['ariaLabel']
+            # Skip empty buttons
+            if btn_text:
+                add_unique_element(_box(node, f"Button: {btn_text[:20]}"))
+
+
+def filter_links(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'links'):
+        if node['width'] > 15 and node['height'] > 8 and node['width'] < 500 and node['height'] < 120:
+            link_text = node['text']
+            aria_label = node['ariaLabel']
+            if link_text or aria_label:
+                label = link_text[:30] if link_text else aria_label[:30]
+                if len(label) > 0:
+                    add_unique_element(_box(node, label))
+
+
+def filter_selects(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'selects'):
+        if node['width'] > 30 and node['height'] > 20:
+            name = node['name'] or node['id'] or 'Dropdown'
+            add_unique_element(_box(node, f"Select: {name}"))
+
+
+def filter_textareas(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'textareas'):
+        if node['width'] > 50 and node['height'] > 30:
+            add_unique_element(_box(node, node['placeholder'] or 'Textarea'))
+
+
+def filter_patterns(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'patterns'):
+        if node['width'] > 25 and node['height'] > 12 and node['width'] < 600 and node['height'] < 150:
+            elem_text = node['text'][:40]
+            if elem_text:
+                add_unique_element(_box(node, elem_text))
+
+
+def filter_keywords(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'keywords'):
+        if node['width'] > 25 and node['height'] > 12 and node['width'] < 600 and node['height'] < 150:
+            elem_text = node['text'][:40]
+            if elem_text and len(elem_text) > 3:
+                add_unique_element(_box(node, elem_text))
+
+
+def filter_roles(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'roles'):
+        if node['width'] > 15 and node['height'] > 8 and node['width'] < 600 and node['height'] < 150:
+            elem_text = node['text'][:30] or node['ariaLabel']
+            if elem_text and len(elem_text) > 2:
+                add_unique_element(_box(node, elem_text))
+
+
+def filter_products(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'products'):
+        if node['width'] > 20 and node['height'] > 10:
+            if node['text']:
+                add_unique_element(_box(node, node['text'][:40]))
+
+
+def filter_product_keywords(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'productKeywords'):
+        if node['width'] > 20 and node['height'] > 10 and node['width'] < 800 and node['height'] < 200:
+            elem_text = node['text']
+            if not elem_text:
+                continue
+            lowered = elem_text.lower()
+            # Add important product text even if not explicitly clickable
+            if node.get('clickable3') or 'auto' in lowered or 'motorcycle' in lowered or 'commercial' in lowered:
+                add_unique_element(_box(node, elem_text[:40]))
+
+
+def filter_exact_phrases(batch, add_unique_element):
+    nodes = batch['nodes']
+    hits = zip(batch['passes'].get('exactPhrases', []), batch['passes'].get('exactPhraseGroups', []))
+    for idx, group in hits:
+        node = nodes[idx]
+        if node['visible'] and node['width'] > 20 and node['height'] > 10:
+            add_unique_element(_box(node, EXACT_PHRASES[group]))
+
+
+def filter_general(batch, add_unique_element):
+    for node in _pass_nodes(batch, 'general'):
+        elem_text = node['text'].lower()
+        if len(elem_text) >= 100 or not node.get('clickable4'):
+            continue
+        if any(keyword in elem_text for keyword in TARGET_KEYWORDS):
+            if node['width'] > 15 and node['height'] > 8 and node['width'] < 800:
+                add_unique_element(_box(node, node['text'][:50]))
+
+
+# Passes in the order scan_geico_site has always run them; earlier passes win
+# ties in add_unique_element, so the order is part of the behaviour
+DETECTION_PASSES = [
+    ('inputs', filter_inputs),
+    ('buttons', filter_buttons),
+    ('links', filter_links),
+    ('selects', filter_selects),
+    ('textareas', filter_textareas),
+    ('patterns', filter_patterns),
+    ('keywords', filter_keywords),
+    ('roles', filter_roles),
+    ('products', filter_products),
+    ('productKeywords', filter_product_keywords),
+    ('exactPhrases', filter_exact_phrases),
+    ('general', filter_general),
+]
+
+
+def apply_detection_passes(batch, add_unique_element, observe=None):
+    """
+    Run every Python filter pass over a collected batch. observe(stage, seconds)
+    is called with each pass's duration when given.
+    """
+    for name, filter_pass in DETECTION_PASSES:
+        start = time.perf_counter()
+        try:
+            filter_pass(batch, add_unique_element)
+        except Exception as e:
+            log.warning("Error in %s detection pass: %s", name, e)
+        if observe:
+            observe(f"detect_pass_{name}", time.perf_counter() - start)
+
+
+def detect_elements(driver, add_unique_element, observe=None):
+    """
+    Collect candidates with one execute_script call and feed them through
+    the detection passes. Returns the number of candidates collected.
+    observe(stage, seconds) receives the collector and per-pass timings.
+    """
+    start = time.perf_counter()
+    batch = collect_candidates(driver)
+    if observe:
+        observe('detect_collect', time.perf_counter() - start)
+    apply_detection_passes(batch, add_unique_element, observe)
+    return len(batch['nodes'])
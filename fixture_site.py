@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the GEICO agent site
+Serves synthetic versions of the pages scan_geico_site walks through, so the
+scanner can be run and timed without gateway.geico.com:
+
+    /                 gateway with the "Manage My Policy" link
+    /login            username/password form (any credentials are accepted)
+    /dashboard        "Products to quote" section, filled in by a fetch() to
+                      /api/products, with the Commercial Auto/Trucking tab
+    /commercial-auto  garaging zip (fills the state select), USDOT number and
+                      the Check USDOT button, which fetches /api/usdot
+
+Every page links /static/app.js. Responses are delayed by --latency (HTML),
+--asset-latency (app.js) and --api-latency (the fetch() calls), and each page
+carries --dom-size filler nodes (rows of text, links and buttons) to load the
+element detection like a heavy real page.
+
+Usage: python fixture_site.py [--port 8765] [--latency 0.1] [--dom-size 1000]
+Point the scanner at it with SCANNER_START_URL=http://127.0.0.1:8765/
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PORT = 8765
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>{title} - GEICO fixture</title>
+<script src="/static/app.js"></script>
+<style>
+body {{ font-family: sans-serif; margin: 0; }}
+header {{ background: #154a8a; color: white; padding: 12px 24px; }}
+main {{ padding: 24px; }}
+.tab {{ display: inline-block; padding: 10px 18px; border: 1px solid #ccc; margin-right: 4px; }}
+.filler-row {{ padding: 2px 0; font-size: 12px; color: #555; }}
+.filler-row button {{ font-size: 11px; margin-left: 8px; }}
+label {{ display: block; margin: 12px 0 4px; }}
+</style>
+</head>
+<body>
+<header><strong>GEICO</strong> Commercial Agent Portal (offline fixture)</header>
+<main>
+{body}
+<section id="filler">
+{filler}
+</section>
+</main>
+</body>
+</html>
+"""
+
+GATEWAY_BODY = """
+<h1>Welcome</h1>
+<p>Sign-in for existing agents.</p>
+<a id="manage-policy" href="/login">Manage My Policy</a>
+"""
+
+LOGIN_BODY = """
+<h1>Agent Sign In</h1>
+<form id="login-form" method="post" action="/login">
+  <label for="username">Username</label>
+  <input type="text" id="username" name="username" placeholder="Username" autocomplete="off">
+  <label for="password">Password</label>
+  <input type="password" id="password" name="password">
+  <button type="submit" id="sign-in">Sign In</button>
+</form>
+"""
+
+DASHBOARD_BODY = """
+<h1>Dashboard</h1>
+<section id="products">
+  <h2>Products to quote</h2>
+  <p id="products-loading">Loading products...</p>
+</section>
+<script>
+fetch('/api/products').then(function(r) { return r.json(); }).then(function(data) {
+    var section = document.getElementById('products');
+    document.getElementById('products-loading').remove();
+    data.products.forEach(function(product) {
+        var tab = document.createElement('a');
+        tab.className = 'tab';
+        tab.setAttribute('role', 'tab');
+        tab.href = product.href;
+        tab.textContent = product.label;
+        section.appendChild(tab);
+    });
+});
+</script>
+"""
+
+COMMERCIAL_BODY = """
+<h1>Commercial Auto/Trucking Quote</h1>
+<form id="quote-form" onsubmit="return false;">
+  <label for="garagingZip">Garaging Zip Code</label>
+  <input type="text" id="garagingZip" name="garagingZip" placeholder="Garaging zip" maxlength="5">
+  <label for="garagingState">State</label>
+  <select id="garagingState" name="garagingState">
+    <option value="">Select a state</option>
+    <option value="OH">Ohio</option>
+    <option value="PA">Pennsylvania</option>
+  </select>
+  <label for="usdotNumber">USDOT Number</label>
+  <input type="text" id="usdotNumber" name="usdotNumber" placeholder="USDOT number" aria-label="USDOT number">
+  <button type="button" id="check-usdot">Check USDOT</button>
+</form>
+<div id="usdot-result"></div>
+<script>
+var zip = document.getElementById('garagingZip');
+['input', 'change', 'keyup', 'blur'].forEach(function(name) {
+    zip.addEventListener(name, function() {
+        if (/^4\\d{4}$/.test(zip.value)) {
+            document.getElementById('garagingState').value = 'OH';
+        }
+    });
+});
+document.getElementById('check-usdot').addEventListener('click', function() {
+    var number = document.getElementById('usdotNumber').value;
+    fetch('/api/usdot?number=' + encodeURIComponent(number))
+        .then(function(r) { return r.json(); })
+        .then(function(data) {
+            var result = document.getElementById('usdot-result');
+            result.setAttribute('data-status', data.status);
+            result.textContent = 'USDOT ' + data.number + ': ' + data.status + ' - ' + data.carrier;
+        });
+});
+</script>
+"""
+
+APP_JS = "window.fixtureLoaded = Date.now();\n"
+
+PAGES = {
+    '/': ('Gateway', GATEWAY_BODY),
+    '/login': ('Sign In', LOGIN_BODY),
+    '/dashboard': ('Dashboard', DASHBOARD_BODY),
+    '/commercial-auto': ('Commercial Auto', COMMERCIAL_BODY),
+}
+
+
+def filler(dom_size):
+    """About dom_size nodes of inert page content"""
+    rows = []
+    for i in range(dom_size // 3):
+        kind = i % 3
+        if kind == 0:
+            rows.append(f'<div class="filler-row"><span>Coverage note {i}</span></div>')
+        elif kind == 1:
+            rows.append(f'<div class="filler-row"><a href="#row{i}">Details {i}</a></div>')
+        else:
+            rows.append(f'<div class="filler-row">Action {i}<button type="button">Open {i}</button></div>')
+    return '\n'.join(rows)
+
+
+class FixtureSite:
+    """
+    The fixture server on a background thread. latency, asset_latency and
+    api_latency are seconds; dom_size is the filler node count per page.
+    Counts every request by path in `hits`.
+    """
+
+    def __init__(self, port=0, host='127.0.0.1', latency=0.0, asset_latency=0.0,
+                 api_latency=0.0, dom_size=0):
+        self.latency = latency
+        self.asset_latency = asset_latency
+        self.api_latency = api_latency
+        self.dom_size = dom_size
+        self.hits = {}
+        self.lock = threading.Lock()
+        self.filler = filler(dom_size)
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type, delay=0.0, headers=None):
+                if delay:
+                    time.sleep(delay)
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Cache-Control', 'no-store')
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                site.count(url.path)
+                if url.path in PAGES:
+                    title, body = PAGES[url.path]
+                    self._send(200, PAGE.format(title=title, body=body, filler=site.filler),
+                               'text/html; charset=utf-8', site.latency)
+                elif url.path == '/static/app.js':
+                    self._send(200, APP_JS, 'application/javascript', site.asset_latency)
+                elif url.path == '/api/products':
+                    products = [
+                        {'label': 'Personal Auto', 'href': '#personal'},
+                        {'label': 'Commercial Auto/Trucking', 'href': '/commercial-auto'},
+                        {'label': 'Motorcycle', 'href': '#motorcycle'},
+                    ]
+                    self._send(200, json.dumps({'products': products}), 'application/json', site.api_latency)
+                elif url.path == '/api/usdot':
+                    number = parse_qs(url.query).get('number', [''])[0]
+                    status = 'ACTIVE' if number.isdigit() else 'NOT FOUND'
+                    self._send(200, json.dumps({'number': number, 'status': status, 'carrier': 'Fixture Freight LLC'}),
+                               'application/json', site.api_latency)
+                else:
+                    self._send(404, 'Not found', 'text/plain')
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                site.count(url.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                if url.path == '/login':
+                    self._send(303, '', 'text/plain', site.latency, {'Location': '/dashboard'})
+                else:
+                    self._send(404, 'Not found', 'text/plain')
+
+        return Handler
+
+    def count(self, path):
+        with self.lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fixture-site', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the offline GEICO fixture site")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds before each page response")
+    parser.add_argument('--asset-latency', type=float, default=0.0, help="seconds before app.js")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="seconds before each fetch() response")
+    parser.add_argument('--dom-size', type=int, default=0, help="filler nodes per page")
+    args = parser.parse_args()
+
+    site = FixtureSite(args.port, args.host, args.latency, args.asset_latency, args.api_latency, args.dom_size)
+    print(f"Fixture site on {site.url} (latency {args.latency}s, dom size {args.dom_size})")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Screenshot capture pipeline for the Geico scanner
+PNG frames are passed straight through from the browser: chromedriver already
+returns base64, so there is no decode, PIL round trip or re-encode. JPEG and
+WebP are encoded exactly once, by Chrome itself via Page.captureScreenshot when
+the DevTools channel is available, otherwise by PIL as a fallback.
+
+Configure with SCANNER_FRAME_FORMAT (png, jpeg, webp) and
+SCANNER_FRAME_QUALITY (1-100, ignored for png). SCANNER_CAPTURE_BACKEND picks
+between polling screenshots ('screenshot') and Chrome's paint-driven
+Page.startScreencast ('screencast', see cdp_screencast.py).
+"""
+
+import base64
+import hashlib
+import io
+import os
+import time
+
+from scanner_logging import get_logger
+
+log = get_logger('capture')
+
+FRAME_FORMAT = os.environ.get('SCANNER_FRAME_FORMAT', 'png').lower()
+FRAME_QUALITY = int(os.environ.get('SCANNER_FRAME_QUALITY', '80'))
+CAPTURE_BACKEND = os.environ.get('SCANNER_CAPTURE_BACKEND', 'screenshot').lower()
+
+MIME_TYPES = {
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+# PIL names the formats slightly differently
+PIL_FORMATS = {
+    'jpeg': 'JPEG',
+    'webp': 'WEBP',
+}
+
+
+def _ms(start, end):
+    return round((end - start) * 1000, 2)
+
+
+def capture_frame(driver, image_format=None, quality=None):
+    """
+    Capture one frame and return a dict with the base64 payload, mime type,
+    byte size and per-stage timings in milliseconds
+    """
+    image_format = (image_format or FRAME_FORMAT).lower()
+    if image_format == 'jpg':
+        image_format = 'jpeg'
+    if image_format not in MIME_TYPES:
+        raise ValueError(f"Unsupported frame format: {image_format}")
+    quality = FRAME_QUALITY if quality is None else quality
+
+    timings = {'capture_ms': 0.0, 'encode_ms': 0.0, 'hash_ms': 0.0, 'total_ms': 0.0}
+    start = time.perf_counter()
+
+    if image_format == 'png':
+        # Pass the browser's bytes through untouched
+        data = driver.get_screenshot_as_base64()
+        captured = time.perf_counter()
+        timings['capture_ms'] = _ms(start, captured)
+        timings['path'] = 'passthrough'
+    else:
+        data = None
+        try:
+            # Let Chrome encode to the target format directly
+            result = driver.execute_cdp_cmd('Page.captureScreenshot', {
+                'format': image_format,
+                'quality': quality
+            })
+            data = result.get('data')
+            captured = time.perf_counter()
+            timings['capture_ms'] = _ms(start, captured)
+            timings['path'] = 'cdp'
+        except Exception as e:
+            log.warning("CDP capture unavailable, falling back to PIL: %s", e)
+
+        if data is None:
+            png = driver.get_screenshot_as_png()
+            captured = time.perf_counter()
+            timings['capture_ms'] = _ms(start, captured)
+
+            from PIL import Image
+            img = Image.open(io.BytesIO(png))
+            if image_format == 'jpeg' and img.mode != 'RGB':
+                img = img.convert('RGB')
+            buffered = io.BytesIO()
+            img.save(buffered, format=PIL_FORMATS[image_format], quality=quality)
+            data = base64.b64encode(buffered.getvalue()).decode()
+            timings['encode_ms'] = _ms(captured, time.perf_counter())
+            timings['path'] = 'pil'
+
+    # Content hash so unchanged frames can be skipped downstream
+    hashed = time.perf_counter()
+    digest = frame_hash(data)
+    timings['hash_ms'] = _ms(hashed, time.perf_counter())
+
+    timings['total_ms'] = _ms(start, time.perf_counter())
+
+    return {
+        'base64': data,
+        'hash': digest,
+        'format': image_format,
+        'mime': MIME_TYPES[image_format],
+        # Decoded size without actually decoding
+        'size': len(data) * 3 // 4 - data[-2:].count('='),
+        'timings': timings,
+    }
+
+
+def frame_hash(data):
+    """Short content hash of a frame's base64 payload"""
+    return hashlib.blake2b(data.encode('ascii'), digest_size=16).hexdigest()
+
+
+def frame_bytes(frame):
+    """Raw image bytes of a captured frame (decoded once and cached)"""
+    raw = frame.get('bytes')
+    if raw is None:
+        raw = base64.b64decode(frame['base64'])
+        frame['bytes'] = raw
+    return raw
+
+
+class CaptureStats:
+    """Running per-stage averages for the capture pipeline"""
+
+    def __init__(self):
+        self.frames = 0
+        self.totals = {'capture_ms': 0.0, 'encode_ms': 0.0, 'hash_ms': 0.0, 'total_ms': 0.0}
+        self.unchanged = 0
+        self.last = {}
+
+    def record(self, frame, changed=True):
+        self.frames += 1
+        if not changed:
+            self.unchanged += 1
+        self.last = frame['timings']
+        for key in self.totals:
+            self.totals[key] += frame['timings'].get(key, 0.0)
+
+    def summary(self):
+        if not self.frames:
+            return {'frames': 0}
+        averages = {f"avg_{key}": round(value / self.frames, 2) for key, value in self.totals.items()}
+        averages['frames'] = self.frames
+        averages['unchanged_frames'] = self.unchanged
+        averages['last'] = self.last
+        return averages
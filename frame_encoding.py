@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Viewport-sized and region-of-interest frame encoding for the live view
+The UI shows the 1920x1080 capture scaled down to its container, so most of
+every full-resolution frame was thrown away by the browser. Viewers now
+report the size they display the frame at (container width times
+devicePixelRatio, window height), and frames are encoded for the largest
+of them:
+
+- screencast frames are scaled by Chrome itself (maxWidth/maxHeight)
+- screenshot frames are decoded, resized and re-encoded once here
+
+Frames are also cut into SCANNER_ROI_TILE pixel tiles with a content hash
+each (TileGrid) while a viewer takes the tile stream (frame_stream.tile_events)
+or SCANNER_FRAME_ROI=1 is set. Clients then get just the tiles whose hashes
+changed, with their positions: the tile stream works this out per client,
+and in ROI mode polling clients that hold the previous frame get the tiles
+that changed since it.
+
+Overlay coordinates stay in page (CSS) pixels inside the scanner; what is
+sent to clients is rescaled with scale_elements() to the pixels of the frame
+they were sent with, and clicks come back divided by the same scale.
+
+Needs Pillow for the screenshot path and ROI; without it frames are sent at
+capture size, as before.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from frame_capture import PIL_FORMATS, FRAME_QUALITY, frame_bytes, frame_hash
+from scanner_logging import get_logger
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+log = get_logger('encoding')
+
+ROI_ENABLED = os.environ.get('SCANNER_FRAME_ROI', '0').lower() in ('1', 'true', 'yes')
+ROI_TILE = int(os.environ.get('SCANNER_ROI_TILE', '64'))
+# Encoded tiles kept for reuse across frames and clients
+TILE_CACHE_SIZE = 4096
+
+# Reports from polling viewers lapse after this many seconds; streaming
+# viewers keep theirs until the stream closes
+SIZE_TTL = 10.0
+# Requested sizes below this are treated as bogus
+MIN_VIEW_WIDTH = 160
+
+ENCODE_FORMATS = dict(PIL_FORMATS, png='PNG')
+
+
+class ViewerSizes:
+    """Display sizes the session's viewers asked for, by viewer id"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sizes = {}  # viewer -> (width, height, reported, streaming)
+        self.tile_streams = 0
+
+    def report(self, viewer, width, height, streaming=False):
+        try:
+            width, height = int(width), int(height)
+        except (TypeError, ValueError):
+            return False
+        if width < MIN_VIEW_WIDTH or height < MIN_VIEW_WIDTH // 2:
+            return False
+        with self.lock:
+            previous = self.sizes.get(viewer)
+            streaming = streaming or (previous is not None and previous[3])
+            self.sizes[viewer] = (width, height, time.monotonic(), streaming)
+        return previous is None or previous[:2] != (width, height)
+
+    def forget(self, viewer):
+        with self.lock:
+            self.sizes.pop(viewer, None)
+
+    @contextmanager
+    def tile_stream(self):
+        """Frames are cut into tiles while any tile stream is open"""
+        with self.lock:
+            self.tile_streams += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.tile_streams -= 1
+
+    def wants_tiles(self):
+        return self.tile_streams > 0
+
+    def size(self):
+        """(width, height) covering every current viewer, or None for full size"""
+        now = time.monotonic()
+        with self.lock:
+            live = [s for s in self.sizes.values() if s[3] or now - s[2] < SIZE_TTL]
+        if not live:
+            return None
+        return max(s[0] for s in live), max(s[1] for s in live)
+
+    def summary(self):
+        return {'viewers': len(self.sizes), 'tile_streams': self.tile_streams, 'size': self.size()}
+
+
+def fit_scale(width, height, view):
+    """Largest scale <= 1 that fits a width x height page into view"""
+    if not view or not width or not height:
+        return 1.0
+    return min(1.0, view[0] / width, view[1] / height)
+
+
+def scale_elements(elements, scale):
+    """Overlay entries in the pixels of a frame encoded at `scale`"""
+    if not scale or scale == 1.0:
+        return list(elements)
+    scaled = []
+    for element in elements:
+        element = dict(element)
+        for key in ('x', 'y', 'width', 'height'):
+            if key in element:
+                element[key] = round(element[key] * scale, 1)
+        scaled.append(element)
+    return scaled
+
+
+def _encode(image, image_format, quality):
+    buffered = io.BytesIO()
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    # Fast zlib level: a live-view frame is sent once, not archived
+    image.save(buffered, format=ENCODE_FORMATS[image_format], quality=quality, compress_level=1)
+    return base64.b64encode(buffered.getvalue()).decode()
+
+
+class TileGrid:
+    """
+    One encoded frame cut into tile x tile squares, with a content hash per
+    tile. Two grids of the same shape differ exactly in the tiles whose
+    hashes differ; tiles are encoded on demand and cached by hash, so a tile
+    several clients (or frames) need is encoded once.
+    """
+
+    def __init__(self, image, image_format, quality, tile, cache):
+        self.image = image
+        self.size = image.size
+        self.format = image_format
+        self.quality = quality
+        self.tile = tile
+        self.cache = cache
+        self.boxes = [(left, top, min(left + tile, image.width), min(top + tile, image.height))
+                      for top in range(0, image.height, tile) for left in range(0, image.width, tile)]
+        self.hashes = tile_hashes(image, self.boxes)
+
+    def compatible(self, other):
+        return other is not None and other.size == self.size and other.tile == self.tile
+
+    def changed(self, other):
+        """Indexes of the tiles that differ from grid `other` (same shape)"""
+        return [i for i, (mine, theirs) in enumerate(zip(self.hashes, other.hashes)) if mine != theirs]
+
+    def area(self, indexes):
+        return sum((self.boxes[i][2] - self.boxes[i][0]) * (self.boxes[i][3] - self.boxes[i][1]) for i in indexes)
+
+    def tile_payload(self, index):
+        """{'x', 'y', 'width', 'height', 'base64'} of one tile"""
+        box = self.boxes[index]
+        key = (self.hashes[index], box[2] - box[0], box[3] - box[1], self.format)
+        payload = self.cache.get(key)
+        if payload is None:
+            payload = self.cache.put(key, _encode(self.image.crop(box), self.format, self.quality))
+        return {'x': box[0], 'y': box[1], 'width': box[2] - box[0], 'height': box[3] - box[1], 'base64': payload}
+
+    def delta(self, other):
+        """
+        Changed tile payloads turning grid `other` into this one; None when
+        a full frame must be sent instead (other shape, or more than half
+        the frame changed, at which point the tiles cost more than the frame)
+        """
+        if not self.compatible(other):
+            return None
+        changed = self.changed(other)
+        if self.area(changed) > self.size[0] * self.size[1] // 2:
+            return None
+        return [self.tile_payload(i) for i in changed]
+
+
+def tile_hashes(image, boxes):
+    """Content hashes of an image's tiles, in the order of boxes"""
+    return [hashlib.blake2b(image.crop(box).tobytes(), digest_size=8).digest() for box in boxes]
+
+
+class TileCache:
+    """Bounded LRU of encoded tiles, shared by the grids of one encoder"""
+
+    def __init__(self, size=TILE_CACHE_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is not None:
+                self.entries.move_to_end(key)
+            return payload
+
+    def put(self, key, payload):
+        with self.lock:
+            self.entries[key] = payload
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return payload
+
+
+class FrameEncoder:
+    """
+    Turns captured frames into the frames the viewers get: resized to the
+    negotiated size and, when a viewer wants tiles (the tile stream, or ROI
+    polling), cut into a TileGrid. In ROI mode the frame also carries the
+    tiles that changed since the previous frame. One per pipeline; only the
+    capture thread uses it.
+    """
+
+    def __init__(self, sizes, roi=ROI_ENABLED, tile=ROI_TILE, quality=FRAME_QUALITY):
+        self.sizes = sizes
+        self.roi = roi
+        self.tile = tile
+        self.quality = quality
+        self.cache = TileCache()
+        self.previous = None  # TileGrid of the previous frame, for the ROI tiles
+        self.warned = False
+
+    def target(self, page_width, page_height):
+        """Encoded size for a page of that CSS size"""
+        scale = fit_scale(page_width, page_height, self.sizes.size())
+        return max(1, round(page_width * scale)), max(1, round(page_height * scale))
+
+    def encode(self, frame):
+        """Return frame with width/height/scale (and its tile grid when wanted) set"""
+        view = self.sizes.size()
+        tiled = self.roi or self.sizes.wants_tiles()
+        metadata = frame.get('metadata') or {}
+        limit = frame.get('limit')
+        if limit and metadata.get('deviceWidth') and not tiled:
+            # A screencast frame Chrome already scaled to fit `limit`
+            scale = fit_scale(metadata['deviceWidth'], metadata['deviceHeight'], limit)
+            return dict(frame, width=round(metadata['deviceWidth'] * scale),
+                        height=round(metadata['deviceHeight'] * scale), scale=round(scale, 4))
+        if Image is None:
+            if (view or tiled) and not self.warned:
+                log.warning("Pillow is not installed: sending whole frames at capture size")
+                self.warned = True
+            return frame
+        if view is None and not tiled:
+            # Nothing asked for: pass the capture through without decoding
+            return frame
+
+        started = time.perf_counter()
+        image = Image.open(io.BytesIO(frame_bytes(frame)))
+        # Screencast frames arrive already scaled by Chrome; the metadata
+        # carries the page size they were scaled from
+        page_width = metadata.get('deviceWidth') or image.width
+        page_height = metadata.get('deviceHeight') or image.height
+        size = self.target(page_width, page_height)
+
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        encoded = dict(frame)
+        if abs(image.width - size[0]) > 1 or abs(image.height - size[1]) > 1:
+            image = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+            encoded['base64'] = _encode(image, frame['format'], self.quality)
+            encoded['hash'] = frame_hash(encoded['base64'])
+            encoded['size'] = len(encoded['base64']) * 3 // 4 - encoded['base64'][-2:].count('=')
+            encoded.pop('bytes', None)
+        encoded['width'], encoded['height'] = image.size
+        encoded['scale'] = round(image.width / page_width, 4)
+
+        if tiled:
+            grid = encoded['tile_grid'] = TileGrid(image, frame['format'], self.quality, self.tile, self.cache)
+            if self.roi:
+                encoded['tiles'] = grid.delta(self.previous)
+            self.previous = grid
+        encoded['timings'] = dict(frame.get('timings', {}), scale_ms=round((time.perf_counter() - started) * 1000, 2))
+        return encoded
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Adaptive live-view frame rate for the Geico scanner
+Capture used to run flat out (a fixed 10ms pause, and a UI polling every
+50ms) whether anyone was watching or the page had not changed in minutes.
+The governor picks the capture rate from three inputs instead:
+
+- viewer presence: open overlay streams and recent /get-screenshot polls
+- page activity: interactions from the UI (clicks, scrolls, forced clicks),
+  navigations and DOM version changes
+- CPU budget: the scanner process's CPU use, sampled once a second
+
+                      watched        unwatched
+    interaction/nav   SCANNER_FPS_MAX     SCANNER_FPS_ACTIVE
+    DOM activity      SCANNER_FPS_ACTIVE  SCANNER_FPS_WATCHED
+    static            SCANNER_FPS_WATCHED SCANNER_FPS_IDLE
+
+Interactions and navigations count for SCANNER_FPS_BURST_SECONDS, DOM
+activity for SCANNER_FPS_ACTIVE_SECONDS. When the process uses more than
+SCANNER_CPU_BUDGET cores the rate is scaled down (never below the idle
+rate) until it fits again. The current target is served by /get-status and
+sent to the UI, which paces its polling with it.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from scanner_logging import get_logger
+
+log = get_logger('governor')
+
+MAX_FPS = float(os.environ.get('SCANNER_FPS_MAX', '30'))
+ACTIVE_FPS = float(os.environ.get('SCANNER_FPS_ACTIVE', '10'))
+WATCHED_FPS = float(os.environ.get('SCANNER_FPS_WATCHED', '2'))
+IDLE_FPS = float(os.environ.get('SCANNER_FPS_IDLE', '1'))
+BURST_SECONDS = float(os.environ.get('SCANNER_FPS_BURST_SECONDS', '3'))
+ACTIVE_SECONDS = float(os.environ.get('SCANNER_FPS_ACTIVE_SECONDS', '5'))
+# Cores of CPU the scanner process may use before capture is slowed down
+CPU_BUDGET = float(os.environ.get('SCANNER_CPU_BUDGET', '0.8'))
+
+# A polling client counts as watching for this long after each poll
+VIEWER_LEASE = 3.0
+CPU_SAMPLE_INTERVAL = 1.0
+
+BURST, ACTIVE, WATCHED, IDLE = 'burst', 'active', 'watched', 'idle'
+
+
+class FrameRateGovernor:
+    """
+    Capture rate for one session. The UI side reports viewers and
+    interactions, the pipeline reports page activity and asks for the
+    interval before each capture. pause() sleeps until the next capture is
+    due but returns early when the rate goes up, so a click is not held
+    behind a one second idle pause.
+    """
+
+    def __init__(self, max_fps=MAX_FPS, active_fps=ACTIVE_FPS, watched_fps=WATCHED_FPS,
+                 idle_fps=IDLE_FPS, burst_seconds=BURST_SECONDS, active_seconds=ACTIVE_SECONDS,
+                 cpu_budget=CPU_BUDGET):
+        self.rates = {BURST: max_fps, ACTIVE: active_fps, WATCHED: watched_fps, IDLE: idle_fps}
+        self.burst_seconds = burst_seconds
+        self.active_seconds = active_seconds
+        self.cpu_budget = cpu_budget
+        self.condition = threading.Condition()
+        self.streams = 0
+        self.last_poll = 0.0
+        self.last_interaction = 0.0
+        self.last_activity = 0.0
+        self.interactions = 0
+        self.navigations = 0
+        self.cpu_usage = 0.0
+        self.cpu_scale = 1.0
+        self.cpu_sample = (time.monotonic(), time.process_time())
+        self.level = IDLE
+        self.target = idle_fps
+
+    # Viewer presence
+
+    @contextmanager
+    def watching(self):
+        """Count a streaming viewer for the duration of the block"""
+        with self.condition:
+            self.streams += 1
+            self.condition.notify_all()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.streams -= 1
+
+    def viewer_polled(self):
+        with self.condition:
+            wake = not self._watched(time.monotonic())
+            self.last_poll = time.monotonic()
+            if wake:
+                self.condition.notify_all()
+
+    def _watched(self, now):
+        return self.streams > 0 or now - self.last_poll < VIEWER_LEASE
+
+    @property
+    def watched(self):
+        with self.condition:
+            return self._watched(time.monotonic())
+
+    # Page activity
+
+    def interaction(self):
+        """A click, scroll or other input driven from the UI: burst now"""
+        with self.condition:
+            self.last_interaction = time.monotonic()
+            self.interactions += 1
+            self.condition.notify_all()
+
+    def navigation(self):
+        """The page loaded a new document"""
+        with self.condition:
+            self.last_interaction = time.monotonic()
+            self.navigations += 1
+            self.condition.notify_all()
+
+    def activity(self):
+        """The DOM, layout or scroll position changed"""
+        with self.condition:
+            self.last_activity = time.monotonic()
+
+    # Rate
+
+    def _sample_cpu(self, now):
+        wall, cpu = self.cpu_sample
+        if now - wall < CPU_SAMPLE_INTERVAL:
+            return
+        process = time.process_time()
+        self.cpu_usage = (process - cpu) / (now - wall)
+        self.cpu_sample = (now, process)
+        floor = self.rates[IDLE] / self.rates[BURST]
+        if self.cpu_usage > self.cpu_budget:
+            self.cpu_scale = max(floor, self.cpu_scale * self.cpu_budget / self.cpu_usage)
+        else:
+            self.cpu_scale = min(1.0, self.cpu_scale * 1.25)
+
+    def target_fps(self):
+        """Frames per second capture should run at right now"""
+        now = time.monotonic()
+        with self.condition:
+            self._sample_cpu(now)
+            watched = self._watched(now)
+            if now - self.last_interaction < self.burst_seconds:
+                level = BURST if watched else ACTIVE
+            elif now - self.last_activity < self.active_seconds:
+                level = ACTIVE if watched else WATCHED
+            else:
+                level = WATCHED if watched else IDLE
+            target = max(self.rates[IDLE], self.rates[level] * self.cpu_scale)
+            if level != self.level:
+                log.debug("Frame rate %s -> %s (%.1f fps)", self.level, level, target)
+            self.level = level
+            self.target = target
+            return target
+
+    def interval(self):
+        return 1.0 / self.target_fps()
+
+    def pause(self, seconds):
+        """
+        Sleep up to `seconds`, returning early (True) when a viewer arrives,
+        an interaction or navigation happens or wake() is called
+        """
+        if seconds <= 0:
+            return False
+        with self.condition:
+            return self.condition.wait(seconds)
+
+    def wake(self):
+        with self.condition:
+            self.condition.notify_all()
+
+    def summary(self):
+        now = time.monotonic()
+        with self.condition:
+            return {
+                'target_fps': round(self.target, 1),
+                'level': self.level,
+                'watched': self._watched(now),
+                'streams': self.streams,
+                'interactions': self.interactions,
+                'navigations': self.navigations,
+                'cpu_usage': round(self.cpu_usage, 2),
+                'cpu_scale': round(self.cpu_scale, 2),
+            }
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Binary live-view streaming for the Geico scanner
+Frames are pushed as raw image bytes over a multipart/x-mixed-replace response
+(the MJPEG transport an <img> tag understands natively), so there is no base64
+inflation and no JSON parse per frame. Detected element overlays travel on a
+separate Server-Sent Events stream and are only sent when they change.
+
+tile_events() is the delta alternative for canvas clients: consecutive frames
+usually differ in a few tiles (a blinking cursor, a highlight), so each
+client is sent only the tiles whose hashes differ from the frame it holds.
+"""
+
+import json
+import threading
+import time
+
+from frame_capture import frame_bytes
+
+STREAM_BOUNDARY = 'frame'
+FRAME_STREAM_MIMETYPE = f'multipart/x-mixed-replace; boundary={STREAM_BOUNDARY}'
+EVENT_STREAM_MIMETYPE = 'text/event-stream'
+
+# Headers that stop proxies and browsers from buffering the streams
+STREAM_HEADERS = {
+    'Cache-Control': 'no-cache, no-store, must-revalidate',
+    'X-Accel-Buffering': 'no',
+}
+
+
+class FrameBroadcaster:
+    """
+    Latest-value hub between the scan loop and streaming clients.
+    Publishing never blocks on slow viewers: each client waits for the
+    sequence number to move and then reads whatever frame is current,
+    so a slow client simply skips stale frames.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.frame = None
+        self.sequence = 0
+        self.elements = []
+        self.elements_version = 0
+        self._elements_key = None
+
+    def publish_frame(self, frame):
+        with self.condition:
+            self.frame = frame
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def publish_elements(self, elements):
+        """Bump the overlay version only when the element set actually changed"""
+        key = json.dumps(elements, sort_keys=True, default=str)
+        with self.condition:
+            if key == self._elements_key:
+                return False
+            self._elements_key = key
+            self.elements = list(elements)
+            self.elements_version += 1
+            self.condition.notify_all()
+            return True
+
+    def reset(self):
+        with self.condition:
+            self.frame = None
+            self.elements = []
+            self._elements_key = None
+            self.elements_version += 1
+            self.condition.notify_all()
+
+    def wait_for_frame(self, last_sequence, timeout):
+        """Return (sequence, frame) once a newer frame exists, or None on timeout"""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.frame is not None and self.sequence != last_sequence, timeout)
+            if self.frame is None or self.sequence == last_sequence:
+                return None
+            return self.sequence, self.frame
+
+    def wait_for_elements(self, last_version, timeout):
+        """Return (version, elements) once the overlay changed, or None on timeout"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.elements_version != last_version, timeout)
+            if self.elements_version == last_version:
+                return None
+            return self.elements_version, self.elements
+
+
+def multipart_frames(broadcaster, keepalive=5.0):
+    """Generator for a multipart/x-mixed-replace response of raw frame bytes"""
+    sequence = -1
+    while True:
+        latest = broadcaster.wait_for_frame(sequence, keepalive)
+        if latest is None:
+            continue
+        sequence, frame = latest
+        raw = frame_bytes(frame)
+        yield (f"--{STREAM_BOUNDARY}\r\n"
+               f"Content-Type: {frame['mime']}\r\n"
+               f"Content-Length: {len(raw)}\r\n"
+               f"X-Frame-Sequence: {sequence}\r\n\r\n").encode() + raw + b"\r\n"
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def overlay_events(broadcaster, get_stats, stats_interval=1.0, keepalive=15.0):
+    """
+    Generator for a text/event-stream response. Sends an 'elements' event
+    whenever the overlay changes and a small 'stats' event (fps, status)
+    at most once per stats_interval when those values change.
+    """
+    version = -1
+    last_stats = None
+    last_stats_time = 0.0
+    last_sent = time.time()
+    while True:
+        latest = broadcaster.wait_for_elements(version, stats_interval)
+        if latest is not None:
+            version, elements = latest
+            last_sent = time.time()
+            yield _sse('elements', {'version': version, 'elements': elements})
+
+        now = time.time()
+        if now - last_stats_time >= stats_interval:
+            last_stats_time = now
+            stats = get_stats()
+            if stats != last_stats:
+                last_stats = stats
+                last_sent = now
+                yield _sse('stats', stats)
+
+        if now - last_sent >= keepalive:
+            # SSE comment keeps idle connections from being reaped
+            last_sent = now
+            yield ": keepalive\n\n"
+
+
+def tile_events(broadcaster, keepalive=15.0):
+    """
+    Generator for a text/event-stream of 'frame' events, each carrying the
+    tiles (x, y, width, height, base64) that turn the client's current frame
+    into the newest one. The client's state is the TileGrid it was last
+    sent; a frame without a grid (no Pillow) or of another shape goes out
+    whole, as a single tile with full set.
+    """
+    sequence = -1
+    sent = None
+    last_sent = time.time()
+    while True:
+        latest = broadcaster.wait_for_frame(sequence, keepalive)
+        now = time.time()
+        if latest is None:
+            if now - last_sent >= keepalive:
+                last_sent = now
+                yield ": keepalive\n\n"
+            continue
+        sequence, frame = latest
+        grid = frame.get('tile_grid')
+        tiles = grid.delta(sent) if grid is not None else None
+        if tiles == []:
+            continue
+        full = tiles is None
+        if full:
+            tiles = [{'x': 0, 'y': 0, 'width': frame.get('width'), 'height': frame.get('height'),
+                      'base64': frame['base64']}]
+        sent = grid
+        last_sent = now
+        yield _sse('frame', {'sequence': sequence, 'full': full, 'mime': frame['mime'],
+                             'width': frame.get('width'), 'height': frame.get('height'),
+                             'scale': frame.get('scale', 1.0), 'tiles': tiles})
@@ -18,14 +18,21 @@ import io
 import time
 import threading
 import json
-import subprocess
+import shutil
 from PIL import Image
 import sys
 
+from dom_watch import DomChangeWatcher
+from process_cleanup import driver_process_tree, terminate, sweep_orphans
+from profile_cache import ProfileTemplate
+
 app = Flask(__name__)
 
 # Global variables
 driver = None
+driver_processes = {}  # chromedriver/Chrome tree of the current driver
+profile_dir = None
+profile_template = ProfileTemplate()
 is_scanning = False
 scan_thread = None
 current_screenshot = None
@@ -548,19 +555,38 @@ HTML_TEMPLATE = '''
 '''
 
 def kill_existing_chrome():
-    """Kill any existing Chrome processes to avoid conflicts"""
+    """Reap scanner browsers leaked by earlier runs (other Chrome instances are left alone)"""
     try:
-        subprocess.run(['pkill', '-f', 'chrome'], capture_output=True)
-        subprocess.run(['pkill', '-f', 'chromium'], capture_output=True)
-        time.sleep(2)
-    except:
-        pass
+        sweep_orphans()
+    except Exception as e:
+        print(f"[DEBUG] Orphan sweep failed: {e}")
+
+def quit_driver():
+    """Quit the driver and reap whatever is left of the process tree it started"""
+    global driver, driver_processes, profile_dir
+    
+    if driver:
+        driver_processes.update(driver_process_tree(driver))
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        driver = None
+    terminate(driver_processes)
+    driver_processes = {}
+    if profile_dir:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        profile_dir = None
 
 def setup_driver():
     """Setup Chrome driver with appropriate options"""
-    global driver
+    global driver, driver_processes, profile_dir
     
+    # Scanner-named profile so the orphan sweeper can find this browser if it leaks
+    # Starts from the warmed template profile when the scanner server has built one
+    profile_dir = profile_template.clone()
     chrome_options = Options()
+    chrome_options.add_argument(f'--user-data-dir={profile_dir}')
     chrome_options.add_argument('--headless')
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
@@ -571,6 +597,7 @@ def setup_driver():
     chrome_options.add_experimental_option('useAutomationExtension', False)
     
     driver = webdriver.Chrome(options=chrome_options)
+    driver_processes = driver_process_tree(driver)
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     
     # Initialize tracking variables
@@ -873,6 +900,7 @@ def scan_loop():
         driver.get('https://gateway.geico.com/')
         print(f"[DEBUG] Navigated to: {driver.current_url}")
         current_status = "Loading Geico gateway..."
+        dom_watcher = DomChangeWatcher(driver)
         
         while is_scanning:
             try:
@@ -881,9 +909,6 @@ def scan_loop():
                 current_screenshot = screenshot
                 fps_counter += 1
                 
-                # Clear previous detected elements
-                detected_elements = []
-                
                 # Check current URL for context
                 current_url = driver.current_url
                 
@@ -899,13 +924,16 @@ def scan_loop():
                             print("[DEBUG] Checking for Commercial Auto tab...")
                             check_and_click_commercial_auto()
                 
-                # Detect elements based on page context
-                if 'gateway.geico.com' in current_url:
-                    # Login page elements
-                    detect_login_elements()
-                else:
-                    # Other page elements
-                    detect_general_elements()
+                # Detect elements based on page context, only when the page changed;
+                # otherwise keep the previous detected elements
+                if dom_watcher.changed():
+                    detected_elements = []
+                    if 'gateway.geico.com' in current_url:
+                        # Login page elements
+                        detect_login_elements()
+                    else:
+                        # Other page elements
+                        detect_general_elements()
                 
                 time.sleep(0.1)  # Small delay to prevent overwhelming the system
                 
@@ -916,8 +944,7 @@ def scan_loop():
     except Exception as e:
         print(f"Fatal error in scan_loop: {e}")
     finally:
-        if driver:
-            driver.quit()
+        quit_driver()
 
 def detect_login_elements():
     """Detect login page elements"""
@@ -1023,6 +1050,9 @@ def index():
 def start_scan():
     global is_scanning, scan_thread, commercial_auto_clicked, commercial_click_attempts
     
+    if scan_thread is not None and scan_thread.is_alive() and not is_scanning:
+        return jsonify({'status': 'error', 'message': 'Previous scan is still stopping'})
+    
     if not is_scanning:
         is_scanning = True
         commercial_auto_clicked = False
@@ -1036,12 +1066,11 @@ def start_scan():
 
 @app.route('/stop-scan', methods=['POST'])
 def stop_scan():
-    global is_scanning, driver
+    global is_scanning
     
+    # The scan thread quits the driver itself (scan_loop's finally) once its
+    # current step is done, so the driver is never quit mid-command
     is_scanning = False
-    if driver:
-        driver.quit()
-        driver = None
     
     return jsonify({'status': 'success', 'message': 'Scan stopped'})
 
@@ -17,18 +17,33 @@ import io
 import time
 import threading
 import json
-import subprocess
 from PIL import Image
 import sys
 
+import session_registry
+from frame_capture import frame_hash
+from frame_governor import FrameRateGovernor
+from scan_pipeline import AUTOMATION_INTERVAL
+from profile_cache import ProfileTemplate
+from process_cleanup import driver_process_tree, terminate, sweep_orphans
+from session_state import LiveView, DriverCommands
+from scanner_logging import get_logger
+
 app = Flask(__name__)
+log = get_logger('capture')
 
 # Global variables
 driver = None
+# chromedriver/Chrome processes this scanner's driver started, reaped on close
+driver_processes = {}
 is_scanning = False
 scan_thread = None
-current_screenshot = None
-detected_elements = []
+# Frame/element snapshots read by the request threads, and the queue they
+# reach the driver through (the scan thread runs it between frames)
+live_view = LiveView()
+driver_commands = DriverCommands()
+# Loop rate from viewer polls, UI interactions and frame changes
+frame_governor = FrameRateGovernor()
 fps_counter = 0
 last_fps_time = time.time()
 current_status = "Ready to scan"  # New status variable
@@ -400,23 +415,36 @@ HTML_TEMPLATE = '''
         }
         
         function startUpdating() {
-            console.log('startUpdating called - setting up interval');
-            updateInterval = setInterval(() => {
+            console.log('startUpdating called - polling at the server frame rate');
+            function poll() {
+                if (document.hidden) {
+                    // Hidden tabs do not poll, which lets the scanner idle
+                    updateInterval = setTimeout(poll, 1000);
+                    return;
+                }
+                let targetFps = 1;
                 fetch('/get-screenshot')
                     .then(response => response.json())
                     .then(data => {
+                        targetFps = data.target_fps || 1;
                         console.log('Screenshot data received:', data.screenshot ? 'has screenshot' : 'no screenshot', 'elements:', data.elements ? data.elements.length : 0);
                         if (data.screenshot) {
                             updateScreenshot(data.screenshot, data.elements);
-                            document.getElementById('fpsCounter').textContent = `FPS: ${data.fps || 0}`;
+                            document.getElementById('fpsCounter').textContent = `FPS: ${data.fps || 0} / ${targetFps}`;
                         } else {
                             console.log('No screenshot in response');
                         }
                     })
                     .catch(error => {
                         console.error('Error getting screenshot:', error);
+                    })
+                    .finally(() => {
+                        if (updateInterval) {
+                            updateInterval = setTimeout(poll, Math.max(50, 1000 / targetFps));
+                        }
                     });
-            }, 50); // Update every 50ms for much higher FPS
+            }
+            updateInterval = setTimeout(poll, 0);
         }
         
         function updateScreenshot(screenshotData, elements) {
@@ -528,7 +556,7 @@ HTML_TEMPLATE = '''
             button.textContent = 'Start Quote';
             
             if (updateInterval) {
-                clearInterval(updateInterval);
+                clearTimeout(updateInterval);
                 updateInterval = null;
             }
         }
@@ -551,7 +579,7 @@ def index():
 @app.route('/start-scan', methods=['POST'])
 def start_scan():
     try:
-        global driver, is_scanning, scan_thread
+        global is_scanning, scan_thread
         
         print("[API] Start scan requested", flush=True)
         print(f"[API] Request method: {request.method}", flush=True)
@@ -559,20 +587,19 @@ def start_scan():
         print(f"[API] Request data: {request.get_data()}", flush=True)
         sys.stdout.flush()
         
-        # Clean up any existing browser instance first
-        if driver:
-            print("[API] Cleaning up existing driver")
-            try:
-                driver.quit()
-            except:
-                pass
-            driver = None
-        
-        # Wait a bit for any existing scan to fully stop
-        if is_scanning:
+        # Let any existing scan close its own browser first; quit it only if
+        # the scan thread does not get there in time
+        if scan_thread is not None and scan_thread.is_alive():
             print("[API] Stopping existing scan")
             is_scanning = False
-            time.sleep(0.5)
+            driver_commands.close()
+            scan_thread.join(timeout=10)
+            if scan_thread.is_alive() and driver:
+                print("[API] Scan thread did not stop, quitting its driver")
+                try:
+                    driver.quit()
+                except:
+                    pass
         
         print("[API] Starting new scan thread")
         is_scanning = True
@@ -592,24 +619,26 @@ def start_scan():
 
 @app.route('/stop-scan', methods=['POST'])
 def stop_scan():
-    global is_scanning, driver
+    global is_scanning
     
+    # The scan thread quits the driver itself once its current step is done
     is_scanning = False
-    if driver:
-        driver.quit()
-        driver = None
+    driver_commands.close()
     
     return jsonify({'status': 'stopped'})
 
 @app.route('/get-screenshot')
 def get_screenshot():
-    global current_screenshot, detected_elements, fps_counter
+    global fps_counter
     
-    if current_screenshot:
+    frame, elements = live_view.snapshot()
+    frame_governor.viewer_polled()
+    if frame is not None:
         return jsonify({
-            'screenshot': current_screenshot,
-            'elements': detected_elements,
-            'fps': fps_counter
+            'screenshot': frame.data,
+            'elements': elements.elements,
+            'fps': fps_counter,
+            'target_fps': frame_governor.target
         })
     else:
         return jsonify({'screenshot': None, 'elements': [], 'fps': 0})
@@ -634,6 +663,7 @@ def click_element():
         
         print(f"[DEBUG] Clicking element: {label} at ({x}, {y})")
         current_status = f"Clicking: {label}"
+        frame_governor.interaction()
         
         # Use JavaScript to click at exact coordinates
         click_script = """
@@ -675,7 +705,9 @@ def click_element():
         }
         """
         
-        result = driver.execute_script(click_script, x, y)
+        # Runs on the scan thread between frames
+        result = driver_commands.submit(lambda driver: driver.execute_script(click_script, x, y),
+                                        label='click-element')
         print(f"[DEBUG] Click result: {result}")
         
         # Wait a moment for any page changes
@@ -707,18 +739,21 @@ def scroll_page():
         
         print(f"[DEBUG] Scrolling page: {direction}")
         current_status = f"Scrolling {direction}..."
+        frame_governor.interaction()
         
         # Scroll the page
-        if direction == 'down':
-            driver.execute_script("window.scrollBy(0, 300);")
-        elif direction == 'up':
-            driver.execute_script("window.scrollBy(0, -300);")
+        if direction in ('down', 'up'):
+            offset = 300 if direction == 'down' else -300
+            driver_commands.submit(lambda driver: driver.execute_script("window.scrollBy(0, arguments[0]);", offset),
+                                   label='scroll-page')
         
         # Wait a moment for elements to update
         time.sleep(0.3)
         
         # Get current scroll position
-        scroll_pos = driver.execute_script("return {top: window.pageYOffset, height: document.documentElement.scrollHeight, viewport: window.innerHeight};")
+        scroll_pos = driver_commands.submit(lambda driver: driver.execute_script(
+            "return {top: window.pageYOffset, height: document.documentElement.scrollHeight, viewport: window.innerHeight};"),
+            label='scroll-position')
         
         return jsonify({
             'status': 'success',
@@ -734,38 +769,30 @@ def scroll_page():
         })
 
 def scan_geico_site():
-    global driver, is_scanning, current_screenshot, detected_elements, fps_counter, last_fps_time, current_status
+    global driver, driver_processes, is_scanning, fps_counter, last_fps_time, current_status
     
     print("\n[DEBUG] scan_geico_site() function called!", flush=True)
     sys.stdout.flush()
     
-    # Kill any existing Chrome processes first - more aggressive
-    import subprocess
     import os
-    import tempfile
     import shutil
     
-    print("[DEBUG] Killing existing Chrome processes...", flush=True)
-    sys.stdout.flush()
-    subprocess.run(['pkill', '-9', '-f', 'chrome'], capture_output=True)
-    subprocess.run(['pkill', '-9', '-f', 'chromium'], capture_output=True)
-    subprocess.run(['pkill', '-9', '-f', 'chromedriver'], capture_output=True)
-    time.sleep(1)  # Give time for processes to die
-    
-    # Write debug to file
-    with open('scanner_debug_thread.log', 'a') as f:
-        f.write(f"[DEBUG] {time.strftime('%Y-%m-%d %H:%M:%S')} Starting scan_geico_site function\n")
-        f.flush()
+    # Reap scanner browsers leaked by earlier runs; other Chrome instances
+    # (including other scanners' sessions) are left alone
+    print("[DEBUG] Sweeping orphaned scanner browsers...", flush=True)
+    try:
+        sweep_orphans()
+    except Exception as e:
+        print(f"[DEBUG] Orphan sweep failed: {e}")
     
-    print("[DEBUG] Starting scan_geico_site function")
+    log.info("Starting scan_geico_site function")
     temp_dir = None
+    debug_port = None
+    session_id = os.environ.get('SCANNER_SESSION', 'fixed')
     try:
         # Set up Chrome options
         current_status = "Setting up Chrome browser..."
-        with open('scanner_debug_thread.log', 'a') as f:
-            f.write(f"[DEBUG] {time.strftime('%Y-%m-%d %H:%M:%S')} Setting up Chrome options\n")
-            f.flush()
-        print("[DEBUG] Setting up Chrome options")
+        log.info("Setting up Chrome options")
         chrome_options = Options()
         chrome_options.add_argument('--no-sandbox')
         chrome_options.add_argument('--disable-dev-shm-usage')
@@ -775,14 +802,16 @@ def scan_geico_site():
         chrome_options.add_argument('--headless=new')
         # Add more arguments to fix Chrome startup issues
         chrome_options.add_argument('--disable-setuid-sandbox')
-        chrome_options.add_argument('--remote-debugging-port=9222')
+        debug_port = session_registry.allocate_port()
+        chrome_options.add_argument(f'--remote-debugging-port={debug_port}')
         chrome_options.add_argument('--disable-extensions')
         print("[DEBUG] Running in headless mode for server environment")
+        print(f"[DEBUG] Using DevTools port {debug_port} for session {session_id}")
         
         # Try to create a unique user data directory
         try:
-            # Create a unique temporary directory with timestamp
-            temp_dir = tempfile.mkdtemp(prefix=f'geico_scanner_{int(time.time())}_')
+            # Clone of the warmed template profile (GEICO assets already cached)
+            temp_dir = ProfileTemplate().clone()
             chrome_options.add_argument(f'--user-data-dir={temp_dir}')
             print(f"[DEBUG] Using temporary profile directory: {temp_dir}")
         except Exception as e:
@@ -802,7 +831,10 @@ def scan_geico_site():
         try:
             print("[DEBUG] Creating Chrome webdriver with options...")
             driver = webdriver.Chrome(options=chrome_options)
+            driver_processes = driver_process_tree(driver)
             print("[DEBUG] Chrome driver initialized successfully")
+            driver_commands.open()
+            session_registry.register(session_id, debug_port, temp_dir)
             driver.set_window_size(1920, 1080)
             current_status = "Chrome browser started"
             
@@ -814,12 +846,7 @@ def scan_geico_site():
         except Exception as chrome_error:
             print(f"[ERROR] Failed to initialize Chrome driver: {chrome_error}")
             current_status = f"Failed to start Chrome: {str(chrome_error)[:50]}"
-            # Write detailed error to log
-            with open('scanner_debug_thread.log', 'a') as f:
-                f.write(f"[ERROR] {time.strftime('%Y-%m-%d %H:%M:%S')} Chrome init error: {chrome_error}\n")
-                import traceback
-                f.write(traceback.format_exc())
-                f.flush()
+            log.exception("Chrome init error: %s", chrome_error)
             # Clean up temp directory if it exists
             if temp_dir and os.path.exists(temp_dir):
                 try:
@@ -869,32 +896,40 @@ def scan_geico_site():
             img = Image.open(io.BytesIO(screenshot))
             buffered = io.BytesIO()
             img.save(buffered, format="PNG")
-            current_screenshot = base64.b64encode(buffered.getvalue()).decode()
+            encoded = base64.b64encode(buffered.getvalue()).decode()
+            live_view.publish_frame({'base64': encoded, 'mime': 'image/png', 'hash': frame_hash(encoded)})
             print("[DEBUG] Initial screenshot successful")
             current_status = "Scanner ready"
         except Exception as e:
             print(f"[ERROR] Failed to take initial screenshot: {e}")
             current_status = f"Screenshot error: {str(e)[:50]}"
         
+        last_capture = 0.0
         while is_scanning:
             try:
-                # Take screenshot
-                screenshot = driver.get_screenshot_as_png()
-                img = Image.open(io.BytesIO(screenshot))
+                loop_started = time.time()
+                # Only the screenshot is paced by the governor (re-read every
+                # pass, so a click shortens the wait); the automation checks
+                # below run every pass
+                next_capture = last_capture + frame_governor.interval()
+                capture_due = loop_started >= next_capture
+                if capture_due:
+                    last_capture = loop_started
+                    next_capture = loop_started + frame_governor.interval()
+                    # Take screenshot
+                    screenshot = driver.get_screenshot_as_png()
+                    img = Image.open(io.BytesIO(screenshot))
                 
-                with open('scanner_debug_thread.log', 'a') as f:
-                    f.write(f"[DEBUG] {time.strftime('%Y-%m-%d %H:%M:%S')} Screenshot captured, size: {len(screenshot)} bytes\n")
-                    f.flush()
-                print(f"[DEBUG] Screenshot captured, size: {len(screenshot)} bytes")
+                    log.debug("Screenshot captured, size: %s bytes", len(screenshot))
                 
-                # Convert to base64
-                buffered = io.BytesIO()
-                img.save(buffered, format="PNG")
-                current_screenshot = base64.b64encode(buffered.getvalue()).decode()
+                    # Convert to base64
+                    buffered = io.BytesIO()
+                    img.save(buffered, format="PNG")
+                    encoded = base64.b64encode(buffered.getvalue()).decode()
+                    if live_view.publish_frame({'base64': encoded, 'mime': 'image/png', 'hash': frame_hash(encoded)}):
+                        frame_governor.activity()
                 
-                with open('scanner_debug_thread.log', 'a') as f:
-                    f.write(f"[DEBUG] {time.strftime('%Y-%m-%d %H:%M:%S')} Screenshot converted to base64, length: {len(current_screenshot)}\n")
-                    f.flush()
+                    log.debug("Screenshot converted to base64, length: %s", len(encoded))
                 
                 # Detect elements
                 elements_found = []
@@ -1834,23 +1869,27 @@ def scan_geico_site():
                 # Skip cursor:pointer scanning as it creates too many duplicates
                 # The above methods should catch all important clickable elements
                 
-                # Update global detected_elements
-                detected_elements = elements_found
+                # Publish this frame's elements for the request threads
+                live_view.publish_elements(elements_found)
                 
                 # Update status if we're not in a special state
                 if not current_status.startswith("Login") and not current_status.startswith("Clicking"):
                     current_status = f"Scanning... Found {len(elements_found)} elements"
                 
                 # Update FPS counter
-                frame_count += 1
+                if capture_due:
+                    frame_count += 1
                 current_time = time.time()
                 if current_time - last_time >= 1.0:
                     fps_counter = frame_count
                     frame_count = 0
                     last_time = current_time
                 
-                # Maximum FPS - minimal delay for ~50+ FPS
-                time.sleep(0.01)
+                # Run the automation at least every AUTOMATION_INTERVAL even
+                # when the governor has capture down to about 1 fps, running
+                # driver commands queued by the request handlers meanwhile
+                delay = min(next_capture, loop_started + AUTOMATION_INTERVAL) - time.time()
+                driver_commands.serve(driver, max(0.01, delay))
                 
             except Exception as e:
                 print(f"Error in scan loop: {e}")
@@ -1860,23 +1899,26 @@ def scan_geico_site():
         print(f"[ERROR] Error initializing scanner: {e}")
         import traceback
         traceback.print_exc()
-        # Write error to debug log
-        with open('scanner_debug_thread.log', 'a') as f:
-            f.write(f"[ERROR] {time.strftime('%Y-%m-%d %H:%M:%S')} Error: {str(e)}\n")
-            f.flush()
-        # Ensure we reset the scanning state even on error
-        current_screenshot = None
-        detected_elements = []
+        log.error("Error: %s", e)
     
     finally:
         print("[DEBUG] Cleaning up scanner")
+        driver_commands.close()
         if driver:
+            # Chrome may have started more processes since launch
+            driver_processes.update(driver_process_tree(driver))
             try:
                 driver.quit()
             except:
                 pass
             driver = None
+        # Whatever quit() left behind of this driver's own tree, nothing else
+        terminate(driver_processes)
+        driver_processes = {}
         is_scanning = False
+        if debug_port is not None:
+            session_registry.unregister(session_id)
+            session_registry.release_port(debug_port)
         # Clean up temporary directory
         if temp_dir and os.path.exists(temp_dir):
             try:
@@ -1885,8 +1927,7 @@ def scan_geico_site():
             except Exception as e:
                 print(f"[DEBUG] Could not clean up temp directory: {e}")
         # Reset state
-        current_screenshot = None
-        detected_elements = []
+        live_view.clear()
         current_status = "Scanner stopped"
 
 if __name__ == '__main__':
@@ -5,33 +5,58 @@ A web-based scanner that captures screenshots and detects elements on Geico's we
 """
 
 from flask import Flask, render_template_string, jsonify, Response, request
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
-import base64
-import io
 import time
-import threading
 import json
 import subprocess
-from PIL import Image
-import sys
+import os
+import logging
+
+from scanner_logging import get_logger, capture_library_logging
+from frame_capture import capture_frame, CaptureStats, CAPTURE_BACKEND, FRAME_FORMAT, FRAME_QUALITY
+from session_pool import SessionPool, SessionPoolFull, SessionBusy, DEFAULT_SESSION_ID
+from browser_pool import WarmBrowserPool
+from cdp_screencast import ScreencastCapture
+from cdp_client import open_cdp_driver
+from scan_metrics import ScanMetrics, instrument_driver, PROMETHEUS_CONTENT_TYPE
+from text_index import with_text_index, COMMERCIAL_AUTO_LABELS
+from waits import Waiter
+from scan_pipeline import ScanPipeline
+import quote_flow
+from quote_flow import QuoteFlow
+import session_registry
+from frame_encoding import scale_elements
+from frame_stream import (multipart_frames, overlay_events, tile_events,
+                          FRAME_STREAM_MIMETYPE, EVENT_STREAM_MIMETYPE, STREAM_HEADERS)
 
 app = Flask(__name__)
 
+# Per-subsystem loggers (levels/rotation configured in scanner_logging.py)
+log = get_logger('scan')
+login_log = get_logger('login')
+commercial_log = get_logger('commercial_auto')
+
 # Global variables
-driver = None
-is_scanning = False
-scan_thread = None
-current_screenshot = None
-detected_elements = []
-fps_counter = 0
-last_fps_time = time.time()
-current_status = "Ready to scan"  # New status variable
+# Each quote's browser, frames and status live in a ScanSession; requests pick
+# the session with ?session=<id> (the UI uses 'default' unless the page URL
+# names one)
+session_pool = SessionPool()
+browser_pool = WarmBrowserPool()  # Pre-launched browsers handed to new sessions
+scan_metrics = ScanMetrics()  # Per-stage latency histograms and WebDriver call counts
+
+# Re-run element detection at least this often even if frames are identical
+FRAME_REDETECT_INTERVAL = 5.0
+
+# Seconds between keepalives on the overlay stream; a closed viewer is only
+# noticed (and the frame rate lowered) when a write to it fails
+VIEWER_KEEPALIVE = 5.0
+
+# First page of every quote; fixture_site.py serves an offline stand-in
+START_URL = os.environ.get('SCANNER_START_URL', 'https://gateway.geico.com/')
 
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -319,6 +344,37 @@ HTML_TEMPLATE = '''
     <script>
         let isScanning = false;
         let updateInterval = null;
+        let overlaySource = null;
+        let frameSource = null;
+        let currentElements = [];
+        
+        // Each tab drives the session named in its URL (?session=...)
+        const sessionId = new URLSearchParams(window.location.search).get('session') || 'default';
+        
+        function withSession(url) {
+            return url + (url.includes('?') ? '&' : '?') + 'session=' + encodeURIComponent(sessionId);
+        }
+        
+        // Frames are encoded at the size this tab shows them at; overlays and
+        // clicks are in the pixels of the frame they came with (currentScale
+        // frame pixels per page pixel)
+        const viewerId = Math.random().toString(36).slice(2);
+        let currentScale = 1;
+        
+        function viewSize() {
+            const display = document.getElementById('screenshotDisplay');
+            const ratio = window.devicePixelRatio || 1;
+            return {
+                width: Math.round((display.clientWidth || window.innerWidth) * ratio),
+                height: Math.round(window.innerHeight * ratio)
+            };
+        }
+        
+        function withView(url) {
+            const size = viewSize();
+            return url + (url.includes('?') ? '&' : '?') +
+                `viewer=${viewerId}&width=${size.width}&height=${size.height}`;
+        }
         
         // Initialize theme from localStorage
         if (localStorage.getItem('darkTheme') === 'true') {
@@ -332,7 +388,7 @@ HTML_TEMPLATE = '''
         }
         
         function scrollPage(direction) {
-            fetch('/scroll-page', {
+            fetch(withSession('/scroll-page'), {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -354,7 +410,7 @@ HTML_TEMPLATE = '''
             button.disabled = true;
             button.textContent = 'Clicking...';
             
-            fetch('/force-commercial-auto', {
+            fetch(withSession('/force-commercial-auto'), {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -405,7 +461,7 @@ HTML_TEMPLATE = '''
             document.querySelector('.commercial-auto-button').style.display = 'inline-block';
             
             console.log('Sending POST to /start-scan');
-            fetch('/start-scan', { method: 'POST' })
+            fetch(withSession('/start-scan'), { method: 'POST' })
                 .then(response => {
                     console.log('Response received:', response);
                     const contentType = response.headers.get('content-type');
@@ -423,6 +479,16 @@ HTML_TEMPLATE = '''
                         document.getElementById('statusMessage').textContent = 'Scanner started. Loading Geico website...';
                         console.log('Starting screenshot updates');
                         startUpdating();
+                    } else if (data.status === 'queued') {
+                        // The stream picks up once a browser slot frees
+                        document.getElementById('statusMessage').textContent = `All browsers busy - queued (position ${data.queue_position})`;
+                        startUpdating();
+                    } else if (data.status === 'busy') {
+                        document.getElementById('statusMessage').textContent = 'Scanner is at capacity: ' + data.message;
+                        resetButton();
+                    } else if (data.status === 'stopping') {
+                        document.getElementById('statusMessage').textContent = 'Previous scan is still stopping - try again in a moment';
+                        resetButton();
                     } else {
                         console.log('Unexpected status:', data.status);
                     }
@@ -435,117 +501,187 @@ HTML_TEMPLATE = '''
         }
         
         function startUpdating() {
-            console.log('startUpdating called - setting up interval');
-            updateInterval = setInterval(() => {
-                fetch('/get-screenshot')
+            console.log('startUpdating called');
+            if (window.EventSource) {
+                startStreaming();
+                return;
+            }
+            // Fallback for browsers without EventSource: poll JSON frames at the
+            // rate the server's frame governor is capturing at
+            console.log('EventSource not available - polling /get-screenshot');
+            let lastSequence = null;
+            let lastElementsVersion = null;
+            function poll() {
+                // With the previous frame on the canvas, ask for just the changed tiles
+                const query = lastSequence === null ? '' :
+                    `?since=${lastSequence}&elements=${lastElementsVersion}&roi=1`;
+                let targetFps = 1;
+                fetch(withSession(withView('/get-screenshot' + query)))
                     .then(response => response.json())
                     .then(data => {
+                        targetFps = data.target_fps || 1;
+                        currentScale = data.scale || 1;
+                        if (data.unchanged) {
+                            // Same frame as last time - only the overlay may have moved on
+                            if (data.elements) {
+                                lastElementsVersion = data.elements_version;
+                                currentElements = data.elements;
+                                renderOverlays(currentElements);
+                            }
+                            showFps(data);
+                            return;
+                        }
                         console.log('Screenshot data received:', data.screenshot ? 'has screenshot' : 'no screenshot', 'elements:', data.elements ? data.elements.length : 0);
-                        if (data.screenshot) {
-                            updateScreenshot(data.screenshot, data.elements);
-                            document.getElementById('fpsCounter').textContent = `FPS: ${data.fps || 0}`;
+                        if (data.screenshot || data.tiles) {
+                            lastSequence = data.sequence;
+                            lastElementsVersion = data.elements_version;
+                            updateScreenshot(data);
+                            showFps(data);
                         } else {
                             console.log('No screenshot in response');
                         }
                     })
                     .catch(error => {
                         console.error('Error getting screenshot:', error);
+                    })
+                    .finally(() => {
+                        if (updateInterval) {
+                            updateInterval = setTimeout(poll, Math.max(50, 1000 / targetFps));
+                        }
                     });
-            }, 50); // Update every 50ms for much higher FPS
+            }
+            updateInterval = setTimeout(poll, 0);
         }
         
-        function updateScreenshot(screenshotData, elements) {
-            const display = document.getElementById('screenshotDisplay');
-            const overlayContainer = document.getElementById('overlayContainer');
-            
-            // Update screenshot
-            display.innerHTML = `<img id="screenshotImage" src="data:image/png;base64,${screenshotData}" alt="Screenshot">`;
+        function stopUpdating() {
+            if (updateInterval) {
+                clearTimeout(updateInterval);
+                updateInterval = null;
+            }
+            if (overlaySource) {
+                overlaySource.close();
+                overlaySource = null;
+            }
+            if (frameSource) {
+                frameSource.close();
+                frameSource = null;
+            }
+        }
+        
+        function showFps(data) {
+            const target = data.target_fps ? ` / ${data.target_fps}` : '';
+            document.getElementById('fpsCounter').textContent = `FPS: ${data.fps || 0}${target}`;
+        }
+        
+        // A hidden tab is not watching: close its streams so the scanner drops
+        // to its idle frame rate, and reopen them when the tab is shown again
+        document.addEventListener('visibilitychange', function() {
+            if (!isScanning) {
+                return;
+            }
+            if (document.hidden) {
+                stopUpdating();
+            } else if (!overlaySource && !updateInterval) {
+                startUpdating();
+            }
+        });
+        
+        function startStreaming() {
+            // Frames arrive as the tiles that changed since the frame this tab
+            // holds and are composited on a canvas; overlays and fps/status
+            // arrive as small events only on change
+            frameSource = new EventSource(withSession(withView('/stream-tiles')));
+            frameSource.addEventListener('frame', function(event) {
+                drawFrame(JSON.parse(event.data));
+            });
+            frameSource.onerror = function(error) {
+                console.error('Frame stream error (will reconnect):', error);
+            };
             
-            // Wait for image to load before adding overlays
-            const img = document.getElementById('screenshotImage');
-            img.onload = function() {
-                // Clear previous overlays
-                overlayContainer.innerHTML = '';
-                
-                // Get image dimensions for scaling
-                const imgRect = img.getBoundingClientRect();
-                const container = document.querySelector('.screenshot-container');
-                const containerRect = container.getBoundingClientRect();
-                
-                // Calculate offset
-                const offsetX = (containerRect.width - imgRect.width) / 2;
-                const offsetY = (containerRect.height - imgRect.height) / 2;
-                
-                // Add element overlays
-                if (elements && elements.length > 0) {
-                    elements.forEach(element => {
-                        const overlay = document.createElement('div');
-                        overlay.className = 'element-overlay';
-                        
-                        // Scale coordinates to match displayed image size
-                        const scaleX = imgRect.width / img.naturalWidth;
-                        const scaleY = imgRect.height / img.naturalHeight;
-                        
-                        // Position relative to the image element inside the container
-                        const imgOffsetLeft = img.offsetLeft;
-                        const imgOffsetTop = img.offsetTop;
-                        
-                        overlay.style.left = (imgOffsetLeft + element.x * scaleX) + 'px';
-                        overlay.style.top = (imgOffsetTop + element.y * scaleY) + 'px';
-                        overlay.style.width = (element.width * scaleX) + 'px';
-                        overlay.style.height = (element.height * scaleY) + 'px';
-                        
-                        const label = document.createElement('div');
-                        label.className = 'element-label';
-                        label.textContent = element.label || 'Element';
-                        overlay.appendChild(label);
-                        
-                        // Add click handler
-                        overlay.addEventListener('click', function(e) {
-                            e.preventDefault();
-                            e.stopPropagation();
-                            
-                            console.log('Overlay clicked:', element.label, 'at', element.x + element.width/2, element.y + element.height/2);
-                            
-                            // Show visual feedback
-                            overlay.style.backgroundColor = 'rgba(0, 255, 0, 0.5)';
-                            overlay.style.borderColor = '#00ff00';
-                            
-                            // Send click request to backend
-                            console.log('Sending click request for:', element.label);
-                            fetch('/click-element', {
-                                method: 'POST',
-                                headers: {
-                                    'Content-Type': 'application/json',
-                                },
-                                body: JSON.stringify({
-                                    x: element.x + element.width / 2,
-                                    y: element.y + element.height / 2,
-                                    label: element.label
-                                })
-                            })
-                            .then(response => response.json())
-                            .then(data => {
-                                console.log('Click result:', data);
-                                // Reset visual feedback after a moment
-                                setTimeout(() => {
-                                    overlay.style.backgroundColor = 'rgba(255, 0, 0, 0.2)';
-                                    overlay.style.borderColor = 'red';
-                                }, 300);
-                            })
-                            .catch(error => {
-                                console.error('Error clicking element:', error);
-                                overlay.style.backgroundColor = 'rgba(255, 0, 0, 0.2)';
-                                overlay.style.borderColor = 'red';
-                            });
-                        });
-                        
-                        overlayContainer.appendChild(overlay);
-                    });
+            overlaySource = new EventSource(withSession(withView('/stream-elements')));
+            overlaySource.addEventListener('elements', function(event) {
+                const data = JSON.parse(event.data);
+                currentElements = data.elements || [];
+                renderOverlays(currentElements);
+            });
+            overlaySource.addEventListener('stats', function(event) {
+                const data = JSON.parse(event.data);
+                currentScale = data.scale || 1;
+                showFps(data);
+                document.getElementById('statusMessage').textContent = data.status || `Scanning... Found ${currentElements.length} elements`;
+            });
+            overlaySource.onerror = function(error) {
+                console.error('Overlay stream error (will reconnect):', error);
+            };
+        }
+        
+        // Tiles decode in parallel but are drawn strictly in frame order
+        let drawQueue = Promise.resolve();
+        
+        function decodeTile(mime, data) {
+            if (window.createImageBitmap) {
+                const bytes = Uint8Array.from(atob(data), c => c.charCodeAt(0));
+                return createImageBitmap(new Blob([bytes], {type: mime}));
+            }
+            return new Promise((resolve, reject) => {
+                const tile = new Image();
+                tile.onload = () => resolve(tile);
+                tile.onerror = reject;
+                tile.src = `data:${mime};base64,${data}`;
+            });
+        }
+        
+        function frameCanvas() {
+            let canvas = document.getElementById('screenshotImage');
+            if (!canvas) {
+                document.getElementById('screenshotDisplay').innerHTML = '<canvas id="screenshotImage"></canvas>';
+                canvas = document.getElementById('screenshotImage');
+            }
+            return canvas;
+        }
+        
+        function drawFrame(frame) {
+            // frame: {full, mime, width, height, tiles: [{x, y, base64}]}; a full
+            // frame is one tile covering the canvas and may resize it
+            const decoded = Promise.all(frame.tiles.map(tile => decodeTile(frame.mime || 'image/png', tile.base64)));
+            drawQueue = drawQueue.then(() => decoded).then(images => {
+                const canvas = frameCanvas();
+                let resized = false;
+                if (frame.full) {
+                    const width = frame.width || images[0].width;
+                    const height = frame.height || images[0].height;
+                    if (canvas.width !== width || canvas.height !== height) {
+                        canvas.width = width;
+                        canvas.height = height;
+                        resized = true;
+                    }
+                }
+                const context = canvas.getContext('2d');
+                frame.tiles.forEach((tile, i) => context.drawImage(images[i], tile.x, tile.y));
+                if (resized || !canvas.dataset.ready) {
+                    canvas.dataset.ready = 'true';
+                    renderOverlays(currentElements);
                 }
+            }).catch(error => {
+                console.error('Could not draw frame:', error);
+            });
+            return drawQueue;
+        }
+        
+        function updateScreenshot(data) {
+            const elements = data.elements;
+            currentElements = elements || [];
+            const frame = data.tiles ?
+                {full: false, mime: data.mime, tiles: data.tiles} :
+                {full: true, mime: data.mime, width: data.width, height: data.height,
+                 tiles: [{x: 0, y: 0, base64: data.screenshot}]};
+            
+            // Wait for the frame to be drawn before adding overlays
+            drawFrame(frame).then(function() {
+                renderOverlays(elements);
                 
                 // Update status message with current action
-                fetch('/get-status')
+                fetch(withSession('/get-status'))
                     .then(response => response.json())
                     .then(data => {
                         document.getElementById('statusMessage').textContent = data.status || `Scanning... Found ${elements ? elements.length : 0} elements`;
@@ -553,25 +689,126 @@ HTML_TEMPLATE = '''
                     .catch(error => {
                         document.getElementById('statusMessage').textContent = `Scanning... Found ${elements ? elements.length : 0} elements`;
                     });
-            };
+            });
+        }
+        
+        function renderOverlays(elements) {
+            const overlayContainer = document.getElementById('overlayContainer');
+            const img = document.getElementById('screenshotImage');
+            
+            // Clear previous overlays
+            overlayContainer.innerHTML = '';
+            
+            // Nothing to scale against until the first frame has been drawn
+            if (!img || !img.dataset.ready) {
+                return;
+            }
+            
+            // Get image dimensions for scaling
+            const imgRect = img.getBoundingClientRect();
+            
+            // Add element overlays
+            if (elements && elements.length > 0) {
+                elements.forEach(element => {
+                    const overlay = document.createElement('div');
+                    overlay.className = 'element-overlay';
+                    
+                    // Scale coordinates to match displayed image size
+                    const scaleX = imgRect.width / img.width;
+                    const scaleY = imgRect.height / img.height;
+                    
+                    // Position relative to the image element inside the container
+                    const imgOffsetLeft = img.offsetLeft;
+                    const imgOffsetTop = img.offsetTop;
+                    
+                    overlay.style.left = (imgOffsetLeft + element.x * scaleX) + 'px';
+                    overlay.style.top = (imgOffsetTop + element.y * scaleY) + 'px';
+                    overlay.style.width = (element.width * scaleX) + 'px';
+                    overlay.style.height = (element.height * scaleY) + 'px';
+                    
+                    const label = document.createElement('div');
+                    label.className = 'element-label';
+                    label.textContent = element.label || 'Element';
+                    overlay.appendChild(label);
+                    
+                    // Add click handler
+                    overlay.addEventListener('click', function(e) {
+                        e.preventDefault();
+                        e.stopPropagation();
+                        
+                        console.log('Overlay clicked:', element.label, 'at', element.x + element.width/2, element.y + element.height/2);
+                        
+                        // Show visual feedback
+                        overlay.style.backgroundColor = 'rgba(0, 255, 0, 0.5)';
+                        overlay.style.borderColor = '#00ff00';
+                        
+                        // Send click request to backend
+                        console.log('Sending click request for:', element.label);
+                        fetch(withSession('/click-element'), {
+                            method: 'POST',
+                            headers: {
+                                'Content-Type': 'application/json',
+                            },
+                            body: JSON.stringify({
+                                x: element.x + element.width / 2,
+                                y: element.y + element.height / 2,
+                                scale: currentScale,
+                                label: element.label
+                            })
+                        })
+                        .then(response => response.json())
+                        .then(data => {
+                            console.log('Click result:', data);
+                            // Reset visual feedback after a moment
+                            setTimeout(() => {
+                                overlay.style.backgroundColor = 'rgba(255, 0, 0, 0.2)';
+                                overlay.style.borderColor = 'red';
+                            }, 300);
+                        })
+                        .catch(error => {
+                            console.error('Error clicking element:', error);
+                            overlay.style.backgroundColor = 'rgba(255, 0, 0, 0.2)';
+                            overlay.style.borderColor = 'red';
+                        });
+                    });
+                    
+                    overlayContainer.appendChild(overlay);
+                });
+            }
         }
         
+        let resizeTimer = null;
+        window.addEventListener('resize', function() {
+            if (overlaySource) {
+                renderOverlays(currentElements);
+            }
+            // Renegotiate the frame size once the resize settles
+            clearTimeout(resizeTimer);
+            resizeTimer = setTimeout(function() {
+                if (isScanning) {
+                    const size = viewSize();
+                    fetch(withSession('/viewport'), {
+                        method: 'POST',
+                        headers: {'Content-Type': 'application/json'},
+                        body: JSON.stringify({viewer: viewerId, width: size.width, height: size.height})
+                    }).catch(error => console.error('Could not report view size:', error));
+                }
+            }, 250);
+        });
+        
         function resetButton() {
             isScanning = false;
             const button = document.querySelector('.start-button');
             button.disabled = false;
             button.textContent = 'Start Quote';
             
-            if (updateInterval) {
-                clearInterval(updateInterval);
-                updateInterval = null;
-            }
+            stopUpdating();
         }
         
         // Stop scanning when page is closed
         window.addEventListener('beforeunload', function() {
             if (isScanning) {
-                fetch('/stop-scan', { method: 'POST' });
+                fetch(withSession('/stop-scan'), { method: 'POST' });
             }
         });
     </script>
@@ -583,92 +820,201 @@ HTML_TEMPLATE = '''
 def index():
     return render_template_string(HTML_TEMPLATE)
 
+def request_session_id():
+    """Session named by ?session=, a JSON session_id or X-Session-ID; 'default' otherwise"""
+    data = request.get_json(silent=True) or {}
+    return (request.args.get('session') or data.get('session_id')
+            or request.headers.get('X-Session-ID') or DEFAULT_SESSION_ID)
+
+def request_session():
+    return session_pool.get(request_session_id())
+
+def unknown_session():
+    """Reply for read routes naming a session /start-scan never created"""
+    return jsonify({'status': 'error', 'message': f"Unknown session {request_session_id()}"}), 404
+
 @app.route('/start-scan', methods=['POST'])
 def start_scan():
     try:
-        global driver, is_scanning, scan_thread
-        
-        print("[API] Start scan requested", flush=True)
-        print(f"[API] Request method: {request.method}", flush=True)
-        print(f"[API] Request headers: {dict(request.headers)}", flush=True)
-        print(f"[API] Request data: {request.get_data()}", flush=True)
-        sys.stdout.flush()
-        
-        # Clean up any existing browser instance first
-        if driver:
-            print("[API] Cleaning up existing driver")
-            try:
-                driver.quit()
-            except:
-                pass
-            driver = None
-        
-        # Wait a bit for any existing scan to fully stop
-        if is_scanning:
-            print("[API] Stopping existing scan")
-            is_scanning = False
-            time.sleep(0.5)
+        session_id = request_session_id()
+        log.info("Start scan requested for session %s", session_id)
         
-        print("[API] Starting new scan thread")
-        is_scanning = True
-        scan_thread = threading.Thread(target=scan_geico_site)
-        scan_thread.start()
+        # Restarting a session: stop the old browser and let its thread exit first
+        existing = session_pool.get(session_id)
+        if existing and (existing.running or existing.is_scanning):
+            log.info("Stopping existing scan for session %s", session_id)
+            session_pool.stop(session_id, wait=10)
         
-        print("[API] Scan thread started, returning JSON response")
-        response = jsonify({'status': 'started'})
-        print(f"[API] Response: {response.get_data()}", flush=True)
-        return response
+        try:
+            session, state = session_pool.start(session_id, scan_geico_site)
+        except SessionPoolFull as e:
+            return jsonify({'status': 'busy', 'message': str(e)}), 503
+        except SessionBusy as e:
+            # The old scan thread is still inside a browser call; the client
+            # can start again once it has exited
+            return jsonify({'status': 'stopping', 'message': str(e)}), 409
+        
+        log.info("Session %s %s", session_id, state)
+        return jsonify({'status': state, 'session_id': session_id,
+                        'queue_position': session_pool.queue_position(session_id)})
     except Exception as e:
-        print(f"[ERROR] Exception in start_scan: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
+        log.exception("Exception in start_scan: %s", e)
         error_response = jsonify({'status': 'error', 'message': str(e)})
         return error_response, 500
 
 @app.route('/stop-scan', methods=['POST'])
 def stop_scan():
-    global is_scanning, driver
-    
-    is_scanning = False
-    if driver:
-        driver.quit()
-        driver = None
-    
+    session_pool.stop(request_session_id())
     return jsonify({'status': 'stopped'})
 
 @app.route('/get-screenshot')
 def get_screenshot():
-    global current_screenshot, detected_elements, fps_counter
+    session = request_session()
+    # One consistent frame/elements pair, however often the loop publishes meanwhile
+    frame, elements = session.view.snapshot() if session else (None, None)
+    if session is not None:
+        session.governor.viewer_polled()
+        session.view_sizes.report(request.args.get('viewer', 'poll'), request.args.get('width'),
+                                  request.args.get('height'))
     
-    if current_screenshot:
-        return jsonify({
-            'screenshot': current_screenshot,
-            'elements': detected_elements,
-            'fps': fps_counter
-        })
+    if frame is not None:
+        # Detection publishes elements after their frame, so the element
+        # version is part of what the client holds
+        etag = f'"{frame.hash}-{elements.version}"'
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers={'ETag': etag})
+        
+        # Clients that already hold this sequence get a tiny "no change" answer,
+        # plus the overlay if it changed since the version they hold
+        since = request.args.get('since', type=int)
+        if since is not None and since == frame.sequence:
+            payload = {'unchanged': True, 'sequence': frame.sequence, 'scale': frame.scale,
+                       'elements_version': elements.version, 'fps': session.fps,
+                       'target_fps': session.governor.target}
+            if request.args.get('elements', type=int) != elements.version:
+                payload['elements'] = scale_elements(elements.elements, frame.scale)
+            response = jsonify(payload)
+            response.headers['ETag'] = etag
+            return response
+        
+        payload = {
+            'mime': frame.mime,
+            'sequence': frame.sequence,
+            'width': frame.width,
+            'height': frame.height,
+            'scale': frame.scale,
+            'elements': scale_elements(elements.elements, frame.scale),
+            'elements_version': elements.version,
+            'fps': session.fps,
+            'target_fps': session.governor.target
+        }
+        if request.args.get('roi') and since == frame.sequence - 1 and frame.tiles is not None:
+            # Region-of-interest clients holding the previous frame get only
+            # the tiles that changed
+            payload['tiles'] = frame.tiles
+        else:
+            payload['screenshot'] = frame.data
+        response = jsonify(payload)
+        response.headers['ETag'] = etag
+        return response
     else:
         return jsonify({'screenshot': None, 'elements': [], 'fps': 0})
 
+@app.route('/stream-frames')
+def stream_frames():
+    """Live view as raw image bytes (multipart/x-mixed-replace), no base64/JSON"""
+    session = request_session()
+    if session is None:
+        return unknown_session()
+    def frames():
+        # Counts as a viewer, and keeps the session from being evicted
+        with session.governor.watching():
+            yield from multipart_frames(session.broadcaster)
+    return Response(frames(), mimetype=FRAME_STREAM_MIMETYPE, headers=STREAM_HEADERS)
+
+@app.route('/stream-elements')
+def stream_elements():
+    """Server-Sent Events: element overlays and fps/status, only when they change"""
+    session = request_session()
+    if session is None:
+        return unknown_session()
+    viewer = request.args.get('viewer') or f'stream-{id(request)}'
+    session.view_sizes.report(viewer, request.args.get('width'), request.args.get('height'), streaming=True)
+    def get_stats():
+        frame = session.view.frame
+        return {'fps': session.fps, 'target_fps': session.governor.target, 'status': session.status,
+                'scale': frame.scale if frame is not None else 1.0}
+    def events():
+        # An open overlay stream is what marks the session as watched (and
+        # holds its view size); the short keepalive notices a closed tab
+        # within a few seconds
+        try:
+            with session.governor.watching():
+                yield from overlay_events(session.broadcaster, get_stats, keepalive=VIEWER_KEEPALIVE)
+        finally:
+            session.view_sizes.forget(viewer)
+    return Response(events(), mimetype=EVENT_STREAM_MIMETYPE, headers=STREAM_HEADERS)
+
+@app.route('/stream-tiles')
+def stream_tiles():
+    """Server-Sent Events: the live view as changed tiles for the UI's canvas"""
+    session = request_session()
+    if session is None:
+        return unknown_session()
+    def events():
+        # Frames are only cut into tiles while a tile stream is open
+        with session.view_sizes.tile_stream():
+            yield from tile_events(session.broadcaster, keepalive=VIEWER_KEEPALIVE)
+    return Response(events(), mimetype=EVENT_STREAM_MIMETYPE, headers=STREAM_HEADERS)
+
+@app.route('/viewport', methods=['POST'])
+def viewport():
+    """A viewer's new display size; frames are encoded for the largest viewer"""
+    session = request_session()
+    if session is None:
+        return unknown_session()
+    data = request.get_json(silent=True) or {}
+    changed = session.view_sizes.report(data.get('viewer', 'poll'), data.get('width'), data.get('height'))
+    return jsonify({'status': 'ok', 'changed': changed, 'size': session.view_sizes.size()})
+
 @app.route('/get-status')
 def get_status():
-    global current_status
-    return jsonify({'status': current_status})
+    session = request_session()
+    if session is None:
+        return jsonify({'status': 'Ready to scan', 'latency': scan_metrics.summary(),
+                        'pool': session_pool.summary(), 'browsers': browser_pool.summary()})
+    return jsonify({'status': session.status, 'capture': session.capture_stats.summary(),
+                    'waits': session.waits.summary(),
+                    'flow': session.flow.summary() if session.flow is not None else None,
+                    'pipeline': session.pipeline.summary() if session.pipeline is not None else None,
+                    'governor': session.governor.summary(),
+                    'view_sizes': session.view_sizes.summary(),
+                    'latency': scan_metrics.summary(), 'pool': session_pool.summary(),
+                    'browsers': browser_pool.summary()})
+
+@app.route('/metrics')
+def metrics():
+    """Stage latency histograms and WebDriver call counts in Prometheus text format"""
+    return Response(scan_metrics.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
 
 @app.route('/click-element', methods=['POST'])
 def click_element():
-    global driver, current_status
+    session = request_session()
     
-    if not driver:
+    if not session or not session.driver:
         return jsonify({'status': 'error', 'message': 'No active browser session'})
     
     try:
         data = request.get_json()
-        x = data.get('x')
-        y = data.get('y')
+        # Overlay coordinates are in frame pixels; the page wants CSS pixels
+        scale = float(data.get('scale') or 1.0)
+        x = data.get('x') / scale
+        y = data.get('y') / scale
         label = data.get('label', 'Unknown')
         
-        print(f"[DEBUG] Clicking element: {label} at ({x}, {y})")
-        current_status = f"Clicking: {label}"
+        log.debug("Clicking element: %s at (%s, %s)", label, x, y)
+        session.status = f"Clicking: {label}"
+        session.governor.interaction()
         
         # Use JavaScript to click at exact coordinates
         click_script = """
@@ -710,11 +1056,10 @@ def click_element():
         }
         """
         
-        result = driver.execute_script(click_script, x, y)
-        print(f"[DEBUG] Click result: {result}")
-        
-        # Wait a moment for any page changes
-        time.sleep(0.5)
+        # Runs on the scan thread between automation steps or while it waits
+        result = session.commands.submit(lambda driver: driver.execute_script(click_script, x, y),
+                                         label='click-element')
+        log.debug("Click result: %s", result)
         
         return jsonify({
             'status': 'success',
@@ -723,7 +1068,7 @@ def click_element():
         })
         
     except Exception as e:
-        print(f"[ERROR] Click failed: {e}")
+        log.error("Click failed: %s", e)
         return jsonify({
             'status': 'error',
             'message': str(e)
@@ -732,11 +1077,21 @@ def click_element():
 @app.route('/force-commercial-auto', methods=['POST'])
 def force_commercial_auto():
     """Force click on Commercial Auto/Trucking - handles both checkbox and tab"""
-    global driver, current_status
+    session = request_session()
     
-    if not driver:
+    if not session or not session.driver:
         return jsonify({'status': 'error', 'message': 'Scanner not running'})
     
+    session.governor.interaction()
+    try:
+        # Runs on the scan thread between automation steps or while it waits
+        return jsonify(session.commands.submit(lambda driver: force_commercial_auto_on(session, driver),
+                                               label='force-commercial-auto'))
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+def force_commercial_auto_on(session, driver):
+    """Body of /force-commercial-auto; returns the response payload"""
     try:
         # First, detect which page we're on
         page_type = driver.execute_script("""
@@ -766,7 +1121,7 @@ def force_commercial_auto():
             return {hasCheckbox: hasCheckbox, hasTab: hasTab};
         """)
         
-        print(f"[DEBUG] Page detection - Checkbox: {page_type['hasCheckbox']}, Tab: {page_type['hasTab']}")
+        log.debug("Page detection - Checkbox: %s, Tab: %s", page_type['hasCheckbox'], page_type['hasTab'])
         
         if page_type['hasCheckbox']:
             # We're on the dashboard - click the checkbox
@@ -797,12 +1152,12 @@ def force_commercial_auto():
             """)
             
             if result:
-                current_status = "Commercial Auto checkbox clicked!"
-                return jsonify({'status': 'success', 'message': 'Commercial Auto checkbox clicked! Form will submit.'})
+                session.status = "Commercial Auto checkbox clicked!"
+                return {'status': 'success', 'message': 'Commercial Auto checkbox clicked! Form will submit.'}
             
         elif page_type['hasTab']:
             # We're on the quote page - click the tab and prevent refresh
-            result = driver.execute_script("""
+            result = driver.execute_script(with_text_index("""
                 var clicked = false;
                 var tabElement = null;
                 
@@ -879,14 +1234,13 @@ def force_commercial_auto():
                 
                 // Method 2: If no tab found, try JavaScript navigation
                 if (!clicked) {
-                    // Look for tab by examining onclick or href attributes
-                    var allElements = document.querySelectorAll('*');
-                    for (var i = 0; i < allElements.length; i++) {
-                        var elem = allElements[i];
-                        var text = elem.textContent || '';
+                    // Look for tab by examining onclick or href attributes of the
+                    // leaf elements holding the label text (shared text index)
+                    var hits = window.__scannerTextIndex.findAll(['Commercial Auto', 'Auto/Trucking'], {maxArea: Number.MAX_VALUE});
+                    for (var i = 0; i < hits.length; i++) {
+                        var elem = hits[i].element;
                         
-                        if ((text.includes('Commercial Auto') || text.includes('Auto/Trucking')) &&
-                            elem.childElementCount === 0) {  // Leaf element
+                        if (elem.childElementCount === 0) {  // Leaf element
                             
                             var onclick = elem.getAttribute('onclick');
                             var href = elem.getAttribute('href');
@@ -925,19 +1279,19 @@ def force_commercial_auto():
                 }
                 
                 return {clicked: clicked, element: tabElement ? tabElement.tagName : 'none'};
-            """)
+            """))
             
             if result['clicked']:
-                current_status = "Commercial Auto tab clicked!"
+                session.status = "Commercial Auto tab clicked!"
                 # Install the monitoring system to maintain tab selection
                 monitor_and_maintain_commercial_tab(driver)
-                return jsonify({'status': 'success', 'message': f'Commercial Auto tab clicked! Element: {result["element"]}. Monitoring activated.'})
+                return {'status': 'success', 'message': f'Commercial Auto tab clicked! Element: {result["element"]}. Monitoring activated.'}
         
         # If neither checkbox nor tab found
-        return jsonify({'status': 'error', 'message': 'Could not find Commercial Auto checkbox or tab on current page'})
+        return {'status': 'error', 'message': 'Could not find Commercial Auto checkbox or tab on current page'}
             
     except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)})
+        return {'status': 'error', 'message': str(e)}
 
 def monitor_and_maintain_commercial_tab(driver):
     """Monitor for page changes and re-click Commercial Auto tab if needed"""
@@ -1069,34 +1423,34 @@ def monitor_and_maintain_commercial_tab(driver):
         """)
         return True
     except Exception as e:
-        print(f"[ERROR] Failed to install tab monitor: {e}")
+        log.error("Failed to install tab monitor: %s", e)
         return False
 
 @app.route('/scroll-page', methods=['POST'])
 def scroll_page():
-    global driver, current_status
+    session = request_session()
     
-    if not driver:
+    if not session or not session.driver:
         return jsonify({'status': 'error', 'message': 'No active browser session'})
     
     try:
         data = request.get_json()
         direction = data.get('direction', 'down')
         
-        print(f"[DEBUG] Scrolling page: {direction}")
-        current_status = f"Scrolling {direction}..."
+        log.debug("Scrolling page: %s", direction)
+        session.status = f"Scrolling {direction}..."
+        session.governor.interaction()
         
         # Scroll the page
-        if direction == 'down':
-            driver.execute_script("window.scrollBy(0, 300);")
-        elif direction == 'up':
-            driver.execute_script("window.scrollBy(0, -300);")
-        
-        # Wait a moment for elements to update
-        time.sleep(0.3)
+        if direction in ('down', 'up'):
+            offset = 300 if direction == 'down' else -300
+            session.commands.submit(lambda driver: driver.execute_script("window.scrollBy(0, arguments[0]);", offset),
+                                    label='scroll-page')
         
         # Get current scroll position
-        scroll_pos = driver.execute_script("return {top: window.pageYOffset, height: document.documentElement.scrollHeight, viewport: window.innerHeight};")
+        scroll_pos = session.commands.submit(lambda driver: driver.execute_script(
+            "return {top: window.pageYOffset, height: document.documentElement.scrollHeight, viewport: window.innerHeight};"),
+            label='scroll-position')
         
         return jsonify({
             'status': 'success',
@@ -1105,124 +1459,94 @@ def scroll_page():
         })
         
     except Exception as e:
-        print(f"[ERROR] Scroll failed: {e}")
+        log.error("Scroll failed: %s", e)
         return jsonify({
             'status': 'error',
             'message': str(e)
         })
 
-def scan_geico_site():
-    global driver, is_scanning, current_screenshot, detected_elements, fps_counter, last_fps_time, current_status
-    
-    print("\n[DEBUG] scan_geico_site() function called!", flush=True)
-    sys.stdout.flush()
-    
-    # Kill any existing Chrome processes first - more aggressive
-    import subprocess
-    import os
-    import tempfile
-    import shutil
-    
-    print("[DEBUG] Killing existing Chrome processes...", flush=True)
-    sys.stdout.flush()
-    subprocess.run(['pkill', '-9', '-f', 'chrome'], capture_output=True)
-    subprocess.run(['pkill', '-9', '-f', 'chromium'], capture_output=True)
-    subprocess.run(['pkill', '-9', '-f', 'chromedriver'], capture_output=True)
-    time.sleep(1)  # Give time for processes to die
-    
-    # Write debug to file
-    with open('scanner_debug_thread.log', 'a') as f:
-        f.write(f"[DEBUG] {time.strftime('%Y-%m-%d %H:%M:%S')} Starting scan_geico_site function\n")
-        f.flush()
+# What the zip/USDOT steps wait for (the searches themselves also fall back
+# to any text input)
+_LOWER = "translate(@{}, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+ZIP_FIELD_XPATH = " | ".join(f"//input[contains({_LOWER.format(attr)}, '{word}')]"
+                             for word in ('zip', 'garage') for attr in ('name', 'id', 'placeholder'))
+STATE_FIELD_XPATH = " | ".join(f"//{tag}[contains({_LOWER.format(attr)}, 'state')]"
+                               for tag in ('select', 'input') for attr in ('name', 'id'))
+USDOT_FIELD_XPATH = " | ".join(f"//input[contains({_LOWER.format(attr)}, 'dot')]"
+                               for attr in ('name', 'id', 'placeholder', 'aria-label'))
+
+
+def scan_geico_site(session):
+    """Run one quote in `session`'s own browser (started by session_pool)"""
+    log.debug("scan_geico_site() function called")
+    session.capture_stats = CaptureStats()
     
-    print("[DEBUG] Starting scan_geico_site function")
+    log.info("Starting scan for session %s", session.session_id)
+    driver = None
+    browser = None
     temp_dir = None
+    screencast = None
+    cdp = None
+    pipeline = None
     try:
-        # Set up Chrome options
-        current_status = "Setting up Chrome browser..."
-        with open('scanner_debug_thread.log', 'a') as f:
-            f.write(f"[DEBUG] {time.strftime('%Y-%m-%d %H:%M:%S')} Setting up Chrome options\n")
-            f.flush()
-        print("[DEBUG] Setting up Chrome options")
-        chrome_options = Options()
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        # Re-enable headless for server environment
-        chrome_options.add_argument('--headless=new')
-        # Add more arguments to fix Chrome startup issues
-        chrome_options.add_argument('--disable-setuid-sandbox')
-        chrome_options.add_argument('--remote-debugging-port=9222')
-        chrome_options.add_argument('--disable-extensions')
-        print("[DEBUG] Running in headless mode for server environment")
-        
-        # Try to create a unique user data directory
+        # Take an already-launched browser (stealth script installed) from the
+        # warm pool; it launches one on the spot only if none is ready
+        session.status = "Starting Chrome browser..."
         try:
-            # Create a unique temporary directory with timestamp
-            temp_dir = tempfile.mkdtemp(prefix=f'geico_scanner_{int(time.time())}_')
-            chrome_options.add_argument(f'--user-data-dir={temp_dir}')
-            print(f"[DEBUG] Using temporary profile directory: {temp_dir}")
-        except Exception as e:
-            print(f"[DEBUG] Could not create temp directory, running without user-data-dir: {e}")
-            # Don't use user-data-dir if we can't create temp dir
-        
-        # Add more options to prevent conflicts
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-software-rasterizer')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # Initialize driver
-        print("[DEBUG] Initializing Chrome driver")
-        current_status = "Starting Chrome browser..."
-        try:
-            print("[DEBUG] Creating Chrome webdriver with options...")
-            driver = webdriver.Chrome(options=chrome_options)
-            print("[DEBUG] Chrome driver initialized successfully")
-            driver.set_window_size(1920, 1080)
-            current_status = "Chrome browser started"
-            
-            # Test that driver is working
-            print("[DEBUG] Testing driver - getting window handles...")
-            handles = driver.window_handles
-            print(f"[DEBUG] Window handles: {handles}")
-            print(f"[DEBUG] Current URL: {driver.current_url}")
+            browser = browser_pool.acquire()
         except Exception as chrome_error:
-            print(f"[ERROR] Failed to initialize Chrome driver: {chrome_error}")
-            current_status = f"Failed to start Chrome: {str(chrome_error)[:50]}"
-            # Write detailed error to log
-            with open('scanner_debug_thread.log', 'a') as f:
-                f.write(f"[ERROR] {time.strftime('%Y-%m-%d %H:%M:%S')} Chrome init error: {chrome_error}\n")
-                import traceback
-                f.write(traceback.format_exc())
-                f.flush()
-            # Clean up temp directory if it exists
-            if temp_dir and os.path.exists(temp_dir):
-                try:
-                    shutil.rmtree(temp_dir)
-                except:
-                    pass
+            log.exception("Failed to initialize Chrome driver: %s", chrome_error)
+            session.status = f"Failed to start Chrome: {str(chrome_error)[:50]}"
             raise
-        
-        # Execute script to mask webdriver detection
-        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-            '''
-        })
-        
-        print("[DEBUG] Navigating to Geico gateway page")
-        current_status = "Loading Geico website..."
-        driver.get('https://gateway.geico.com/')
-        print("[DEBUG] Successfully loaded Geico gateway page")
-        current_status = "Geico website loaded"
-        
-        # Wait for page to load
-        time.sleep(2)
+        driver = browser.driver
+        temp_dir = browser.profile_dir
+        instrument_driver(driver, scan_metrics)
+        session.driver = driver
+        # Request handlers reach the driver only through this queue, which the
+        # automation loop drains between steps and while it waits
+        session.commands.open()
+        session.debug_port = browser.debug_port
+        session.profile_dir = temp_dir
+        # Lets the attach tools find this browser: check_geico_state.py --session <id>
+        session_registry.register(session.session_id, browser.debug_port, temp_dir)
+        session.status = "Chrome browser started"
+        log.debug("Using browser on DevTools port %s, profile %s", browser.debug_port, temp_dir)
+        
+        # Optional paint-driven capture: Chrome pushes frames over the DevTools
+        # port instead of the loop polling get_screenshot
+        if CAPTURE_BACKEND == 'screencast':
+            try:
+                screencast = ScreencastCapture(port=session.debug_port, target_id=driver.current_window_handle,
+                                               image_format=FRAME_FORMAT, quality=FRAME_QUALITY)
+                screencast.start()
+            except Exception as e:
+                log.warning("Could not start screencast, polling screenshots instead: %s", e)
+                screencast = None
+        
+        # The per-frame calls (capture, DOM version, detection) go straight over
+        # the DevTools websocket on the shared asyncio engine; everything else,
+        # and everything when that is unavailable, stays on Selenium
+        cdp = open_cdp_driver(session.debug_port, driver.current_window_handle, scan_metrics)
+        session.driver_backend = 'cdp' if cdp is not None else 'selenium'
+        
+        # Condition-based waits for the quote flow; time spent lands in
+        # session.waits (served by /get-status) and the wait_* histograms, and
+        # request handlers' driver commands run between the polls. With the
+        # DevTools backend, navigation and page loads come from its events
+        waiter = Waiter(driver, session.waits, scan_metrics, cancelled=lambda: not session.is_scanning,
+                        commands=session.commands, events=cdp)
+        # Where this quote is (gateway -> login -> ... -> result); decides which
+        # loop sections run each frame
+        flow = session.flow = QuoteFlow(scan_metrics)
+        
+        log.debug("Navigating to Geico gateway page")
+        session.status = "Loading Geico website..."
+        driver.get(START_URL)
+        log.debug("Successfully loaded Geico gateway page")
+        session.status = "Geico website loaded"
+        
+        # Wait for the gateway's scripts and late requests to finish
+        waiter.page_settled(timeout=10, label='gateway load')
         
         # Check if we need to go to the login page directly
         # Sometimes the gateway redirects to login, sometimes we need to navigate there
@@ -1230,222 +1554,171 @@ def scan_geico_site():
             # Look for "Manage My Policy" link which usually leads to login
             manage_policy_links = driver.find_elements(By.XPATH, "//a[contains(text(), 'Manage') and contains(text(), 'Policy')]")
             if manage_policy_links:
-                print("[DEBUG] Found 'Manage My Policy' link, clicking it")
+                log.debug("Found 'Manage My Policy' link, clicking it")
+                waiter.mark_document()
                 manage_policy_links[0].click()
-                time.sleep(3)  # Wait for redirect
+                if waiter.navigation_committed(timeout=10, label='manage policy redirect'):
+                    waiter.page_settled(timeout=10, label='login page load')
         except Exception as e:
-            print(f"[DEBUG] No manage policy link found or error clicking: {e}")
-        
-        frame_count = 0
+            log.debug("No manage policy link found or error clicking: %s", e)
         
         # Take an initial screenshot to verify everything is working
         try:
-            print("[DEBUG] Taking initial screenshot...")
-            current_status = "Taking initial screenshot..."
-            screenshot = driver.get_screenshot_as_png()
-            img = Image.open(io.BytesIO(screenshot))
-            buffered = io.BytesIO()
-            img.save(buffered, format="PNG")
-            current_screenshot = base64.b64encode(buffered.getvalue()).decode()
-            print("[DEBUG] Initial screenshot successful")
-            current_status = "Scanner ready"
+            log.debug("Taking initial screenshot...")
+            session.status = "Taking initial screenshot..."
+            frame = capture_frame(cdp or driver)
+            session.capture_stats.record(frame)
+            session.view.publish_frame(frame)
+            log.debug("Initial screenshot successful")
+            session.status = "Scanner ready"
         except Exception as e:
-            print(f"[ERROR] Failed to take initial screenshot: {e}")
-            current_status = f"Screenshot error: {str(e)[:50]}"
+            log.error("Failed to take initial screenshot: %s", e)
+            session.status = f"Screenshot error: {str(e)[:50]}"
+        
+        # Frame capture and overlay detection run on their own threads from
+        # here on; this thread is the automation stage
+        pipeline = session.pipeline = ScanPipeline(session, driver, cdp, screencast, scan_metrics,
+                                                   redetect_interval=FRAME_REDETECT_INTERVAL)
+        pipeline.start()
         
         # Initialize check timers
         last_commercial_check_time = 0
-        last_fps_calculation_time = time.time()
         commercial_check_counter = 0  # Separate counter for Commercial Auto checks
         
-        while is_scanning:
+        while session.is_scanning:
             try:
+                iteration_start = time.perf_counter()
+                # Each lap() below closes the stage that started at the previous one
+                scan_metrics.start_frame()
+                
                 # CRITICAL DEBUG: Verify loop is running
                 if commercial_check_counter == 0:
-                    print("\n[SCANNER STARTED] Main detection loop is running!", flush=True)
+                    log.info("Main detection loop is running")
+                
+                # Nothing runs in the result state: end the quote so its
+                # browser slot goes to the next queued session
+                if flow.complete():
+                    log.info("Quote complete after %.0fs, closing the browser", time.time() - flow.started)
+                    session.status = "Quote complete"
+                    break
                 
-                # DEBUG: Print loop status MORE FREQUENTLY
                 if commercial_check_counter % 5 == 0:
-                    print(f"\n[MAIN LOOP ACTIVE] Counter: {commercial_check_counter}, Status: {current_status}")
-                    print(f"[MAIN LOOP ACTIVE] URL: {driver.current_url}")
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug("Main loop counter %s, status: %s, URL: %s",
+                                  commercial_check_counter, session.status, driver.current_url)
                     
                     # If stuck on login status for too long, force reset
-                    if "Login submitted" in current_status and commercial_check_counter > 50:
-                        print("[MAIN LOOP] Forcing status reset due to stuck login!")
-                        current_status = "Searching for Commercial Auto..."
+                    if "Login submitted" in session.status and commercial_check_counter > 50:
+                        log.warning("Forcing status reset due to stuck login")
+                        session.status = "Searching for Commercial Auto..."
                 
                 # EMERGENCY FORCE CHECK: If we have a scheduled force check time, do it NOW
-                if hasattr(driver, 'force_commercial_check_time') and time.time() >= driver.force_commercial_check_time:
-                    print("\n[EMERGENCY] FORCING COMMERCIAL AUTO CHECK NOW!")
+                if flow.runs('commercial_auto') and hasattr(driver, 'force_commercial_check_time') and \
+                   time.time() >= driver.force_commercial_check_time:
+                    commercial_log.info("FORCING COMMERCIAL AUTO CHECK NOW!")
                     driver.force_commercial_check_time = float('inf')  # Prevent repeated checks
                     
                     # Reset status to allow normal operation
-                    current_status = "Forcing Commercial Auto detection..."
+                    session.status = "Forcing Commercial Auto detection..."
                     
                     # Force the Commercial Auto check RIGHT NOW
                     try:
-                        click_result = driver.execute_script("""
+                        click_result = driver.execute_script(with_text_index("""
                             console.log('[FORCE] Emergency Commercial Auto search started!');
-                            var found = false;
-                            var allElements = document.querySelectorAll('*');
-                            
-                            for (var i = 0; i < allElements.length; i++) {
-                                var elem = allElements[i];
-                                if (elem.textContent && 
-                                    (elem.textContent.includes('Commercial Auto/Trucking') || 
-                                     elem.textContent.includes('Commercial Auto / Trucking') ||
-                                     elem.textContent.includes('Commercial Auto'))) {
-                                    
-                                    if (elem.offsetWidth * elem.offsetHeight > 100000) continue;
-                                    
-                                    var clickable = elem;
-                                    if (elem.tagName !== 'A' && elem.tagName !== 'BUTTON') {
-                                        var parent = elem.parentElement;
-                                        while (parent && parent.tagName !== 'BODY') {
-                                            if (parent.tagName === 'A' || parent.tagName === 'BUTTON' ||
-                                                parent.getAttribute('role') === 'tab' ||
-                                                parent.getAttribute('role') === 'button') {
-                                                clickable = parent;
-                                                break;
-                                            }
-                                            parent = parent.parentElement;
-                                        }
-                                    }
-                                    
-                                    // BRIGHT GREEN HIGHLIGHT
-                                    clickable.style.border = '5px solid #00FF00';
-                                    clickable.style.backgroundColor = 'rgba(0, 255, 0, 0.3)';
-                                    clickable.style.boxShadow = '0 0 30px #00FF00';
-                                    
-                                    // Multiple click attempts
-                                    clickable.click();
-                                    clickable.dispatchEvent(new MouseEvent('click', {bubbles: true}));
-                                    
-                                    console.log('[FORCE] Clicked Commercial Auto:', clickable);
-                                    window.commercialAutoClicked = true;
-                                    found = true;
-                                    break;
-                                }
+                            // Indexed lookup: label text -> nearest clickable ancestor
+                            var hit = window.__scannerTextIndex.find(arguments[0]);
+                            if (!hit) {
+                                return false;
                             }
+                            var clickable = hit.clickable;
                             
-                            return found;
-                        """)
+                            // BRIGHT GREEN HIGHLIGHT
+                            clickable.style.border = '5px solid #00FF00';
+                            clickable.style.backgroundColor = 'rgba(0, 255, 0, 0.3)';
+                            clickable.style.boxShadow = '0 0 30px #00FF00';
+                            
+                            // Multiple click attempts
+                            clickable.click();
+                            clickable.dispatchEvent(new MouseEvent('click', {bubbles: true}));
+                            
+                            console.log('[FORCE] Clicked Commercial Auto:', clickable);
+                            window.commercialAutoClicked = true;
+                            return true;
+                        """), COMMERCIAL_AUTO_LABELS)
                         
                         if click_result:
-                            print("[EMERGENCY] COMMERCIAL AUTO TAB CLICKED!")
-                            current_status = "Commercial Auto tab clicked!"
+                            commercial_log.info("COMMERCIAL AUTO TAB CLICKED!")
+                            session.status = "Commercial Auto tab clicked!"
+                            flow.advance(quote_flow.COMMERCIAL_AUTO, 'forced tab click')
                         else:
-                            print("[EMERGENCY] Commercial Auto tab not found")
-                            current_status = "On dashboard - Commercial Auto not found"
+                            commercial_log.info("Commercial Auto tab not found")
+                            session.status = "On dashboard - Commercial Auto not found"
                     except Exception as e:
-                        print(f"[EMERGENCY] Error during forced click: {e}")
-                        current_status = "Dashboard ready"
+                        commercial_log.warning("Error during forced click: %s", e)
+                        session.status = "Dashboard ready"
                 
                 # IMMEDIATE COMMERCIAL AUTO CHECK - Run this EVERY loop iteration
                 # Check if we need to click Commercial Auto tab
                 # Run immediately on first iteration, then every 5 iterations
-                if commercial_check_counter % 5 == 0:  # Check every 5 iterations (about 0.5 seconds)
+                if flow.runs('commercial_auto') and commercial_check_counter % 5 == 0:  # Every 5 iterations (about 0.5 seconds)
                     try:
                         # Check if already clicked
                         commercial_clicked = driver.execute_script("return window.commercialAutoClicked || false")
                         
                         if not commercial_clicked:
-                            print(f"\n[COMMERCIAL AUTO CHECK] Frame {frame_count} - Checking for Commercial Auto tab...")
-                            print(f"[COMMERCIAL AUTO CHECK] Current URL: {driver.current_url}")
-                            print(f"[COMMERCIAL AUTO CHECK] Current status: {current_status}")
+                            if commercial_log.isEnabledFor(logging.DEBUG):
+                                commercial_log.debug("Iteration %s - checking for Commercial Auto tab on %s (status: %s)",
+                                                     commercial_check_counter, driver.current_url, session.status)
                             
                             # Direct JavaScript search and click
-                            click_result = driver.execute_script("""
+                            click_result = driver.execute_script(with_text_index("""
                                 var found = false;
                                 var clickCount = 0;
                                 
-                                // Search for Commercial Auto elements
-                                var allElements = document.querySelectorAll('*');
-                                for (var i = 0; i < allElements.length; i++) {
-                                    var elem = allElements[i];
-                                    if (elem.textContent && 
-                                        (elem.textContent.includes('Commercial Auto/Trucking') || 
-                                         elem.textContent.includes('Commercial Auto / Trucking') ||
-                                         elem.textContent.includes('Commercial Auto'))) {
-                                        
-                                        // Skip large containers
-                                        if (elem.offsetWidth * elem.offsetHeight > 100000) continue;
-                                        
-                                        // Find clickable element
-                                        var clickable = elem;
-                                        if (elem.tagName !== 'A' && elem.tagName !== 'BUTTON') {
-                                            var parent = elem.parentElement;
-                                            while (parent && parent.tagName !== 'BODY') {
-                                                if (parent.tagName === 'A' || parent.tagName === 'BUTTON' ||
-                                                    parent.getAttribute('role') === 'tab' ||
-                                                    parent.getAttribute('role') === 'button' ||
-                                                    parent.onclick) {
-                                                    clickable = parent;
-                                                    break;
-                                                }
-                                                parent = parent.parentElement;
-                                            }
-                                        }
-                                        
-                                        // Highlight in GREEN
-                                        clickable.style.border = '5px solid #00FF00';
-                                        clickable.style.backgroundColor = 'rgba(0, 255, 0, 0.3)';
-                                        clickable.style.boxShadow = '0 0 20px #00FF00';
-                                        
-                                        // Click it
-                                        try {
-                                            clickable.click();
-                                            clickCount++;
-                                            console.log('Clicked Commercial Auto element:', clickable);
-                                        } catch(e) {
-                                            console.log('Click failed:', e);
-                                        }
-                                        
-                                        // Also try JavaScript click
-                                        var event = new MouseEvent('click', {
-                                            view: window,
-                                            bubbles: true,
-                                            cancelable: true
-                                        });
-                                        clickable.dispatchEvent(event);
-                                        
-                                        found = true;
-                                        window.commercialAutoClicked = true;
-                                        break;
+                                // Search for Commercial Auto elements via the shared text index
+                                var hit = window.__scannerTextIndex.find(arguments[0]);
+                                if (hit) {
+                                    var clickable = hit.clickable;
+                                    
+                                    // Highlight in GREEN
+                                    clickable.style.border = '5px solid #00FF00';
+                                    clickable.style.backgroundColor = 'rgba(0, 255, 0, 0.3)';
+                                    clickable.style.boxShadow = '0 0 20px #00FF00';
+                                    
+                                    // Click it
+                                    try {
+                                        clickable.click();
+                                        clickCount++;
+                                        console.log('Clicked Commercial Auto element:', clickable);
+                                    } catch(e) {
+                                        console.log('Click failed:', e);
                                     }
+                                    
+                                    // Also try JavaScript click
+                                    var event = new MouseEvent('click', {
+                                        view: window,
+                                        bubbles: true,
+                                        cancelable: true
+                                    });
+                                    clickable.dispatchEvent(event);
+                                    
+                                    found = true;
+                                    window.commercialAutoClicked = true;
                                 }
                                 
-                                return {found: found, clickCount: clickCount};
-                            """)
+                                return {found: found, clickCount: clickCount, timings: window.__scannerTextIndex.timings()};
+                            """), COMMERCIAL_AUTO_LABELS)
                             
+                            commercial_log.debug("Text index timings: %s", click_result['timings'])
                             if click_result['found']:
-                                print(f"[COMMERCIAL AUTO CLICKED!] Found and clicked Commercial Auto tab!")
-                                current_status = "Commercial Auto tab clicked!"
+                                commercial_log.info("Found and clicked Commercial Auto tab")
+                                session.status = "Commercial Auto tab clicked!"
+                                flow.advance(quote_flow.COMMERCIAL_AUTO, 'tab click')
                             else:
-                                print(f"[COMMERCIAL AUTO CHECK] Not found yet")
+                                commercial_log.debug("Commercial Auto tab not found yet")
                     except Exception as e:
-                        print(f"[COMMERCIAL AUTO CHECK] Error: {e}")
-                
-                # Take screenshot
-                screenshot = driver.get_screenshot_as_png()
-                img = Image.open(io.BytesIO(screenshot))
-                
-                with open('scanner_debug_thread.log', 'a') as f:
-                    f.write(f"[DEBUG] {time.strftime('%Y-%m-%d %H:%M:%S')} Screenshot captured, size: {len(screenshot)} bytes\n")
-                    f.flush()
-                print(f"[DEBUG] Screenshot captured, size: {len(screenshot)} bytes")
-                
-                # Convert to base64
-                buffered = io.BytesIO()
-                img.save(buffered, format="PNG")
-                current_screenshot = base64.b64encode(buffered.getvalue()).decode()
-                
-                with open('scanner_debug_thread.log', 'a') as f:
-                    f.write(f"[DEBUG] {time.strftime('%Y-%m-%d %H:%M:%S')} Screenshot converted to base64, length: {len(current_screenshot)}\n")
-                    f.flush()
-                
-                # Detect elements
-                elements_found = []
+                        commercial_log.warning("Commercial Auto check failed: %s", e)
+                scan_metrics.lap('commercial_check')
                 
                 # Check for login fields on ANY page (not just login pages)
                 # First, detect if we have username/password fields visible
@@ -1454,82 +1727,113 @@ def scan_geico_site():
                 username_element = None
                 password_element = None
                 
-                # BYPASS: If we've been running for more than 30 seconds, stop checking for login
-                if not hasattr(driver, 'scanner_start_time'):
-                    driver.scanner_start_time = time.time()
+                # Login fields are only looked for at the gateway/login steps; with no
+                # login form for a while, assume the session went straight through
+                if flow.runs('login') and flow.in_state() > quote_flow.LOGIN_FORM_TIMEOUT and \
+                   not driver.execute_script("return window.geicoLoginAttempted || false"):
+                    login_log.info("No login form after %.0fs - moving on to the dashboard", flow.in_state())
+                    flow.advance(quote_flow.DASHBOARD, 'no login form')
                 
-                if time.time() - driver.scanner_start_time > 30:
-                    if frame_count % 100 == 0:  # Only print every 10 seconds
-                        print("[BYPASS] Skipping login detection after 30 seconds - focusing on Commercial Auto")
-                    has_username_field = False
-                    has_password_field = False
+                if flow.runs('login'):
+                    if login_log.isEnabledFor(logging.DEBUG):
+                        login_log.debug("Starting login field detection on URL: %s", driver.current_url)
                 
-                print(f"\n[DEBUG LOGIN SCAN] Starting login field detection on URL: {driver.current_url}", flush=True)
-                sys.stdout.flush()
+                    # Check for username field
+                    try:
+                        username_fields = driver.find_elements(By.XPATH, "//input[@type='text' or @type='email' or @name='username' or @name='j_username' or @id='username' or contains(@placeholder, 'username') or contains(@placeholder, 'Username') or contains(@aria-label, 'username') or contains(@aria-label, 'Username')]")
+                        login_log.debug("Found %s potential username fields", len(username_fields))
+                        for field in username_fields:
+                            if field.is_displayed():
+                                has_username_field = True
+                                username_element = field
+                                if login_log.isEnabledFor(logging.DEBUG):
+                                    login_log.debug("Username field found: type=%s, name=%s, id=%s", field.get_attribute('type'),
+                                                    field.get_attribute('name'), field.get_attribute('id'))
+                                break
+                        if not has_username_field:
+                            login_log.debug("No visible username field found")
+                    except Exception as e:
+                        login_log.warning("Error finding username field: %s", e)
                 
-                # Check for username field
-                try:
-                    username_fields = driver.find_elements(By.XPATH, "//input[@type='text' or @type='email' or @name='username' or @name='j_username' or @id='username' or contains(@placeholder, 'username') or contains(@placeholder, 'Username') or contains(@aria-label, 'username') or contains(@aria-label, 'Username')]")
-                    print(f"[DEBUG LOGIN SCAN] Found {len(username_fields)} potential username fields")
-                    for field in username_fields:
-                        if field.is_displayed():
-                            has_username_field = True
-                            username_element = field
-                            print(f"[DEBUG LOGIN SCAN] Username field found! Type: {field.get_attribute('type')}, Name: {field.get_attribute('name')}, ID: {field.get_attribute('id')}")
-                            break
-                    if not has_username_field:
-                        print("[DEBUG LOGIN SCAN] No visible username field found")
-                except Exception as e:
-                    print(f"[DEBUG LOGIN SCAN] Error finding username field: {e}")
+                    # Check for password field
+                    try:
+                        password_fields = driver.find_elements(By.XPATH, "//input[@type='password' or @name='password' or @name='j_password' or @id='password']")
+                        login_log.debug("Found %s potential password fields", len(password_fields))
+                        for field in password_fields:
+                            if field.is_displayed():
+                                has_password_field = True
+                                password_element = field
+                                if login_log.isEnabledFor(logging.DEBUG):
+                                    login_log.debug("Password field found: type=%s, name=%s, id=%s", field.get_attribute('type'),
+                                                    field.get_attribute('name'), field.get_attribute('id'))
+                                break
+                        if not has_password_field:
+                            login_log.debug("No visible password field found")
+                    except Exception as e:
+                        login_log.warning("Error finding password field: %s", e)
                 
-                # Check for password field
-                try:
-                    password_fields = driver.find_elements(By.XPATH, "//input[@type='password' or @name='password' or @name='j_password' or @id='password']")
-                    print(f"[DEBUG LOGIN SCAN] Found {len(password_fields)} potential password fields")
-                    for field in password_fields:
-                        if field.is_displayed():
-                            has_password_field = True
-                            password_element = field
-                            print(f"[DEBUG LOGIN SCAN] Password field found! Type: {field.get_attribute('type')}, Name: {field.get_attribute('name')}, ID: {field.get_attribute('id')}")
-                            break
-                    if not has_password_field:
-                        print("[DEBUG LOGIN SCAN] No visible password field found")
-                except Exception as e:
-                    print(f"[DEBUG LOGIN SCAN] Error finding password field: {e}")
+                    login_log.debug("Login field detection complete. Has username: %s, has password: %s",
+                                    has_username_field, has_password_field)
+                    if has_username_field and has_password_field:
+                        flow.advance(quote_flow.LOGIN, 'login form shown')
                 
-                print(f"[DEBUG LOGIN SCAN] Detection complete. Has username: {has_username_field}, Has password: {has_password_field}")
+                # Label the login fields and the Sign In button in the overlay; the
+                # detection stage puts these ahead of its own detections
+                login_elements = []
+                if has_username_field and has_password_field:
+                    for label, element in (('Username', username_element), ('Password', password_element)):
+                        rect = element.rect
+                        if rect['width'] > 20 and rect['height'] > 10:
+                            login_elements.append({'label': label, 'x': rect['x'], 'y': rect['y'],
+                                                   'width': rect['width'], 'height': rect['height']})
+                        else:
+                            login_log.debug("%s field too small: %sx%s", label, rect['width'], rect['height'])
+                    try:
+                        sign_in_buttons = driver.find_elements(By.XPATH, "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'sign') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'log')] | //input[@type='submit']")
+                        for btn in sign_in_buttons:
+                            if btn.is_displayed():
+                                rect = btn.rect
+                                if rect['width'] > 30 and rect['height'] > 20:
+                                    btn_text = btn.text.strip() or btn.get_attribute('value') or 'Sign In'
+                                    login_elements.append({'label': btn_text[:20], 'x': rect['x'], 'y': rect['y'],
+                                                           'width': rect['width'], 'height': rect['height']})
+                                    break  # Only add the first sign-in button found
+                    except Exception:
+                        pass
+                if login_elements != pipeline.seed_elements:
+                    pipeline.seed_elements = login_elements
+                scan_metrics.lap('login_detection')
                 
                 # If we found both username and password fields, try to auto-fill them
                 if has_username_field and has_password_field and not driver.execute_script("return window.geicoLoginAttempted || false"):
                     # Mark that we've attempted login to avoid repeated attempts
                     driver.execute_script("window.geicoLoginAttempted = true;")
                     
-                    print(f"[DEBUG] Found login fields on page: {driver.current_url}")
-                    print("[DEBUG] Waiting 2 seconds before auto-fill...")
+                    if login_log.isEnabledFor(logging.DEBUG):
+                        login_log.debug("Found login fields on page: %s", driver.current_url)
                     
-                    # Wait 2 seconds with countdown
-                    for i in range(2, 0, -1):
-                        current_status = f"Login detected - Auto-fill in {i} seconds..."
-                        print(f"[DEBUG] Countdown: {i} seconds remaining...")
-                        time.sleep(1)
+                    # Let the login form finish initializing before typing into it
+                    session.status = "Login detected - waiting for the form to settle..."
+                    waiter.page_settled(timeout=5, label='login form settle')
                     
-                    print("[DEBUG] Attempting to auto-fill login credentials...")
-                    current_status = "Login detected - Starting auto-fill..."
+                    login_log.debug("Attempting to auto-fill login credentials...")
+                    session.status = "Login detected - Starting auto-fill..."
                     
                     # Perform automatic login - Use detected elements directly
                     try:
                         # Simple, direct approach - just click and type
-                        print("[DEBUG] Using direct Selenium interaction...")
-                        current_status = "Clicking username field..."
+                        login_log.debug("Using direct Selenium interaction...")
+                        session.status = "Clicking username field..."
                         
                         # STEP 1: Click and fill username
-                        print("[DEBUG] Clicking username field...")
-                        print(f"[DEBUG] Username element tag: {username_element.tag_name}")
-                        print(f"[DEBUG] Username element displayed: {username_element.is_displayed()}")
-                        print(f"[DEBUG] Username element enabled: {username_element.is_enabled()}")
+                        login_log.debug("Clicking username field...")
+                        if login_log.isEnabledFor(logging.DEBUG):
+                            login_log.debug("Username element tag: %s", username_element.tag_name)
+                            login_log.debug("Username element displayed: %s", username_element.is_displayed())
+                            login_log.debug("Username element enabled: %s", username_element.is_enabled())
                         
                         # AGGRESSIVE APPROACH: Use execute_script with forced click
-                        print("[DEBUG] Using AGGRESSIVE click approach...")
+                        login_log.debug("Using AGGRESSIVE click approach...")
                         driver.execute_script("""
                             var elem = arguments[0];
                             
@@ -1573,14 +1877,15 @@ def scan_geico_site():
                             elem.dispatchEvent(new Event('change', { bubbles: true }));
                             return elem.value;
                         """, username_element)
-                        current_status = "Username entered, moving to password..."
+                        session.status = "Username entered, moving to password..."
                         
                         # Get element position and size for debugging
                         rect = username_element.rect
-                        print(f"[DEBUG] Username field position - x: {rect['x']}, y: {rect['y']}, width: {rect['width']}, height: {rect['height']}")
+                        login_log.debug("Username field position - x: %s, y: %s, width: %s, height: %s",
+                                        rect['x'], rect['y'], rect['width'], rect['height'])
                         
                         # First try JavaScript click at exact coordinates
-                        print("[DEBUG] Attempting JavaScript click at exact coordinates...")
+                        login_log.debug("Attempting JavaScript click at exact coordinates...")
                         js_click_result = driver.execute_script("""
                             var element = arguments[0];
                             var rect = element.getBoundingClientRect();
@@ -1630,16 +1935,15 @@ def scan_geico_site():
                             return {clicked: true, value: element.value};
                         """, username_element)
                         
-                        print(f"[DEBUG] JavaScript click result: {js_click_result}")
-                        time.sleep(0.5)
+                        login_log.debug("JavaScript click result: %s", js_click_result)
+                        waiter.value_settled(username_element, timeout=2, label='username value')
                         
-                        # Scroll to element
+                        # Scroll to element (instant scroll, no wait needed)
                         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", username_element)
-                        time.sleep(0.5)
                         
                         try:
                             # Try ActionChains first - most reliable method
-                            print("[DEBUG] Attempting ActionChains interaction...")
+                            login_log.debug("Attempting ActionChains interaction...")
                             
                             # First, ensure the element is in the viewport
                             driver.execute_script("""
@@ -1653,16 +1957,16 @@ def scan_geico_site():
                                     }
                                 });
                             """, username_element)
-                            time.sleep(0.5)
+                            # Smooth scroll: wait for the scroll events to stop
+                            waiter.dom_settled(timeout=2, quiet_ms=150, label='username scroll')
                             
                             # Use ActionChains to move to element and click
                             actions = ActionChains(driver)
                             actions.move_to_element(username_element).pause(0.5).click().perform()
-                            print("[DEBUG] ActionChains click executed")
-                            time.sleep(0.3)
+                            login_log.debug("ActionChains click executed")
                             
                             # Clear the field multiple ways
-                            print("[DEBUG] Clearing field...")
+                            login_log.debug("Clearing field...")
                             try:
                                 username_element.clear()
                             except:
@@ -1671,30 +1975,29 @@ def scan_geico_site():
                                 username_element.send_keys(Keys.CONTROL + "a")
                                 username_element.send_keys(Keys.DELETE)
                             
-                            time.sleep(0.3)
+                            waiter.value_settled(username_element, expected='', timeout=2, label='username cleared')
                             
                             # Type username character by character
-                            print("[DEBUG] Typing username character by character...")
+                            login_log.debug("Typing username character by character...")
                             for char in "I017346":
                                 username_element.send_keys(char)
                                 time.sleep(0.05)  # Small delay between characters
                             
-                            print("[DEBUG] Username entered successfully via ActionChains")
+                            login_log.debug("Username entered successfully via ActionChains")
                         except Exception as e:
-                            print(f"[DEBUG] ActionChains interaction failed: {e}")
+                            login_log.debug("ActionChains interaction failed: %s", e)
                             try:
                                 # Fallback to direct click
-                                print("[DEBUG] Trying direct Selenium click...")
+                                login_log.debug("Trying direct Selenium click...")
                                 username_element.click()
-                                time.sleep(0.3)
                                 username_element.clear()
-                                time.sleep(0.3)
+                                waiter.value_settled(username_element, expected='', timeout=2, label='username cleared')
                                 username_element.send_keys("I017346")
-                                print("[DEBUG] Username entered successfully via direct Selenium")
+                                login_log.debug("Username entered successfully via direct Selenium")
                             except Exception as e2:
-                                print(f"[DEBUG] Direct Selenium also failed: {e2}")
+                                login_log.debug("Direct Selenium also failed: %s", e2)
                             # Try JavaScript as backup
-                            print("[DEBUG] Trying JavaScript interaction...")
+                            login_log.debug("Trying JavaScript interaction...")
                             result = driver.execute_script("""
                                 var el = arguments[0];
                                 console.log('Element:', el);
@@ -1706,19 +2009,20 @@ def scan_geico_site():
                                 el.dispatchEvent(new Event('change', { bubbles: true }));
                                 return 'JavaScript execution completed';
                             """, username_element)
-                            print(f"[DEBUG] JavaScript result: {result}")
+                            login_log.debug("JavaScript result: %s", result)
                         
-                        time.sleep(0.5)
+                        waiter.value_settled(username_element, expected='I017346', timeout=3, label='username value')
                         
                         # STEP 2: Click and fill password
-                        print("[DEBUG] Clicking password field...")
-                        current_status = "Clicking password field..."
-                        print(f"[DEBUG] Password element tag: {password_element.tag_name}")
-                        print(f"[DEBUG] Password element displayed: {password_element.is_displayed()}")
-                        print(f"[DEBUG] Password element enabled: {password_element.is_enabled()}")
+                        login_log.debug("Clicking password field...")
+                        session.status = "Clicking password field..."
+                        if login_log.isEnabledFor(logging.DEBUG):
+                            login_log.debug("Password element tag: %s", password_element.tag_name)
+                            login_log.debug("Password element displayed: %s", password_element.is_displayed())
+                            login_log.debug("Password element enabled: %s", password_element.is_enabled())
                         
                         # AGGRESSIVE APPROACH for password too
-                        print("[DEBUG] Using AGGRESSIVE click approach for password...")
+                        login_log.debug("Using AGGRESSIVE click approach for password...")
                         driver.execute_script("""
                             var elem = arguments[0];
                             
@@ -1746,41 +2050,38 @@ def scan_geico_site():
                             elem.dispatchEvent(new Event('change', { bubbles: true }));
                             return elem.value;
                         """, password_element)
-                        current_status = "Password entered, looking for sign-in button..."
+                        session.status = "Password entered, looking for sign-in button..."
                         
                         # Scroll to element first
                         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", password_element)
-                        time.sleep(0.5)
                         
                         try:
                             # Try ActionChains first for password
-                            print("[DEBUG] Attempting ActionChains for password...")
+                            login_log.debug("Attempting ActionChains for password...")
                             actions = ActionChains(driver)
                             actions.move_to_element(password_element).click().perform()
-                            time.sleep(0.3)
-                            print("[DEBUG] ActionChains click successful, clearing password field...")
+                            login_log.debug("ActionChains click successful, clearing password field...")
                             actions.double_click(password_element).perform()
                             password_element.send_keys(Keys.CONTROL + "a")
                             password_element.send_keys(Keys.DELETE)
-                            time.sleep(0.3)
-                            print("[DEBUG] Field cleared, typing password...")
+                            waiter.value_settled(password_element, expected='', timeout=2, label='password cleared')
+                            login_log.debug("Field cleared, typing password...")
                             password_element.send_keys("25Nickc124")
-                            print("[DEBUG] Password entered successfully via ActionChains")
+                            login_log.debug("Password entered successfully via ActionChains")
                         except Exception as e:
-                            print(f"[DEBUG] ActionChains password failed: {e}")
+                            login_log.debug("ActionChains password failed: %s", e)
                             try:
                                 # Fallback to direct click
-                                print("[DEBUG] Trying direct Selenium click on password...")
+                                login_log.debug("Trying direct Selenium click on password...")
                                 password_element.click()
-                                time.sleep(0.3)
                                 password_element.clear()
-                                time.sleep(0.3)
+                                waiter.value_settled(password_element, expected='', timeout=2, label='password cleared')
                                 password_element.send_keys("25Nickc124")
-                                print("[DEBUG] Password entered successfully via direct Selenium")
+                                login_log.debug("Password entered successfully via direct Selenium")
                             except Exception as e2:
-                                print(f"[DEBUG] Direct Selenium password also failed: {e2}")
+                                login_log.debug("Direct Selenium password also failed: %s", e2)
                             # Try JavaScript as backup
-                            print("[DEBUG] Trying JavaScript for password...")
+                            login_log.debug("Trying JavaScript for password...")
                             result = driver.execute_script("""
                                 var el = arguments[0];
                                 console.log('Password element:', el);
@@ -1792,14 +2093,15 @@ def scan_geico_site():
                                 el.dispatchEvent(new Event('change', { bubbles: true }));
                                 return 'Password JavaScript execution completed';
                             """, password_element)
-                            print(f"[DEBUG] JavaScript password result: {result}")
+                            login_log.debug("JavaScript password result: %s", result)
                         
-                        time.sleep(0.5)
+                        waiter.value_settled(password_element, expected='25Nickc124', timeout=3, label='password value')
                         
                         # STEP 3: Find and click sign-in button
-                        print("[DEBUG] Looking for sign-in button...")
-                        current_status = "Clicking sign-in button..."
+                        login_log.debug("Looking for sign-in button...")
+                        session.status = "Clicking sign-in button..."
                         button_clicked = False
+                        waiter.mark_document()
                         
                         # Try to find the button next to the password field
                         try:
@@ -1814,26 +2116,26 @@ def scan_geico_site():
                                     if 'sign' in button_text or 'log' in button_text or \
                                        'sign' in button_value or 'log' in button_value or \
                                        button.get_attribute('type') == 'submit':
-                                        print(f"[DEBUG] Found button: {button_text or button_value}")
+                                        login_log.debug("Found button: %s", button_text or button_value)
                                         button.click()
                                         button_clicked = True
-                                        print("[DEBUG] Button clicked!")
+                                        login_log.debug("Button clicked!")
                                         
                                         # Start Commercial Auto monitor immediately after login
                                         try:
                                             from commercial_auto_immediate_fix import start_commercial_auto_monitor
                                             start_commercial_auto_monitor(driver)
-                                            print("[INFO] Commercial Auto monitor started - will detect and click tab automatically")
+                                            commercial_log.info("Commercial Auto monitor started - will detect and click tab automatically")
                                         except Exception as e:
-                                            print(f"[WARNING] Could not start Commercial Auto monitor: {e}")
+                                            commercial_log.warning("Could not start Commercial Auto monitor: %s", e)
                                         
                                         break
                         except Exception as e:
-                            print(f"[DEBUG] Error finding button: {e}")
+                            login_log.debug("Error finding button: %s", e)
                         
                         # If button not clicked, try form submission
                         if not button_clicked:
-                            print("[DEBUG] Trying form submission...")
+                            login_log.debug("Trying form submission...")
                             try:
                                 driver.execute_script("""
                                     var forms = document.querySelectorAll('form');
@@ -1846,78 +2148,85 @@ def scan_geico_site():
                                     }
                                     return false;
                                 """)
-                                print("[DEBUG] Form submitted")
+                                login_log.debug("Form submitted")
                                 
                                 # Start Commercial Auto monitor after form submission too
                                 try:
                                     from commercial_auto_immediate_fix import start_commercial_auto_monitor
                                     start_commercial_auto_monitor(driver)
-                                    print("[INFO] Commercial Auto monitor started after form submission")
+                                    commercial_log.info("Commercial Auto monitor started after form submission")
                                 except Exception as e:
-                                    print(f"[WARNING] Could not start Commercial Auto monitor: {e}")
+                                    commercial_log.warning("Could not start Commercial Auto monitor: %s", e)
                             except Exception as e:
-                                print(f"[DEBUG] Form submission error: {e}")
+                                login_log.debug("Form submission error: %s", e)
                         
-                        print("[DEBUG] Login automation completed")
-                        current_status = "Login submitted - waiting for page load..."
+                        login_log.debug("Login automation completed")
+                        session.status = "Login submitted - waiting for page load..."
+                        if waiter.navigation_committed(timeout=15, label='login submit'):
+                            flow.advance(quote_flow.DASHBOARD, 'login submitted')
+                            waiter.page_settled(timeout=15, label='dashboard load')
                         # Mark login time for timeout
                         if not hasattr(driver, 'login_submit_time'):
                             driver.login_submit_time = time.time()
                         
                         # FORCE: Set a flag to trigger Commercial Auto check in 3 seconds
                         driver.force_commercial_check_time = time.time() + 3
-                        print("[FORCE] Commercial Auto check scheduled for 3 seconds after login")
+                        commercial_log.info("Commercial Auto check scheduled for 3 seconds after login")
                         
                     except Exception as e:
-                        print(f"[DEBUG] Error during auto-login: {e}")
-                        current_status = f"Login error: {str(e)}"
-                        import traceback
-                        traceback.print_exc()
+                        login_log.exception("Error during auto-login: %s", e)
+                        session.status = f"Login error: {str(e)}"
                 
                 # IMMEDIATE FIX: If we detect login was attempted but we're still seeing login fields, reset
                 if has_username_field and has_password_field and driver.execute_script("return window.geicoLoginAttempted || false"):
                     # Check if URL changed (indicates successful login)
                     current_url = driver.current_url
                     if "login" not in current_url.lower():
-                        print("[FIX] Login successful but still detecting login fields - clearing status")
+                        login_log.info("Login successful but still detecting login fields - clearing status")
                         has_username_field = False
                         has_password_field = False
-                        current_status = "On dashboard - searching for Commercial Auto"
+                        session.status = "On dashboard - searching for Commercial Auto"
+                        flow.advance(quote_flow.DASHBOARD, 'left login page')
                         # Reset login flag
                         driver.execute_script("window.geicoLoginAttempted = false;")
                 
                 # FORCE FIX: Check if we're stuck on "Login submitted - waiting for page load..."
-                if "Login submitted" in current_status and "waiting" in current_status:
+                if flow.state == quote_flow.LOGIN and "Login submitted" in session.status and "waiting" in session.status:
                     if hasattr(driver, 'login_submit_time'):
                         # After 5 seconds, force check for Commercial Auto
                         if time.time() - driver.login_submit_time > 5:
-                            print("\n[TIMEOUT] Login wait timeout after 5 seconds - forcing Commercial Auto check!")
-                            current_status = "Forcing Commercial Auto detection..."
+                            commercial_log.warning("Login wait timeout after 5 seconds - forcing Commercial Auto check!")
+                            session.status = "Forcing Commercial Auto detection..."
                             
                             # Force the commercial auto check
                             try:
                                 from commercial_auto_force_click import ensure_commercial_auto_clicked
-                                print("\n[FORCE] Running Commercial Auto detection regardless of page state!")
-                                print(f"[FORCE] Current URL: {driver.current_url}")
+                                commercial_log.info("Running Commercial Auto detection regardless of page state on %s",
+                                                    driver.current_url)
                                 success = ensure_commercial_auto_clicked(driver)
                                 if success:
-                                    current_status = "Commercial Auto tab clicked!"
+                                    session.status = "Commercial Auto tab clicked!"
                                     driver.login_submit_time = time.time() + 1000  # Prevent repeated attempts
+                                    flow.advance(quote_flow.COMMERCIAL_AUTO, 'forced after login timeout')
                                 else:
-                                    current_status = "Dashboard loaded - Commercial Auto not found"
+                                    session.status = "Dashboard loaded - Commercial Auto not found"
                                     driver.login_submit_time = time.time() + 1000  # Prevent repeated attempts
+                                    flow.advance(quote_flow.DASHBOARD, 'login wait timed out')
                             except Exception as e:
-                                print(f"[ERROR] Force detection failed: {e}")
-                                current_status = "On dashboard"
+                                commercial_log.error("Force detection failed: %s", e)
+                                session.status = "On dashboard"
                                 driver.login_submit_time = time.time() + 1000  # Prevent repeated attempts
                 
+                scan_metrics.lap('login_flow')
+                
                 # ALWAYS CHECK FOR COMMERCIAL AUTO/TRUCKING - NO CONDITIONS
                 # Force check every 3 seconds
-                if time.time() - last_commercial_check_time > 3:
+                if flow.runs('commercial_auto') and time.time() - last_commercial_check_time > 3:
                     # Update the commercial check timer
                     last_commercial_check_time = time.time()
                     # We're not on login page anymore, check if we need to click Commercial Auto/Trucking
-                    print(f"[DEBUG] Commercial Auto check - Login fields: username={has_username_field}, password={has_password_field}")
+                    commercial_log.debug("Commercial Auto check - login fields: username=%s, password=%s",
+                                         has_username_field, has_password_field)
                     try:
                         # Import the AGGRESSIVE Commercial Auto detection
                         try:
@@ -1930,50 +2239,53 @@ def scan_geico_site():
                                 enhanced_method_available = True
                             except ImportError:
                                 enhanced_method_available = False
-                                print("[WARNING] Enhanced Commercial Auto detection not available, using original method")
+                                commercial_log.warning("Enhanced Commercial Auto detection not available, using original method")
                         
                         # Check if we've already clicked commercial auto (avoid repeated clicks)
                         commercial_clicked = driver.execute_script("return window.commercialAutoClicked || false")
-                        print(f"[DEBUG] Commercial Auto already clicked: {commercial_clicked}")
+                        commercial_log.debug("Commercial Auto already clicked: %s", commercial_clicked)
                         
                         success = False
                         
                         # Try FORCE method first (most aggressive)
                         if not commercial_clicked and force_method_available:
-                            print("\n[ALERT] Using AGGRESSIVE force click method for Commercial Auto/Trucking tab!")
+                            commercial_log.info("Using AGGRESSIVE force click method for Commercial Auto/Trucking tab!")
                             success = ensure_commercial_auto_clicked(driver)
                             
                             if success:
-                                print("[SUCCESS] Commercial Auto/Trucking tab FORCE CLICKED!")
-                                current_status = "Navigated to Commercial Auto/Trucking"
+                                commercial_log.info("Commercial Auto/Trucking tab FORCE CLICKED!")
+                                session.status = "Navigated to Commercial Auto/Trucking"
+                                flow.advance(quote_flow.COMMERCIAL_AUTO, 'force click')
                                 # Install the monitoring system to maintain tab selection
                                 monitor_and_maintain_commercial_tab(driver)
-                                print("[INFO] Tab monitoring system activated")
+                                commercial_log.info("Tab monitoring system activated")
                                 continue  # Skip everything else
                             else:
-                                print("[WARNING] Force method failed, trying enhanced method...")
+                                commercial_log.warning("Force method failed, trying enhanced method...")
                         
                         # Try enhanced method if force method not available or failed
                         if not commercial_clicked and not success and enhanced_method_available:
                             # Use enhanced clicking method
-                            print("[DEBUG] Using enhanced Commercial Auto/Trucking tab detection")
+                            commercial_log.debug("Using enhanced Commercial Auto/Trucking tab detection")
                             success = click_commercial_auto_tab(driver, max_attempts=5, debug=True)
                             
                             if success:
-                                print("[SUCCESS] Commercial Auto/Trucking tab clicked successfully")
-                                current_status = "Navigated to Commercial Auto/Trucking"
+                                commercial_log.info("Commercial Auto/Trucking tab clicked successfully")
+                                session.status = "Navigated to Commercial Auto/Trucking"
+                                flow.advance(quote_flow.COMMERCIAL_AUTO, 'enhanced click')
                                 # Install the monitoring system to maintain tab selection
                                 monitor_and_maintain_commercial_tab(driver)
-                                print("[INFO] Tab monitoring system activated")
+                                commercial_log.info("Tab monitoring system activated")
                                 continue  # Skip the old implementation
                             else:
-                                print("[WARNING] Enhanced method failed, falling back to original implementation")
+                                commercial_log.warning("Enhanced method failed, falling back to original implementation")
                         
                         if not commercial_clicked and not success:
-                            print(f"[DEBUG] Checking for Commercial Auto/Trucking tab on URL: {driver.current_url}")
+                            if commercial_log.isEnabledFor(logging.DEBUG):
+                                commercial_log.debug("Checking for Commercial Auto/Trucking tab on URL: %s", driver.current_url)
                             
                             # First, let's try a simple Tab navigation approach
-                            print("[DEBUG] Trying Tab navigation to find Commercial Auto...")
+                            commercial_log.debug("Trying Tab navigation to find Commercial Auto...")
                             try:
                                 # Send Tab keys to navigate through page elements
                                 body = driver.find_element(By.TAG_NAME, "body")
@@ -1991,38 +2303,20 @@ def scan_geico_site():
                                     """)
                                     
                                     if "Commercial Auto" in focused_text:
-                                        print(f"[DEBUG] Found Commercial Auto via Tab navigation at position {i}")
+                                        commercial_log.debug("Found Commercial Auto via Tab navigation at position %s", i)
                                         body.send_keys(Keys.ENTER)
-                                        print("[DEBUG] Pressed Enter on focused element")
-                                        time.sleep(3)
+                                        commercial_log.debug("Pressed Enter on focused element")
+                                        waiter.page_settled(timeout=10, label='commercial auto tab enter')
                                         break
                             except Exception as e:
-                                print(f"[DEBUG] Tab navigation failed: {e}")
+                                commercial_log.debug("Tab navigation failed: %s", e)
                             
-                            # Wait longer for page to fully load after login
-                            print("[DEBUG] Waiting for page to fully load...")
-                            time.sleep(5)
-                            
-                            # Wait for any dynamic content and JavaScript to finish
-                            try:
-                                driver.execute_script("""
-                                    return new Promise((resolve) => {
-                                        if (document.readyState === 'complete') {
-                                            // Wait a bit more for any async JavaScript
-                                            setTimeout(() => resolve(true), 2000);
-                                        } else {
-                                            window.addEventListener('load', () => {
-                                                setTimeout(() => resolve(true), 2000);
-                                            });
-                                        }
-                                    });
-                                """)
-                                print("[DEBUG] Page fully loaded with JavaScript")
-                            except:
-                                print("[DEBUG] Page load wait completed")
+                            # Wait for the dashboard's scripts and requests to finish
+                            commercial_log.debug("Waiting for page to fully load...")
+                            waiter.page_settled(timeout=15, label='dashboard load')
                             
                             # First, let's diagnose what's on the page
-                            print("[DEBUG] Running page diagnostics...")
+                            commercial_log.debug("Running page diagnostics...")
                             page_info = driver.execute_script("""
                                 var results = {
                                     allLinks: [],
@@ -2084,25 +2378,25 @@ def scan_geico_site():
                                 return results;
                             """)
                             
-                            print("[DEBUG] Page diagnostic results:")
-                            print(f"[DEBUG] Links found: {len(page_info['allLinks'])}")
+                            commercial_log.debug("Page diagnostic results:")
+                            commercial_log.debug("Links found: %s", len(page_info['allLinks']))
                             for link in page_info['allLinks'][:5]:  # Show first 5
-                                print(f"[DEBUG]   Link: {link}")
+                                commercial_log.debug("  Link: %s", link)
                             
-                            print(f"[DEBUG] Buttons found: {len(page_info['allButtons'])}")
+                            commercial_log.debug("Buttons found: %s", len(page_info['allButtons']))
                             for button in page_info['allButtons'][:5]:  # Show first 5
-                                print(f"[DEBUG]   Button: {button}")
+                                commercial_log.debug("  Button: %s", button)
                             
-                            print(f"[DEBUG] Commercial Auto elements found: {len(page_info['commercialElements'])}")
+                            commercial_log.debug("Commercial Auto elements found: %s", len(page_info['commercialElements']))
                             for elem in page_info['commercialElements']:
-                                print(f"[DEBUG]   Commercial elem: {elem}")
+                                commercial_log.debug("  Commercial elem: %s", elem)
                             
-                            print(f"[DEBUG] Clickable elements found: {len(page_info['clickableElements'])}")
+                            commercial_log.debug("Clickable elements found: %s", len(page_info['clickableElements']))
                             for elem in page_info['clickableElements'][:5]:  # Show first 5
-                                print(f"[DEBUG]   Clickable: {elem}")
+                                commercial_log.debug("  Clickable: %s", elem)
                             
                             # First try to find navigation tabs/links specifically
-                            print("[DEBUG] Looking for Commercial Auto in navigation elements...")
+                            commercial_log.debug("Looking for Commercial Auto in navigation elements...")
                             nav_click = driver.execute_script("""
                                 // Look for navigation elements specifically
                                 var navElements = document.querySelectorAll('nav a, nav button, .nav a, .nav button, .tabs a, .tabs button, .tab-list a, .tab-list button, ul.tabs li, ul.nav li');
@@ -2130,14 +2424,14 @@ def scan_geico_site():
                                 return 'no nav found';
                             """)
                             
-                            print(f"[DEBUG] Navigation click result: {nav_click}")
+                            commercial_log.debug("Navigation click result: %s", nav_click)
                             
                             if nav_click.startswith('clicked'):
-                                time.sleep(3)
-                                print("[DEBUG] Clicked navigation element")
+                                waiter.page_settled(timeout=10, label='commercial auto nav click')
+                                commercial_log.debug("Clicked navigation element")
                             else:
                                 # Brute force approach - try clicking ALL Commercial Auto elements
-                                print("[DEBUG] Trying brute force approach - clicking all Commercial Auto elements...")
+                                commercial_log.debug("Trying brute force approach - clicking all Commercial Auto elements...")
                                 brute_force_result = driver.execute_script("""
                                     var clicked = [];
                                     var allElements = document.querySelectorAll('*');
@@ -2183,14 +2477,14 @@ def scan_geico_site():
                                     return clicked;
                                 """)
                                 
-                                print(f"[DEBUG] Brute force clicks: {brute_force_result}")
+                                commercial_log.debug("Brute force clicks: %s", brute_force_result)
                                 
                                 if brute_force_result and len(brute_force_result) > 0:
-                                    time.sleep(3)
-                                    print("[DEBUG] Performed brute force clicks")
+                                    waiter.page_settled(timeout=10, label='commercial auto brute force click')
+                                    commercial_log.debug("Performed brute force clicks")
                             
                             # Try the most specific approach - click by known IDs
-                            print("[DEBUG] Trying to click by specific element IDs...")
+                            commercial_log.debug("Trying to click by specific element IDs...")
                             specific_click = driver.execute_script("""
                                 // Try known IDs from logs
                                 var clicked = false;
@@ -2229,14 +2523,14 @@ def scan_geico_site():
                                 return clicked ? 'clicked' : 'not found';
                             """)
                             
-                            print(f"[DEBUG] Specific click result: {specific_click}")
+                            commercial_log.debug("Specific click result: %s", specific_click)
                             
                             if specific_click == 'clicked':
-                                time.sleep(3)
-                                print("[DEBUG] Clicked using specific ID approach")
+                                waiter.page_settled(timeout=10, label='commercial auto id click')
+                                commercial_log.debug("Clicked using specific ID approach")
                             
                             # Now try the general JavaScript approach to find and click
-                            print("[DEBUG] Attempting general JavaScript click on Commercial Auto/Trucking...")
+                            commercial_log.debug("Attempting general JavaScript click on Commercial Auto/Trucking...")
                             js_click_result = driver.execute_script("""
                                 // Find all elements that contain 'Commercial Auto/Trucking' text
                                 var allElements = document.querySelectorAll('*');
@@ -2337,23 +2631,24 @@ def scan_geico_site():
                                 return 'not found';
                             """)
                             
-                            print(f"[DEBUG] JavaScript click result: {js_click_result}")
+                            commercial_log.debug("JavaScript click result: %s", js_click_result)
                             
                             if js_click_result == 'clicked' or js_click_result == 'navigated':
-                                time.sleep(3)  # Wait for navigation
-                                print(f"[DEBUG] Current URL after JS click: {driver.current_url}")
+                                waiter.page_settled(timeout=10, label='commercial auto js click')
+                                if commercial_log.isEnabledFor(logging.DEBUG):
+                                    commercial_log.debug("Current URL after JS click: %s", driver.current_url)
                                 # Continue with the rest of the detection logic below
                             else:
-                                print("[DEBUG] JavaScript click failed, trying alternative approach...")
+                                commercial_log.debug("JavaScript click failed, trying alternative approach...")
                                 
                                 # Alternative approach: Try clicking based on what we found in diagnostics
                                 if len(page_info['commercialElements']) > 0:
-                                    print("[DEBUG] Trying to click based on diagnostic info...")
+                                    commercial_log.debug("Trying to click based on diagnostic info...")
                                     
                                     # Find the most specific Commercial Auto element
                                     for comm_elem in page_info['commercialElements']:
                                         if 'Commercial Auto/Trucking' in comm_elem['text'] and len(comm_elem['text']) < 50:
-                                            print(f"[DEBUG] Found specific element: {comm_elem}")
+                                            commercial_log.debug("Found specific element: %s", comm_elem)
                                             
                                             # Try to click using tag and text
                                             click_attempt = driver.execute_script("""
@@ -2382,18 +2677,18 @@ def scan_geico_site():
                                                 return 'not found';
                                             """, comm_elem['tag'], 'Commercial Auto/Trucking')
                                             
-                                            print(f"[DEBUG] Click attempt result: {click_attempt}")
+                                            commercial_log.debug("Click attempt result: %s", click_attempt)
                                             
                                             if click_attempt == 'clicked':
-                                                time.sleep(3)
+                                                waiter.page_settled(timeout=10, label='commercial auto element click')
                                                 break
                                 
                                 # Last resort: Try coordinate-based click from visual detection
-                                print("[DEBUG] Trying coordinate-based click from visual detection...")
-                                if 'detected_elements' in globals() and detected_elements:
-                                    for elem in detected_elements:
+                                commercial_log.debug("Trying coordinate-based click from visual detection...")
+                                if session.detected_elements:
+                                    for elem in session.detected_elements:
                                         if elem.get('text', '').strip() == 'Commercial Auto/Trucking':
-                                            print(f"[DEBUG] Found Commercial Auto at coordinates: x={elem['x']}, y={elem['y']}")
+                                            commercial_log.debug("Found Commercial Auto at coordinates: x=%s, y=%s", elem['x'], elem['y'])
                                             
                                             # Use ActionChains for precise clicking
                                             try:
@@ -2405,11 +2700,11 @@ def scan_geico_site():
                                                 
                                                 # Move to element and click
                                                 actions.move_by_offset(x, y).click().perform()
-                                                print(f"[DEBUG] Performed coordinate click at ({x}, {y})")
-                                                time.sleep(3)
+                                                commercial_log.debug("Performed coordinate click at (%s, %s)", x, y)
+                                                waiter.page_settled(timeout=10, label='commercial auto coordinate click')
                                                 break
                                             except Exception as e:
-                                                print(f"[DEBUG] Coordinate click failed: {e}")
+                                                commercial_log.debug("Coordinate click failed: %s", e)
                                                 
                                                 # Try JavaScript coordinate click
                                                 driver.execute_script(f"""
@@ -2461,17 +2756,18 @@ def scan_geico_site():
                                     
                                     if 'checkbox' not in parent_classes.lower() and 'radio' not in parent_classes.lower():
                                         filtered_elements.append(elem)
-                                        print(f"[DEBUG] Found potential Commercial Auto element: {elem.tag_name}")
+                                        if commercial_log.isEnabledFor(logging.DEBUG):
+                                            commercial_log.debug("Found potential Commercial Auto element: %s", elem.tag_name)
                                 except:
                                     filtered_elements.append(elem)
                             
                             commercial_elements = filtered_elements
                             
-                            print(f"[DEBUG] Found {len(commercial_elements)} potential Commercial Auto/Trucking elements via XPath")
+                            commercial_log.debug("Found %s potential Commercial Auto/Trucking elements via XPath", len(commercial_elements))
                             
                             # If XPath doesn't work, try JavaScript to find elements
                             if not commercial_elements:
-                                print("[DEBUG] XPath failed, trying JavaScript search...")
+                                commercial_log.debug("XPath failed, trying JavaScript search...")
                                 js_elements = driver.execute_script("""
                                     var elements = [];
                                     var allElements = document.querySelectorAll('*');
@@ -2510,9 +2806,9 @@ def scan_geico_site():
                                     return elements;
                                 """)
                                 commercial_elements = js_elements if js_elements else []
-                                print(f"[DEBUG] Found {len(commercial_elements)} elements via JavaScript")
+                                commercial_log.debug("Found %s elements via JavaScript", len(commercial_elements))
                             
-                            print(f"[DEBUG] Total found: {len(commercial_elements)} potential Commercial Auto/Trucking elements")
+                            commercial_log.debug("Total found: %s potential Commercial Auto/Trucking elements", len(commercial_elements))
                             
                             # Look for the most specific, smallest element that contains the text
                             best_element = None
@@ -2528,20 +2824,21 @@ def scan_geico_site():
                                     rect = elem.rect
                                     area = rect['width'] * rect['height']
                                     
-                                    print(f"[DEBUG] Checking element: tag={elem_tag}, href={elem_href[:50] if len(elem_href) > 50 else elem_href}, role={elem_role}, area={area}")
+                                    commercial_log.debug("Checking element: tag=%s, href=%s, role=%s, area=%s",
+                                                         elem_tag, elem_href[:50] if len(elem_href) > 50 else elem_href, elem_role, area)
                                     
                                     # Skip very large elements (likely containers)
                                     if area > 50000:
-                                        print(f"[DEBUG] Skipping large element (area={area}): '{elem_text[:50]}...'")
+                                        commercial_log.debug("Skipping large element (area=%s): '%s...'", area, elem_text[:50])
                                         continue
                                     
                                     # Look for exact match or close match
                                     if elem_text == "Commercial Auto/Trucking" or \
                                        (elem_text.startswith("Commercial Auto/Trucking") and len(elem_text) < 50):
-                                        print(f"[DEBUG] Found good Commercial Auto element: '{elem_text}' (tag={elem_tag}, area={area})")
+                                        commercial_log.debug("Found good Commercial Auto element: '%s' (tag=%s, area=%s)", elem_text, elem_tag, area)
                                         # Prefer clickable elements (a, button) over generic elements
                                         if elem_tag.lower() in ['a', 'button'] or elem_role == 'button':
-                                            print(f"[DEBUG] This is a clickable element! Setting as best element.")
+                                            commercial_log.debug("This is a clickable element! Setting as best element.")
                                             best_element = elem
                                             break  # Found a clickable element, use it
                                         elif area < smallest_area:
@@ -2551,8 +2848,8 @@ def scan_geico_site():
                             if best_element:
                                 elem = best_element
                                 elem_text = elem.text.strip()
-                                print(f"[DEBUG] Selected best Commercial Auto element to click: '{elem_text}'")
-                                current_status = "Found Commercial Auto/Trucking - clicking..."
+                                commercial_log.debug("Selected best Commercial Auto element to click: '%s'", elem_text)
+                                session.status = "Found Commercial Auto/Trucking - clicking..."
                                 
                                 # Highlight the element and get detailed diagnostics
                                 elem_diagnostics = driver.execute_script("""
@@ -2600,7 +2897,7 @@ def scan_geico_site():
                                     return diagnostics;
                                 """, elem)
                                 
-                                print(f"[DEBUG] Green element diagnostics: {elem_diagnostics}")
+                                commercial_log.debug("Green element diagnostics: %s", elem_diagnostics)
                                 
                                 # Capture the HTML structure around this element
                                 elem_html = driver.execute_script("""
@@ -2614,19 +2911,19 @@ def scan_geico_site():
                                     return html;
                                 """, elem)
                                 
-                                print(f"[DEBUG] Element HTML structure:")
-                                print(f"[DEBUG]   Element: {elem_html['outer']}")
-                                print(f"[DEBUG]   Parent: {elem_html['parent']}")
-                                print(f"[DEBUG]   Grandparent: {elem_html['grandparent']}")
+                                commercial_log.debug("Element HTML structure:")
+                                commercial_log.debug("  Element: %s", elem_html['outer'])
+                                commercial_log.debug("  Parent: %s", elem_html['parent'])
+                                commercial_log.debug("  Grandparent: %s", elem_html['grandparent'])
                                 
-                                time.sleep(1)  # Brief pause to show highlight
+                                waiter.pause(1, 'commercial auto highlight')  # Brief pause to show highlight
                                 
                                 # Decide on click strategy based on diagnostics
                                 if elem_diagnostics.get('hasOverlay'):
-                                    print(f"[DEBUG] Element has overlay! Overlay element: {elem_diagnostics.get('overlayElement')}")
+                                    commercial_log.debug("Element has overlay! Overlay element: %s", elem_diagnostics.get('overlayElement'))
                                 
                                 if not elem_diagnostics.get('isClickable'):
-                                    print(f"[DEBUG] Element is not directly clickable. Parent: {elem_diagnostics.get('parentTag')}")
+                                    commercial_log.debug("Element is not directly clickable. Parent: %s", elem_diagnostics.get('parentTag'))
                                 
                                 try:
                                     # Smart click based on element properties
@@ -2780,27 +3077,27 @@ def scan_geico_site():
                                         console.log('Commercial Auto/Trucking click attempted with all methods');
                                         return false;  // Return false unless we navigated directly
                                     """, elem, elem_diagnostics)
-                                    print("[DEBUG] Attempted Commercial Auto/Trucking click with multiple methods")
-                                    current_status = "Commercial Auto/Trucking clicked - loading..."
-                                    time.sleep(3)  # Wait for page to load
+                                    commercial_log.debug("Attempted Commercial Auto/Trucking click with multiple methods")
+                                    session.status = "Commercial Auto/Trucking clicked - loading..."
+                                    waiter.page_settled(timeout=10, label='commercial auto click')
                                 except Exception as js_error:
-                                    print(f"[DEBUG] JavaScript methods failed: {js_error}, trying other approaches")
+                                    commercial_log.debug("JavaScript methods failed: %s, trying other approaches", js_error)
                                     
                                 # Try focused approach based on element type
                                 if elem_diagnostics.get('tagName') == 'SPAN':
-                                    print("[DEBUG] Green element is a SPAN - looking for clickable parent")
+                                    commercial_log.debug("Green element is a SPAN - looking for clickable parent")
                                     try:
                                         # For SPAN elements, the parent is usually the clickable element
                                         parent_elem = driver.execute_script("return arguments[0].parentElement;", elem)
                                         if parent_elem:
-                                            print("[DEBUG] Clicking parent of SPAN element")
+                                            commercial_log.debug("Clicking parent of SPAN element")
                                             parent_elem.click()
-                                            time.sleep(2)
+                                            waiter.page_settled(timeout=10, label='commercial auto parent click')
                                     except Exception as e:
-                                        print(f"[DEBUG] Parent click failed: {e}")
+                                        commercial_log.debug("Parent click failed: %s", e)
                                 
                                 # Try simulating a real user click with all events
-                                print("[DEBUG] Trying real user simulation click...")
+                                commercial_log.debug("Trying real user simulation click...")
                                 try:
                                     user_click_result = driver.execute_script("""
                                         var elem = arguments[0];
@@ -2848,20 +3145,20 @@ def scan_geico_site():
                                         return 'user simulation complete';
                                     """, elem)
                                     
-                                    print(f"[DEBUG] User simulation result: {user_click_result}")
-                                    time.sleep(2)
+                                    commercial_log.debug("User simulation result: %s", user_click_result)
+                                    waiter.page_settled(timeout=10, label='commercial auto simulated click')
                                 except Exception as e:
-                                    print(f"[DEBUG] User simulation failed: {e}")
+                                    commercial_log.debug("User simulation failed: %s", e)
                                 
                                 # Try Selenium click
                                 try:
                                     elem.click()
                                     # Don't set commercialAutoClicked here - will verify after
-                                    print("[DEBUG] Attempted Commercial Auto/Trucking click via Selenium")
-                                    current_status = "Commercial Auto/Trucking clicked - loading..."
-                                    time.sleep(2)  # Wait for page to load
+                                    commercial_log.debug("Attempted Commercial Auto/Trucking click via Selenium")
+                                    session.status = "Commercial Auto/Trucking clicked - loading..."
+                                    waiter.page_settled(timeout=10, label='commercial auto selenium click')
                                 except Exception as selenium_error:
-                                    print(f"[DEBUG] Selenium click failed: {selenium_error}, trying ActionChains")
+                                    commercial_log.debug("Selenium click failed: %s, trying ActionChains", selenium_error)
                                     
                                     # Try ActionChains
                                     try:
@@ -2869,48 +3166,47 @@ def scan_geico_site():
                                         actions = ActionChains(driver)
                                         actions.move_to_element(elem).click().perform()
                                         # Don't set commercialAutoClicked here - will verify after
-                                        print("[DEBUG] Attempted Commercial Auto/Trucking click via ActionChains")
-                                        current_status = "Commercial Auto/Trucking clicked - loading..."
-                                        time.sleep(2)
+                                        commercial_log.debug("Attempted Commercial Auto/Trucking click via ActionChains")
+                                        session.status = "Commercial Auto/Trucking clicked - loading..."
+                                        waiter.page_settled(timeout=10, label='commercial auto actions click')
                                     except Exception as action_error:
-                                        print(f"[DEBUG] ActionChains also failed: {action_error}")
+                                        commercial_log.debug("ActionChains also failed: %s", action_error)
                                         
                                         # Try keyboard navigation as last resort
-                                        print("[DEBUG] Trying keyboard navigation approach...")
+                                        commercial_log.debug("Trying keyboard navigation approach...")
                                         try:
                                             # Focus on the element first
                                             driver.execute_script("arguments[0].focus();", elem)
-                                            time.sleep(0.5)
                                             
                                             # Try pressing Enter
                                             elem.send_keys(Keys.ENTER)
-                                            print("[DEBUG] Sent Enter key to element")
-                                            time.sleep(2)
+                                            commercial_log.debug("Sent Enter key to element")
+                                            waiter.page_settled(timeout=10, label='commercial auto enter key')
                                             
                                             # Check if page changed
                                             new_url = driver.current_url
                                             if new_url != current_url:
-                                                print(f"[DEBUG] URL changed after Enter key: {new_url}")
+                                                commercial_log.debug("URL changed after Enter key: %s", new_url)
                                             else:
                                                 # Try Space key
                                                 elem.send_keys(Keys.SPACE)
-                                                print("[DEBUG] Sent Space key to element")
-                                                time.sleep(2)
+                                                commercial_log.debug("Sent Space key to element")
+                                                waiter.page_settled(timeout=10, label='commercial auto space key')
                                         except Exception as kbd_error:
-                                            print(f"[DEBUG] Keyboard navigation failed: {kbd_error}")
+                                            commercial_log.debug("Keyboard navigation failed: %s", kbd_error)
                             
                             else:
-                                print("[DEBUG] No clickable Commercial Auto/Trucking element found via DOM search")
+                                commercial_log.debug("No clickable Commercial Auto/Trucking element found via DOM search")
                                 
                                 # Try clicking using coordinates from visual detection
-                                print("[DEBUG] Attempting to click Commercial Auto using visual detection...")
+                                commercial_log.debug("Attempting to click Commercial Auto using visual detection...")
                                 try:
                                     # Look for Commercial Auto in detected elements
-                                    for elem_data in detected_elements:
+                                    for elem_data in session.detected_elements:
                                         if elem_data.get('text', '').strip() == 'Commercial Auto/Trucking':
                                             x = elem_data['x'] + elem_data['width'] // 2
                                             y = elem_data['y'] + elem_data['height'] // 2
-                                            print(f"[DEBUG] Found Commercial Auto in visual detection at ({x}, {y})")
+                                            commercial_log.debug("Found Commercial Auto in visual detection at (%s, %s)", x, y)
                                             
                                             # Click using JavaScript at coordinates
                                             driver.execute_script(f"""
@@ -2945,17 +3241,17 @@ def scan_geico_site():
                                                 }}
                                                 return false;
                                             """)
-                                            print("[DEBUG] Clicked Commercial Auto via visual detection coordinates")
-                                            current_status = "Commercial Auto clicked via visual detection"
-                                            time.sleep(3)
+                                            commercial_log.debug("Clicked Commercial Auto via visual detection coordinates")
+                                            session.status = "Commercial Auto clicked via visual detection"
+                                            waiter.page_settled(timeout=10, label='commercial auto visual click')
                                             break
                                 except Exception as e:
-                                    print(f"[DEBUG] Visual detection click failed: {e}")
+                                    commercial_log.debug("Visual detection click failed: %s", e)
                             
                             # After all click attempts, verify if we actually navigated
-                            time.sleep(3)  # Give page time to load
+                            waiter.page_settled(timeout=10, label='commercial auto verify')
                             current_url = driver.current_url
-                            print(f"[DEBUG] Current URL after click attempt: {current_url}")
+                            commercial_log.debug("Current URL after click attempt: %s", current_url)
                             
                             # More comprehensive check for successful navigation
                             page_changed = False
@@ -2963,7 +3259,7 @@ def scan_geico_site():
                             # Check 1: URL changed
                             if "commercial" in current_url.lower() or "trucking" in current_url.lower() or "product" not in current_url.lower():
                                 page_changed = True
-                                print("[DEBUG] URL indicates we're on Commercial Auto page")
+                                commercial_log.debug("URL indicates we're on Commercial Auto page")
                             
                             # Check 2: Look for form elements that appear after clicking Commercial Auto
                             if not page_changed:
@@ -2977,7 +3273,7 @@ def scan_geico_site():
                                 )
                                 if len(form_indicators) > 0:
                                     page_changed = True
-                                    print(f"[DEBUG] Found {len(form_indicators)} Commercial Auto form elements")
+                                    commercial_log.debug("Found %s Commercial Auto form elements", len(form_indicators))
                             
                             # Check 3: Page title changed
                             if not page_changed:
@@ -2985,40 +3281,41 @@ def scan_geico_site():
                                     page_title = driver.title
                                     if "commercial" in page_title.lower() or "trucking" in page_title.lower():
                                         page_changed = True
-                                        print(f"[DEBUG] Page title indicates Commercial Auto: {page_title}")
+                                        commercial_log.debug("Page title indicates Commercial Auto: %s", page_title)
                                 except:
                                     pass
                             
                             if page_changed:
                                 driver.execute_script("window.commercialAutoClicked = true;")
-                                print("[DEBUG] Successfully navigated to Commercial Auto page!")
+                                commercial_log.debug("Successfully navigated to Commercial Auto page!")
+                                flow.advance(quote_flow.COMMERCIAL_AUTO, 'navigated')
                                 # Install the monitoring system to maintain tab selection
                                 monitor_and_maintain_commercial_tab(driver)
-                                print("[INFO] Tab monitoring system activated")
+                                commercial_log.info("Tab monitoring system activated")
                             else:
-                                print("[DEBUG] Commercial Auto click failed - still on product selection page")
+                                commercial_log.debug("Commercial Auto click failed - still on product selection page")
                                 driver.execute_script("window.commercialAutoClicked = false;")
                                 # Force another attempt on next scan
                                 commercial_clicked = False
                                 
                     except Exception as e:
-                        print(f"[DEBUG] Error checking for Commercial Auto/Trucking: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        commercial_log.exception("Error checking for Commercial Auto/Trucking: %s", e)
+                
+                scan_metrics.lap('commercial_auto')
                 
                 # CHECK IF WE'RE ON COMMERCIAL AUTO PAGE AND NEED TO FILL ZIP CODE
                 # This runs after Commercial Auto/Trucking is clicked
-                if driver.execute_script("return window.commercialAutoClicked || false") and \
-                   not driver.execute_script("return window.zipCodeFilled || false"):
+                if flow.runs('zip') and not driver.execute_script("return window.zipCodeFilled || false"):
                     try:
-                        print(f"[DEBUG] On Commercial Auto page, checking for zip code field...")
-                        print(f"[DEBUG] Current URL: {driver.current_url}")
-                        # Wait longer for form to load
-                        time.sleep(5)
+                        commercial_log.debug("On Commercial Auto page, checking for zip code field...")
+                        if log.isEnabledFor(logging.DEBUG):
+                            log.debug("Current URL: %s", driver.current_url)
+                        # Wait for the quote form's zip field to render
+                        waiter.element_visible(ZIP_FIELD_XPATH, timeout=15, label='zip field')
                         
                         # Look for ALL input fields first to debug
                         all_inputs = driver.find_elements(By.TAG_NAME, "input")
-                        print(f"[DEBUG] Total input fields on page: {len(all_inputs)}")
+                        log.debug("Total input fields on page: %s", len(all_inputs))
                         
                         # Look for garage/zip code field - try multiple selectors including case variations
                         zip_elements = driver.find_elements(By.XPATH, 
@@ -3031,18 +3328,18 @@ def scan_geico_site():
                             "//input[@type='text' or @type='number'][position() > 1]"  # Get text/number inputs that aren't the first one
                         )
                         
-                        print(f"[DEBUG] Found {len(zip_elements)} potential zip code fields")
+                        log.debug("Found %s potential zip code fields", len(zip_elements))
                         
                         # Debug: print info about visible inputs
                         if len(zip_elements) == 0:
-                            print("[DEBUG] No zip fields found. Checking all visible inputs:")
+                            log.debug("No zip fields found. Checking all visible inputs:")
                             for idx, inp in enumerate(all_inputs[:10]):  # Check first 10 inputs
                                 if inp.is_displayed():
                                     inp_type = inp.get_attribute('type') or 'text'
                                     inp_name = inp.get_attribute('name') or ''
                                     inp_id = inp.get_attribute('id') or ''
                                     inp_placeholder = inp.get_attribute('placeholder') or ''
-                                    print(f"[DEBUG] Input {idx}: type={inp_type}, name={inp_name}, id={inp_id}, placeholder={inp_placeholder}")
+                                    log.debug("Input %s: type=%s, name=%s, id=%s, placeholder=%s", idx, inp_type, inp_name, inp_id, inp_placeholder)
                         
                         zip_filled = False
                         for zip_elem in zip_elements:
@@ -3051,7 +3348,8 @@ def scan_geico_site():
                                     elem_name = zip_elem.get_attribute('name') or ''
                                     elem_id = zip_elem.get_attribute('id') or ''
                                     elem_placeholder = zip_elem.get_attribute('placeholder') or ''
-                                    print(f"[DEBUG] Found zip field - name: '{elem_name}', id: '{elem_id}', placeholder: '{elem_placeholder}'")
+                                    log.debug("Found zip field - name: '%s', id: '%s', placeholder: '%s'", elem_name, elem_id, elem_placeholder)
+                                    flow.advance(quote_flow.ZIP, 'zip field shown')
                                     
                                     # Highlight the field
                                     driver.execute_script("""
@@ -3060,8 +3358,8 @@ def scan_geico_site():
                                         elem.style.backgroundColor = 'rgba(0, 0, 255, 0.1)';
                                     """, zip_elem)
                                     
-                                    current_status = "Filling garage zip code..."
-                                    time.sleep(1)
+                                    session.status = "Filling garage zip code..."
+                                    waiter.pause(1, 'zip highlight')
                                     
                                     # Click and fill the zip code with proper event sequence
                                     driver.execute_script("""
@@ -3129,21 +3427,21 @@ def scan_geico_site():
                                         window.zipCodeFilled = true;
                                     """, zip_elem)
                                     
-                                    print("[DEBUG] Successfully filled zip code 44256")
+                                    log.debug("Successfully filled zip code 44256")
                                     
-                                    # Wait for JavaScript to complete
-                                    time.sleep(2)
+                                    # Wait for the page's input handlers to stop rewriting the value
+                                    waiter.value_settled(zip_elem, expected='44256', timeout=3, label='zip value')
                                     
                                     # Now use Selenium to ensure the field is focused and press Enter
-                                    print("[DEBUG] Using Selenium to focus and press Enter on zip field")
+                                    log.debug("Using Selenium to focus and press Enter on zip field")
                                     try:
                                         zip_elem.click()  # Click to focus
-                                        time.sleep(0.5)
+                                        waiter.dom_settled(timeout=1, quiet_ms=150, label='zip focus')
                                         
                                         # Send Enter key using Selenium
                                         from selenium.webdriver.common.keys import Keys
                                         zip_elem.send_keys(Keys.ENTER)
-                                        print("[DEBUG] Sent Enter key using Selenium")
+                                        log.debug("Sent Enter key using Selenium")
                                         
                                         # Also try with JavaScript one more time
                                         driver.execute_script("""
@@ -3169,13 +3467,14 @@ def scan_geico_site():
                                         """, zip_elem)
                                         
                                     except Exception as e:
-                                        print(f"[DEBUG] Error with Selenium Enter: {e}")
+                                        log.debug("Error with Selenium Enter: %s", e)
                                     
                                     zip_filled = True
                                     saved_zip_elem = zip_elem  # Save reference to zip field
+                                    flow.advance(quote_flow.USDOT, 'zip entered')
                                     
                                     # Set up a JavaScript observer to monitor the zip field
-                                    print("[DEBUG] Setting up zip field monitor...")
+                                    log.debug("Setting up zip field monitor...")
                                     try:
                                         driver.execute_script("""
                                             var zipElem = arguments[0];
@@ -3224,15 +3523,15 @@ def scan_geico_site():
                                             window.geicoZipObserver = observer;
                                             console.log('Zip field monitor installed');
                                         """, zip_elem)
-                                        print("[DEBUG] Zip field monitor installed successfully")
+                                        log.debug("Zip field monitor installed successfully")
                                     except Exception as e:
-                                        print(f"[DEBUG] Error setting up zip monitor: {e}")
+                                        log.debug("Error setting up zip monitor: %s", e)
                                     
                                     # Verify zip code is actually in the field
-                                    time.sleep(0.5)
+                                    waiter.value_settled(zip_elem, timeout=2, label='zip value')
                                     try:
                                         current_zip_value = zip_elem.get_attribute('value')
-                                        print(f"[DEBUG] Zip field value after filling: '{current_zip_value}'")
+                                        log.debug("Zip field value after filling: '%s'", current_zip_value)
                                         
                                         # Check if there are any event listeners or validation attributes
                                         zip_events = driver.execute_script("""
@@ -3249,14 +3548,15 @@ def scan_geico_site():
                                             };
                                             return {events: events, validation: validation, form: elem.form ? elem.form.id : 'no-form'};
                                         """, zip_elem)
-                                        print(f"[DEBUG] Zip field properties: {zip_events}")
+                                        log.debug("Zip field properties: %s", zip_events)
                                     except Exception as e:
-                                        print(f"[DEBUG] Error checking zip field: {e}")
+                                        log.debug("Error checking zip field: %s", e)
                                     
-                                    time.sleep(5)  # Give more time for double-click, Enter, and state to populate
+                                    # Double-click, Enter and the zip lookup request that fills in the state
+                                    waiter.page_settled(timeout=8, label='zip submit')
                                     
                                     # Check if state field got populated - wait up to 10 seconds
-                                    print("[DEBUG] Waiting for state field to populate with Ohio...")
+                                    log.debug("Waiting for state field to populate with Ohio...")
                                     state_populated = False
                                     for wait_count in range(10):
                                         try:
@@ -3281,19 +3581,20 @@ def scan_geico_site():
                                                     else:
                                                         state_text = state_elem.text or ''
                                                     
-                                                    print(f"[DEBUG] Attempt {wait_count+1}: State field value: '{state_value}', text: '{state_text}'")
+                                                    log.debug("Attempt %s: State field value: '%s', text: '%s'",
+                                                              wait_count+1, state_value, state_text)
                                                     
                                                     # Check if Ohio/OH is selected
                                                     if 'OH' in state_value or 'Ohio' in state_value or 'OH' in state_text or 'Ohio' in state_text:
-                                                        print("[DEBUG] SUCCESS! Ohio is now selected in state field")
+                                                        log.debug("SUCCESS! Ohio is now selected in state field")
                                                         state_populated = True
                                                         break
                                                     elif 'Please' in state_text or 'Select' in state_text or state_value == '':
-                                                        print("[DEBUG] State still shows 'Please Select' - zip not submitted yet")
+                                                        log.debug("State still shows 'Please Select' - zip not submitted yet")
                                                         
                                                         # Try pressing Enter again on zip field
                                                         if wait_count < 5:  # Try a few more times
-                                                            print("[DEBUG] Trying Enter on zip field again...")
+                                                            log.debug("Trying Enter on zip field again...")
                                                             try:
                                                                 from selenium.webdriver.common.keys import Keys
                                                                 zip_elem.click()
@@ -3301,22 +3602,24 @@ def scan_geico_site():
                                                             except:
                                                                 pass
                                                     else:
-                                                        print(f"[DEBUG] State shows: {state_text} - not Ohio")
+                                                        log.debug("State shows: %s - not Ohio", state_text)
                                                     break
                                             
                                             if state_populated:
                                                 break
                                                 
-                                            time.sleep(1)  # Wait 1 second before checking again
+                                            # Up to 1 second for the lookup to select Ohio before checking again
+                                            waiter.field_value(STATE_FIELD_XPATH, lambda text: 'OH' in text or 'Ohio' in text,
+                                                               timeout=1, label='state = Ohio')
                                         
                                             # Re-check zip value before proceeding
                                             final_zip = zip_elem.get_attribute('value')
-                                            print(f"[DEBUG] Zip value after Enter: '{final_zip}'")
+                                            log.debug("Zip value after Enter: '%s'", final_zip)
                                         except Exception as e:
-                                            print(f"[DEBUG] Error checking state: {e}")
+                                            log.debug("Error checking state: %s", e)
                                     
                                     # Try Tab key instead of background click
-                                    print("[DEBUG] Pressing Tab to move to next field...")
+                                    log.debug("Pressing Tab to move to next field...")
                                     try:
                                         driver.execute_script("""
                                             var elem = arguments[0];
@@ -3351,14 +3654,14 @@ def scan_geico_site():
                                                 }
                                             }, 100);
                                         """, zip_elem)
-                                        print("[DEBUG] Tab key pressed successfully")
-                                        time.sleep(1)
+                                        log.debug("Tab key pressed successfully")
+                                        waiter.page_settled(timeout=3, label='zip blur')
                                     except Exception as tab_error:
-                                        print(f"[DEBUG] Error pressing Tab: {tab_error}")
+                                        log.debug("Error pressing Tab: %s", tab_error)
                                     
                                     # Now look for USDOT field to click and fill
-                                    print("[DEBUG] Looking for USDOT field...")
-                                    time.sleep(2)  # Wait for page to update after background click
+                                    log.debug("Looking for USDOT field...")
+                                    waiter.element_visible(USDOT_FIELD_XPATH, timeout=5, label='usdot field')
                                     
                                     # More comprehensive USDOT search
                                     usdot_elements = driver.find_elements(By.XPATH,
@@ -3369,7 +3672,7 @@ def scan_geico_site():
                                         "//input[@type='text' or @type='number']"  # Get all text/number inputs as fallback
                                     )
                                     
-                                    print(f"[DEBUG] Found {len(usdot_elements)} potential USDOT fields")
+                                    log.debug("Found %s potential USDOT fields", len(usdot_elements))
                                     
                                     usdot_filled = False
                                     for idx, usdot_elem in enumerate(usdot_elements):
@@ -3379,11 +3682,12 @@ def scan_geico_site():
                                                 elem_id = usdot_elem.get_attribute('id') or ''
                                                 elem_placeholder = usdot_elem.get_attribute('placeholder') or ''
                                                 elem_value = usdot_elem.get_attribute('value') or ''
-                                                print(f"[DEBUG] USDOT field {idx}: name='{elem_name}', id='{elem_id}', placeholder='{elem_placeholder}', value='{elem_value}'")
+                                                log.debug("USDOT field %s: name='%s', id='%s', placeholder='%s', value='%s'",
+                                                          idx, elem_name, elem_id, elem_placeholder, elem_value)
                                                 
                                                 # Skip if this is the zip field we just filled
                                                 if elem_value == '44256' or 'zip' in elem_name.lower() or 'zip' in elem_id.lower():
-                                                    print(f"[DEBUG] Skipping field {idx} - appears to be zip field")
+                                                    log.debug("Skipping field %s - appears to be zip field", idx)
                                                     continue
                                                 
                                                 # Check if this looks like a USDOT field
@@ -3391,7 +3695,7 @@ def scan_geico_site():
                                                     'dot' in elem_placeholder.lower() or
                                                     (elem_value == '' and idx > 0)):  # Empty field after zip
                                                     
-                                                    print(f"[DEBUG] Field {idx} appears to be USDOT field - clicking and filling")
+                                                    log.debug("Field %s appears to be USDOT field - clicking and filling", idx)
                                                     
                                                     # Highlight and click USDOT field
                                                 driver.execute_script("""
@@ -3404,10 +3708,10 @@ def scan_geico_site():
                                                     console.log('USDOT field clicked');
                                                 """, usdot_elem)
                                                 
-                                                time.sleep(0.5)
+                                                waiter.dom_settled(timeout=1, quiet_ms=150, label='usdot focus')
                                                 
                                                 # Fill USDOT number
-                                                print("[DEBUG] Filling USDOT number 3431557")
+                                                log.debug("Filling USDOT number 3431557")
                                                 driver.execute_script("""
                                                     var elem = arguments[0];
                                                     elem.value = '';
@@ -3417,12 +3721,12 @@ def scan_geico_site():
                                                     console.log('USDOT number 3431557 entered');
                                                 """, usdot_elem)
                                                 
-                                                print("[DEBUG] Successfully filled USDOT number")
-                                                current_status = "USDOT filled - pressing Enter"
+                                                log.debug("Successfully filled USDOT number")
+                                                session.status = "USDOT filled - pressing Enter"
                                                 
                                                 # Press Enter after USDOT
-                                                time.sleep(0.5)
-                                                print("[DEBUG] Pressing Enter key after USDOT")
+                                                waiter.value_settled(usdot_elem, timeout=2, label='usdot value')
+                                                log.debug("Pressing Enter key after USDOT")
                                                 try:
                                                     driver.execute_script("""
                                                         var elem = arguments[0];
@@ -3446,13 +3750,13 @@ def scan_geico_site():
                                                         
                                                         console.log('Enter key pressed after USDOT');
                                                     """, usdot_elem)
-                                                    print("[DEBUG] Enter key pressed successfully after USDOT")
+                                                    log.debug("Enter key pressed successfully after USDOT")
                                                 except Exception as enter_error:
-                                                    print(f"[DEBUG] Error pressing Enter after USDOT: {enter_error}")
+                                                    log.debug("Error pressing Enter after USDOT: %s", enter_error)
                                                 
                                                 # Click background after Enter
-                                                time.sleep(0.5)
-                                                print("[DEBUG] Clicking background after USDOT Enter")
+                                                waiter.page_settled(timeout=3, label='usdot enter')
+                                                log.debug("Clicking background after USDOT Enter")
                                                 try:
                                                     body = driver.find_element(By.TAG_NAME, "body")
                                                     driver.execute_script("""
@@ -3469,11 +3773,11 @@ def scan_geico_site():
                                                         body.dispatchEvent(clickEvent);
                                                         console.log('Background clicked after USDOT Enter');
                                                     """, body)
-                                                    print("[DEBUG] Background clicked successfully after USDOT")
+                                                    log.debug("Background clicked successfully after USDOT")
                                                     
                                                     # Check what happened to zip field
-                                                    time.sleep(1)
-                                                    print("[DEBUG] Checking zip field status after USDOT entry...")
+                                                    waiter.dom_settled(timeout=2, label='usdot background click')
+                                                    log.debug("Checking zip field status after USDOT entry...")
                                                     try:
                                                         zip_check_elements = driver.find_elements(By.XPATH,
                                                             "//input[contains(translate(@name, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'zip') or " +
@@ -3483,22 +3787,22 @@ def scan_geico_site():
                                                             if zip_check.is_displayed():
                                                                 zip_value = zip_check.get_attribute('value') or ''
                                                                 zip_name = zip_check.get_attribute('name') or ''
-                                                                print(f"[DEBUG] Zip field '{zip_name}' value after USDOT: '{zip_value}'")
+                                                                log.debug("Zip field '%s' value after USDOT: '%s'", zip_name, zip_value)
                                                                 if zip_value == '':
-                                                                    print("[DEBUG] WARNING: Zip field was cleared!")
+                                                                    log.warning("Zip field was cleared!")
                                                                     # Store reference for periodic scanner to refill
                                                                     driver.execute_script("window.zipWasCleared = true;")
                                                     except Exception as check_error:
-                                                        print(f"[DEBUG] Error checking zip field: {check_error}")
+                                                        log.debug("Error checking zip field: %s", check_error)
                                                         
                                                 except Exception as bg_error:
-                                                    print(f"[DEBUG] Error clicking background after USDOT: {bg_error}")
+                                                    log.debug("Error clicking background after USDOT: %s", bg_error)
                                                 
-                                                # Wait a moment then look for Check USDOT button
-                                                time.sleep(2)
+                                                # Let the page react, then look for Check USDOT button
+                                                waiter.page_settled(timeout=5, label='usdot submit')
                                                 
                                                 # Go back to zip field and double-click + Enter as final step
-                                                print("[DEBUG] Going back to zip field for final double-click and Enter...")
+                                                log.debug("Going back to zip field for final double-click and Enter...")
                                                 try:
                                                     # Re-find zip field
                                                     zip_recheck = driver.find_elements(By.XPATH,
@@ -3508,7 +3812,7 @@ def scan_geico_site():
                                                     
                                                     for zip_field in zip_recheck:
                                                         if zip_field.is_displayed() and '44256' in (zip_field.get_attribute('value') or ''):
-                                                            print("[DEBUG] Found zip field with 44256 - double-clicking and pressing Enter")
+                                                            log.debug("Found zip field with 44256 - double-clicking and pressing Enter")
                                                             driver.execute_script("""
                                                                 var elem = arguments[0];
                                                                 elem.scrollIntoView({block: 'center'});
@@ -3538,11 +3842,13 @@ def scan_geico_site():
                                                             """, zip_field)
                                                             break
                                                 except Exception as e:
-                                                    print(f"[DEBUG] Error in final zip double-click: {e}")
+                                                    log.debug("Error in final zip double-click: %s", e)
                                                 
-                                                time.sleep(2)
+                                                # The Enter above is dispatched 500ms after the double-click
+                                                waiter.pause(0.5, 'zip final enter')
+                                                waiter.page_settled(timeout=5, label='zip final enter')
                                                 
-                                                print("[DEBUG] Looking for Check USDOT button...")
+                                                log.debug("Looking for Check USDOT button...")
                                                 check_buttons = driver.find_elements(By.XPATH,
                                                     "//button[contains(text(), 'Check USDOT')] | " +
                                                     "//button[contains(text(), 'CHECK USDOT')] | " +
@@ -3551,7 +3857,7 @@ def scan_geico_site():
                                                     "//div[@role='button' and contains(text(), 'Check USDOT')]"
                                                 )
                                                 
-                                                print(f"[DEBUG] Found {len(check_buttons)} Check USDOT buttons")
+                                                log.debug("Found %s Check USDOT buttons", len(check_buttons))
                                                 
                                                 for check_btn in check_buttons:
                                                     if check_btn.is_displayed() and check_btn.is_enabled():
@@ -3559,7 +3865,7 @@ def scan_geico_site():
                                                             # Check if button is blue/active
                                                             btn_style = check_btn.get_attribute('style') or ''
                                                             btn_class = check_btn.get_attribute('class') or ''
-                                                            print(f"[DEBUG] Check button style: {btn_style[:50]}..., class: {btn_class}")
+                                                            log.debug("Check button style: %s..., class: %s", btn_style[:50], btn_class)
                                                             
                                                             # Highlight and click the button
                                                             driver.execute_script("""
@@ -3570,633 +3876,81 @@ def scan_geico_site():
                                                                 console.log('Check USDOT button clicked');
                                                             """, check_btn)
                                                             
-                                                            print("[DEBUG] Successfully clicked Check USDOT button")
-                                                            current_status = "Check USDOT button clicked"
+                                                            log.debug("Successfully clicked Check USDOT button")
+                                                            session.status = "Check USDOT button clicked"
                                                             check_usdot_clicked = True
                                                             last_zip_check_time = time.time()  # Start the timer
                                                             break
                                                         except Exception as btn_error:
-                                                            print(f"[DEBUG] Error clicking Check button: {btn_error}")
+                                                            log.debug("Error clicking Check button: %s", btn_error)
                                                     
                                                     usdot_filled = True
+                                                    flow.advance(quote_flow.RESULT, 'Check USDOT clicked' if check_usdot_clicked
+                                                                 else 'USDOT entered')
                                                     break
                                             except Exception as usdot_error:
-                                                print(f"[DEBUG] Error clicking USDOT field: {usdot_error}")
+                                                log.debug("Error clicking USDOT field: %s", usdot_error)
                                     
                                     if not usdot_filled:
-                                        print("[DEBUG] WARNING: Could not find or fill USDOT field!")
-                                        print("[DEBUG] Continuing anyway...")
+                                        log.warning("Could not find or fill USDOT field!")
+                                        log.debug("Continuing anyway...")
                                     
                                     break  # Exit after successfully filling zip
                                     
                                 except Exception as zip_error:
-                                    print(f"[DEBUG] Error filling zip code in this field: {zip_error}")
+                                    log.debug("Error filling zip code in this field: %s", zip_error)
                         
                         if not zip_filled:
-                            print("[DEBUG] Could not find or fill zip code field")
+                            log.debug("Could not find or fill zip code field")
                             
                     except Exception as e:
-                        print(f"[DEBUG] Error in zip code filling process: {e}")
-                        import traceback
-                        traceback.print_exc()
-                
-                # Now continue with element detection for visual feedback
-                # This will show the red boxes around detected elements
+                        log.exception("Error in zip code filling process: %s", e)
                 
-                # ENHANCED ELEMENT SCANNING - Smart filtering to prevent duplicates
-                # Keep track of already found elements
-                elements_found = []
-                
-                # SPECIAL HANDLING FOR LOGIN PAGE - Add username and password fields
-                if has_username_field and has_password_field:
-                    print(f"[DEBUG LOGIN SCAN] Login page detected! Username field: {username_element is not None}, Password field: {password_element is not None}")
-                    
-                    # Add username field
-                    if username_element and username_element.is_displayed():
-                        rect = username_element.rect
-                        print(f"[DEBUG LOGIN SCAN] Username field rect: x={rect['x']}, y={rect['y']}, width={rect['width']}, height={rect['height']}")
-                        if rect['width'] > 20 and rect['height'] > 10:
-                            elements_found.append({
-                                'label': 'Username',
-                                'x': rect['x'],
-                                'y': rect['y'],
-                                'width': rect['width'],
-                                'height': rect['height']
-                            })
-                            print("[DEBUG LOGIN SCAN] Username field added to elements_found")
-                        else:
-                            print(f"[DEBUG LOGIN SCAN] Username field too small: {rect['width']}x{rect['height']}")
-                    else:
-                        print(f"[DEBUG LOGIN SCAN] Username element not displayed or None: {username_element}")
-                    
-                    # Add password field
-                    if password_element and password_element.is_displayed():
-                        rect = password_element.rect
-                        print(f"[DEBUG LOGIN SCAN] Password field rect: x={rect['x']}, y={rect['y']}, width={rect['width']}, height={rect['height']}")
-                        if rect['width'] > 20 and rect['height'] > 10:
-                            elements_found.append({
-                                'label': 'Password',
-                                'x': rect['x'],
-                                'y': rect['y'],
-                                'width': rect['width'],
-                                'height': rect['height']
-                            })
-                            print("[DEBUG LOGIN SCAN] Password field added to elements_found")
-                        else:
-                            print(f"[DEBUG LOGIN SCAN] Password field too small: {rect['width']}x{rect['height']}")
-                    else:
-                        print(f"[DEBUG LOGIN SCAN] Password element not displayed or None: {password_element}")
-                    
-                    # Also find and add the Sign In button on login page
-                    try:
-                        sign_in_buttons = driver.find_elements(By.XPATH, "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'sign') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'log')] | //input[@type='submit']")
-                        for btn in sign_in_buttons:
-                            if btn.is_displayed():
-                                rect = btn.rect
-                                if rect['width'] > 30 and rect['height'] > 20:
-                                    btn_text = btn.text.strip() or btn.get_attribute('value') or 'Sign In'
-                                    elements_found.append({
-                                        'label': btn_text[:20],
-                                        'x': rect['x'],
-                                        'y': rect['y'],
-                                        'width': rect['width'],
-                                        'height': rect['height']
-                                    })
-                                    break  # Only add the first sign-in button found
-                    except:
-                        pass
-                
-                def is_element_overlapping(new_elem, existing_elem):
-                    """Check if two elements overlap significantly"""
-                    # Calculate the overlap area
-                    x_overlap = max(0, min(new_elem['x'] + new_elem['width'], existing_elem['x'] + existing_elem['width']) - 
-                                   max(new_elem['x'], existing_elem['x']))
-                    y_overlap = max(0, min(new_elem['y'] + new_elem['height'], existing_elem['y'] + existing_elem['height']) - 
-                                   max(new_elem['y'], existing_elem['y']))
-                    
-                    overlap_area = x_overlap * y_overlap
-                    new_area = new_elem['width'] * new_elem['height']
-                    
-                    # If more than 70% overlap, consider it duplicate
-                    return overlap_area > (new_area * 0.7)
-                
-                def is_element_contained(child, parent):
-                    """Check if child element is fully contained within parent"""
-                    return (child['x'] >= parent['x'] and 
-                            child['y'] >= parent['y'] and 
-                            child['x'] + child['width'] <= parent['x'] + parent['width'] and 
-                            child['y'] + child['height'] <= parent['y'] + parent['height'])
-                
-                def add_unique_element(elem_data):
-                    """Add element only if it's not duplicate/overlapping/contained"""
-                    # Skip elements that are too large (likely containers/backgrounds)
-                    if elem_data['width'] > 800 or elem_data['height'] > 400:
-                        return False
-                    
-                    # Skip elements that are too small
-                    if elem_data['width'] < 15 or elem_data['height'] < 8:
-                        return False
-                    
-                    # Check against existing elements
-                    for existing in elements_found:
-                        # Skip if this element significantly overlaps with existing
-                        if is_element_overlapping(elem_data, existing):
-                            return False
-                        
-                        # Skip if this element is contained within existing
-                        if is_element_contained(elem_data, existing):
-                            return False
-                        
-                        # Skip if existing element is contained within this one
-                        # (keep the smaller, more specific element)
-                        if is_element_contained(existing, elem_data):
-                            return False
-                    
-                    elements_found.append(elem_data)
-                    return True
-                
-                # Find only important input elements (excluding login fields on login page)
-                try:
-                    # Always scan inputs
-                    if True:
-                        all_inputs = driver.find_elements(By.TAG_NAME, "input")
-                        for idx, inp in enumerate(all_inputs):
-                            if inp.is_displayed():
-                                rect = inp.rect
-                                if rect['width'] > 20 and rect['height'] > 10:
-                                    # Skip only hidden inputs
-                                    input_type = inp.get_attribute('type') or 'text'
-                                    if input_type in ['hidden']:
-                                        continue
-                                    
-                                    # Skip if this is the username or password field we already added
-                                    if has_username_field and inp == username_element:
-                                        continue
-                                    if has_password_field and inp == password_element:
-                                        continue
-                                    
-                                    placeholder = inp.get_attribute('placeholder') or ''
-                                    name = inp.get_attribute('name') or ''
-                                    id_attr = inp.get_attribute('id') or ''
-                                    
-                                    # Create descriptive label
-                                    label = f"Input [{input_type}]"
-                                    if placeholder:
-                                        label = placeholder
-                                    elif name:
-                                        label = f"Input: {name}"
-                                    elif id_attr:
-                                        label = f"Input: {id_attr}"
-                                    
-                                    add_unique_element({
-                                        'label': label,
-                                        'x': rect['x'],
-                                        'y': rect['y'],
-                                        'width': rect['width'],
-                                        'height': rect['height']
-                                    })
-                except Exception as e:
-                    print(f"Error scanning inputs: {e}")
-                
-                # Find buttons
-                try:
-                    all_buttons = driver.find_elements(By.TAG_NAME, "button")
-                    for btn in all_buttons:
-                        if btn.is_displayed():
-                            rect = btn.rect
-                            if rect['width'] > 30 and rect['height'] > 20:
-                                # Get button text or aria-label
-                                btn_text = btn.text.strip()
-                                if not btn_text:
-                                    btn_text = btn.get_attribute('aria-label') or ''
-                                
-                                # Skip empty buttons
-                                if btn_text:
-                                    add_unique_element({
-                                        'label': f"Button: {btn_text[:20]}",
-                                        'x': rect['x'],
-                                        'y': rect['y'],
-                                        'width': rect['width'],
-                                        'height': rect['height']
-                                    })
-                except Exception as e:
-                    print(f"Error scanning buttons: {e}")
-                
-                # Find important links
-                try:
-                    all_links = driver.find_elements(By.TAG_NAME, "a")
-                    for link in all_links:
-                        if link.is_displayed():
-                            rect = link.rect
-                            # More lenient size limits to capture more links
-                            if rect['width'] > 15 and rect['height'] > 8 and rect['width'] < 500 and rect['height'] < 120:
-                                link_text = link.text.strip()
-                                aria_label = link.get_attribute('aria-label') or ''
-                                
-                                # Skip links without meaningful text
-                                if link_text or aria_label:
-                                    label = link_text[:30] if link_text else aria_label[:30]
-                                    
-                                    # Accept even short labels
-                                    if len(label) > 0:
-                                        add_unique_element({
-                                            'label': f"{label}",
-                                            'x': rect['x'],
-                                            'y': rect['y'],
-                                            'width': rect['width'],
-                                            'height': rect['height']
-                                        })
-                except Exception as e:
-                    print(f"Error scanning links: {e}")
-                
-                # Find select dropdowns
-                try:
-                    all_selects = driver.find_elements(By.TAG_NAME, "select")
-                    for sel in all_selects:
-                        if sel.is_displayed():
-                            rect = sel.rect
-                            if rect['width'] > 30 and rect['height'] > 20:
-                                name = sel.get_attribute('name') or sel.get_attribute('id') or 'Dropdown'
-                                add_unique_element({
-                                    'label': f"Select: {name}",
-                                    'x': rect['x'],
-                                    'y': rect['y'],
-                                    'width': rect['width'],
-                                    'height': rect['height']
-                                })
-                except Exception as e:
-                    print(f"Error scanning selects: {e}")
-                
-                # Find textareas
-                try:
-                    all_textareas = driver.find_elements(By.TAG_NAME, "textarea")
-                    for ta in all_textareas:
-                        if ta.is_displayed():
-                            rect = ta.rect
-                            if rect['width'] > 50 and rect['height'] > 30:
-                                placeholder = ta.get_attribute('placeholder') or 'Textarea'
-                                add_unique_element({
-                                    'label': placeholder,
-                                    'x': rect['x'],
-                                    'y': rect['y'],
-                                    'width': rect['width'],
-                                    'height': rect['height']
-                                })
-                except Exception as e:
-                    print(f"Error scanning textareas: {e}")
-                
-                # Find clickable elements with specific text patterns (dashboard elements)
-                try:
-                    # Important text to look for (case insensitive) - ENHANCED LIST
-                    important_texts = [
-                        ("start", "quote"),
-                        ("search", "policy"),
-                        ("look", "prior", "quote"),
-                        ("private", "passenger", "auto"),
-                        ("motorcycle", "atv"),
-                        ("commercial", "auto"),
-                        ("commercial", "truck"),
-                        ("get", "quote"),
-                        ("continue", "quote"),
-                        ("view", "policy"),
-                        ("make", "payment"),
-                        ("starter", "quote"),
-                        ("manage", "policy"),
-                        ("claim", "center"),
-                        ("pay", "bill"),
-                        ("get", "id", "card"),
-                        # New patterns for the missing buttons
-                        ("private", "passenger"),
-                        ("motorcycle",),
-                        ("atv",),
-                        ("off-road",),
-                        ("off", "road"),
-                        ("commercial",),
-                        ("trucking",),
-                        ("auto",)
-                    ]
-                    
-                    # Search for specific clickable elements containing these text patterns
-                    # Only look for buttons, links, and specific clickable elements
-                    for text_parts in important_texts:
-                        # Build XPath that looks for all parts of the text
-                        xpath_conditions = []
-                        for part in text_parts:
-                            xpath_conditions.append(f"contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{part}')")
-                        
-                        # IMPORTANT: Only search in clickable elements, not ALL elements
-                        xpath = f"//button[{' and '.join(xpath_conditions)}] | //a[{' and '.join(xpath_conditions)}] | //span[@role='button' and {' and '.join(xpath_conditions)}] | //div[@role='button' and {' and '.join(xpath_conditions)}] | //div[@tabindex and {' and '.join(xpath_conditions)}]"
-                        try:
-                            pattern_elements = driver.find_elements(By.XPATH, xpath)
-                            for elem in pattern_elements:
-                                if elem.is_displayed():
-                                    rect = elem.rect
-                                    # More strict size filtering
-                                    if rect['width'] > 25 and rect['height'] > 12 and rect['width'] < 600 and rect['height'] < 150:
-                                        elem_text = elem.text.strip()[:40]
-                                        if elem_text:
-                                            add_unique_element({
-                                                'label': f"{elem_text}",
-                                                'x': rect['x'],
-                                                'y': rect['y'],
-                                                'width': rect['width'],
-                                                'height': rect['height']
-                                            })
-                        except:
-                            pass
-                except Exception as e:
-                    print(f"Error scanning clickable text patterns: {e}")
-                
-                # Also search for single important keywords (more flexible)
-                try:
-                    single_keywords = [
-                        "start", "quote", "policy", "search", "private", "passenger",
-                        "motorcycle", "commercial", "auto", "truck", "manage", "claim",
-                        "atv", "off-road", "trucking"  # Added missing keywords
-                    ]
-                    
-                    for keyword in single_keywords:
-                        # ENHANCED: Also search in parent divs and spans
-                        xpath = f"//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword}')] | //a[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword}')] | //div[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword}')] | //span[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword}')]"
-                        try:
-                            keyword_elements = driver.find_elements(By.XPATH, xpath)
-                            for elem in keyword_elements:
-                                if elem.is_displayed():
-                                    rect = elem.rect
-                                    if rect['width'] > 25 and rect['height'] > 12 and rect['width'] < 600 and rect['height'] < 150:
-                                        elem_text = elem.text.strip()[:40]
-                                        if elem_text and len(elem_text) > 3:
-                                            add_unique_element({
-                                                'label': f"{elem_text}",
-                                                'x': rect['x'],
-                                                'y': rect['y'],
-                                                'width': rect['width'],
-                                                'height': rect['height']
-                                            })
-                        except:
-                            pass
-                except Exception as e:
-                    print(f"Error scanning single keywords: {e}")
-                
-                # Find elements with role attributes only (skip onclick to reduce duplicates)
-                try:
-                    # More aggressive search for role elements and clickable divs/spans
-                    role_elements = driver.find_elements(By.XPATH, "//span[@role='button' or @role='link'] | //div[@role='button' or @role='link'] | //*[@onclick] | //*[@ng-click] | //*[contains(@class, 'button')] | //*[contains(@class, 'btn')] | //*[@tabindex]")
-                    for elem in role_elements:
-                        if elem.is_displayed():
-                            rect = elem.rect
-                            # More lenient size limits
-                            if rect['width'] > 15 and rect['height'] > 8 and rect['width'] < 600 and rect['height'] < 150:
-                                elem_text = elem.text.strip()[:30] or elem.get_attribute('aria-label') or ''
-                                if elem_text and len(elem_text) > 2:
-                                    add_unique_element({
-                                        'label': f"{elem_text}",
-                                        'x': rect['x'],
-                                        'y': rect['y'],
-                                        'width': rect['width'],
-                                        'height': rect['height']
-                                    })
-                except Exception as e:
-                    print(f"Error scanning role elements: {e}")
-                
-                # SPECIFIC SEARCH for "products to quote" section and its buttons
-                try:
-                    # First, find the "products to quote" section
-                    products_section_xpath = "//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'products to quote')]"
-                    products_sections = driver.find_elements(By.XPATH, products_section_xpath)
-                    
-                    for section in products_sections:
-                        if section.is_displayed():
-                            print(f"[DEBUG] Found 'products to quote' section: {section.text}")
-                            # Find all elements below this section
-                            parent = section
-                            for _ in range(5):  # Go up to 5 levels to find container
-                                parent = parent.find_element(By.XPATH, "..")
-                                # Find all clickable children
-                                children = parent.find_elements(By.XPATH, ".//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'private passenger') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'motorcycle') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'atv') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'off-road') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'commercial') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'trucking')]")
-                                for child in children:
-                                    if child.is_displayed():
-                                        rect = child.rect
-                                        if rect['width'] > 20 and rect['height'] > 10:
-                                            elem_text = child.text.strip()
-                                            if elem_text:
-                                                print(f"[DEBUG] Found product button: {elem_text}")
-                                                add_unique_element({
-                                                    'label': elem_text[:40],
-                                                    'x': rect['x'],
-                                                    'y': rect['y'],
-                                                    'width': rect['width'],
-                                                    'height': rect['height']
-                                                })
-                except Exception as e:
-                    print(f"[DEBUG] Error in products to quote section search: {e}")
-                
-                # EXTREMELY AGGRESSIVE SEARCH for all clickable text elements
-                try:
-                    # Search for ALL elements containing these specific product texts
-                    product_keywords = ['private passenger', 'motorcycle', 'atv', 'off-road', 'off road', 'commercial', 'trucking']
-                    
-                    for keyword in product_keywords:
-                        # Search in ALL element types, not just buttons
-                        xpath = f"//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{keyword}')]"
-                        elements = driver.find_elements(By.XPATH, xpath)
-                        
-                        for elem in elements:
-                            if elem.is_displayed():
-                                rect = elem.rect
-                                if rect['width'] > 20 and rect['height'] > 10 and rect['width'] < 800 and rect['height'] < 200:
-                                    elem_text = elem.text.strip()
-                                    if elem_text:
-                                        # Check if element or parent is clickable
-                                        is_clickable = False
-                                        current = elem
-                                        
-                                        for _ in range(3):  # Check element and up to 2 parents
-                                            try:
-                                                # Check various clickability indicators
-                                                onclick = current.get_attribute('onclick')
-                                                role = current.get_attribute('role')
-                                                tabindex = current.get_attribute('tabindex')
-                                                cursor = driver.execute_script("return window.getComputedStyle(arguments[0]).cursor;", current)
-                                                tag = current.tag_name.lower()
-                                                
-                                                if onclick or role in ['button', 'link'] or tabindex or cursor == 'pointer' or tag in ['a', 'button']:
-                                                    is_clickable = True
-                                                    break
-                                                
-                                                # Go to parent
-                                                current = current.find_element(By.XPATH, "..")
-                                            except:
-                                                break
-                                        
-                                        if is_clickable:
-                                            print(f"[DEBUG] Found clickable product element: {elem_text}")
-                                            add_unique_element({
-                                                'label': elem_text[:40],
-                                                'x': rect['x'],
-                                                'y': rect['y'],
-                                                'width': rect['width'],
-                                                'height': rect['height']
-                                            })
-                                        elif 'auto' in elem_text.lower() or 'motorcycle' in elem_text.lower() or 'commercial' in elem_text.lower():
-                                            # Add these even if not explicitly clickable since they're important
-                                            print(f"[DEBUG] Adding important product text: {elem_text}")
-                                            add_unique_element({
-                                                'label': elem_text[:40],
-                                                'x': rect['x'],
-                                                'y': rect['y'],
-                                                'width': rect['width'],
-                                                'height': rect['height']
-                                            })
-                    
-                    # Additional specific search for the exact phrases
-                    exact_phrases = [
-                        "Private Passenger Auto",
-                        "Motorcycle/ATV/Off-road",
-                        "Commercial Auto/Trucking"
-                    ]
-                    
-                    for phrase in exact_phrases:
-                        # Case-insensitive but exact phrase search
-                        xpath = f"//*[normalize-space(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')) = '{phrase.lower()}']"
-                        elements = driver.find_elements(By.XPATH, xpath)
-                        
-                        for elem in elements:
-                            if elem.is_displayed():
-                                rect = elem.rect
-                                if rect['width'] > 20 and rect['height'] > 10:
-                                    print(f"[DEBUG] Found exact product phrase: {phrase}")
-                                    add_unique_element({
-                                        'label': phrase,
-                                        'x': rect['x'],
-                                        'y': rect['y'],
-                                        'width': rect['width'],
-                                        'height': rect['height']
-                                    })
-                except Exception as e:
-                    print(f"[DEBUG] Error in aggressive product search: {e}")
-                
-                # Continue with the extremely aggressive general search
-                try:
-                    # First, try to find ALL elements that might be clickable
-                    all_elements_xpath = "//*[text() and not(self::script) and not(self::style)]"
-                    all_elements = driver.find_elements(By.XPATH, all_elements_xpath)[:200]  # Increased limit00 for performance
-                    
-                    # Keywords to search for
-                    target_keywords = [
-                        "private passenger", "motorcycle", "atv", "off-road", "off road",
-                        "commercial auto", "commercial trucking", "trucking"
-                    ]
-                    
-                    for elem in all_elements:
-                        try:
-                            if elem.is_displayed():
-                                elem_text = elem.text.strip().lower()
-                                # Check if element contains any of our target keywords
-                                for keyword in target_keywords:
-                                    if keyword in elem_text and len(elem_text) < 100:  # Avoid huge text blocks
-                                        rect = elem.rect
-                                        if rect['width'] > 15 and rect['height'] > 8 and rect['width'] < 800:
-                                            # Check if this element or its parent is clickable
-                                            clickable = False
-                                            current = elem
-                                            
-                                            # Check element and up to 3 parent levels for clickability
-                                            for _ in range(4):
-                                                tag_name = current.tag_name.lower()
-                                                if tag_name in ['a', 'button', 'input']:
-                                                    clickable = True
-                                                    break
-                                                
-                                                # Check for clickable attributes
-                                                onclick = current.get_attribute('onclick')
-                                                role = current.get_attribute('role')
-                                                tabindex = current.get_attribute('tabindex')
-                                                cursor = current.value_of_css_property('cursor')
-                                                
-                                                if onclick or role in ['button', 'link'] or tabindex or cursor == 'pointer':
-                                                    clickable = True
-                                                    break
-                                                
-                                                # Move to parent
-                                                try:
-                                                    current = current.find_element(By.XPATH, '..')
-                                                except:
-                                                    break
-                                            
-                                            if clickable:
-                                                add_unique_element({
-                                                    'label': elem.text.strip()[:50],
-                                                    'x': rect['x'],
-                                                    'y': rect['y'],
-                                                    'width': rect['width'],
-                                                    'height': rect['height']
-                                                })
-                                                break  # Found this keyword, move to next element
-                        except:
-                            continue
-                            
-                except Exception as e:
-                    print(f"Error in aggressive element search: {e}")
-                
-                # Skip cursor:pointer scanning as it creates too many duplicates
-                # The above methods should catch all important clickable elements
-                
-                # Update global detected_elements
-                detected_elements = elements_found
+                scan_metrics.lap('zip_entry')
                 
                 # Update status if we're not in a special state
-                if not current_status.startswith("Login") and not current_status.startswith("Clicking"):
-                    current_status = f"Scanning... Found {len(elements_found)} elements"
+                if not session.status.startswith("Login") and not session.status.startswith("Clicking"):
+                    session.status = f"Scanning... Found {len(session.detected_elements)} elements"
                 
-                # Update FPS counter
-                frame_count += 1
                 commercial_check_counter += 1  # Increment Commercial Auto check counter
-                current_time = time.time()
-                if current_time - last_fps_calculation_time >= 1.0:
-                    fps_counter = frame_count
-                    frame_count = 0
-                    last_fps_calculation_time = current_time
+                scan_metrics.end_frame()
                 
-                # Maximum FPS - minimal delay for ~50+ FPS
-                time.sleep(0.01)
+                # The automation runs at its own rate; the live view does not wait on it
+                pipeline.pace(iteration_start)
                 
             except Exception as e:
-                print(f"Error in scan loop: {e}")
+                log.exception("Error in scan loop: %s", e)
                 time.sleep(0.5)
     
     except Exception as e:
-        print(f"[ERROR] Error initializing scanner: {e}")
-        import traceback
-        traceback.print_exc()
-        # Write error to debug log
-        with open('scanner_debug_thread.log', 'a') as f:
-            f.write(f"[ERROR] {time.strftime('%Y-%m-%d %H:%M:%S')} Error: {str(e)}\n")
-            f.flush()
-        # Ensure we reset the scanning state even on error
-        current_screenshot = None
-        detected_elements = []
+        log.exception("Error initializing scanner: %s", e)
     
     finally:
-        print("[DEBUG] Cleaning up scanner")
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+        log.debug("Cleaning up scanner")
+        # Fail queued request commands; nothing runs them from here on
+        session.commands.close()
+        # Stage threads stop first so none of them is mid-command when the browser goes
+        if pipeline is not None:
+            pipeline.stop()
+        if screencast is not None:
+            screencast.stop()
+        if cdp is not None:
+            cdp.close()
+        # Quits the browser and removes its profile; browsers are never reused
+        # across quotes since they carry the previous login
+        if browser:
+            session_registry.unregister(session.session_id)
+            browser_pool.close(browser)
             driver = None
-        is_scanning = False
-        # Clean up temporary directory
-        if temp_dir and os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-                print(f"[DEBUG] Cleaned up temp directory: {temp_dir}")
-            except Exception as e:
-                print(f"[DEBUG] Could not clean up temp directory: {e}")
-        # Reset state
-        current_screenshot = None
-        detected_elements = []
-        current_status = "Scanner stopped"
+        session.driver = None
+        session.is_scanning = False
+        # A completed quote keeps its last frame (the result page) on the
+        # live view; anything else resets it
+        if session.flow is not None and session.flow.state == quote_flow.RESULT:
+            session.status = "Quote complete"
+        else:
+            session.view.clear()
+            session.status = "Scanner stopped"
 
 if __name__ == '__main__':
     import ssl
@@ -4208,9 +3962,8 @@ if __name__ == '__main__':
     
     print("\n=== Geico Auto Quota Scanner (HTTPS) ===")
     
-    # Enable Flask logging and error handling
-    import logging
-    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Flask/werkzeug records go through the scanner's rotating, queued log
+    capture_library_logging()
     
     # Add CORS headers for debugging
     @app.after_request
@@ -4220,6 +3973,9 @@ if __name__ == '__main__':
         response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
         return response
     
+    # Launch the warm browsers now so the first quote doesn't wait for Chrome
+    browser_pool.start()
+    
     if os.path.exists(cert_path) and os.path.exists(key_path):
         context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
         context.load_cert_chain(cert_path, key_path)
@@ -11,9 +11,35 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
 
-def fix_geico_scanner():
+from text_index import find_label, COMMERCIAL_AUTO_LABELS
+from session_registry import debugger_address, session_from_args
+
+SEARCH_TERMS = COMMERCIAL_AUTO_LABELS + ['Trucking']
+
+# arguments[0] = the clickable element find_label resolved
+HIGHLIGHT_AND_CLICK_SCRIPT = """
+    // Clear any previous highlights
+    var highlighted = document.querySelectorAll('[style*="border: 5px solid"]');
+    for (var i = 0; i < highlighted.length; i++) {
+        highlighted[i].style.border = '';
+    }
+    
+    // Highlight in GREEN
+    var clickable = arguments[0];
+    clickable.style.border = '5px solid #00FF00';
+    clickable.style.backgroundColor = 'rgba(0, 255, 0, 0.3)';
+    clickable.style.boxShadow = '0 0 30px #00FF00';
+    clickable.scrollIntoView({block: 'center'});
+    
+    // Click it
+    clickable.click();
+"""
+
+def fix_geico_scanner(session_id=None):
     """
     Direct fix that bypasses all the scanner complexity
+    Attaches to the browser of scanner session `session_id` (default: the
+    --session argument, SCANNER_SESSION, or the only running session)
     """
     print("\n" + "="*60)
     print("GEICO SCANNER COMMERCIAL AUTO FIX")
@@ -21,9 +47,11 @@ def fix_geico_scanner():
     
     # Connect to existing Chrome instance
     chrome_options = Options()
-    chrome_options.add_experimental_option("debuggerAddress", "127.0.0.1:9222")
     
     try:
+        address = debugger_address(session_id)
+        print(f"Attaching to {address}")
+        chrome_options.add_experimental_option("debuggerAddress", address)
         driver = webdriver.Chrome(options=chrome_options)
         print("✓ Connected to browser")
         print(f"Current URL: {driver.current_url}")
@@ -36,68 +64,14 @@ def fix_geico_scanner():
             attempts += 1
             
             try:
-                # Method 1: Direct JavaScript search and click
-                result = driver.execute_script("""
-                    // Clear any previous highlights
-                    var highlighted = document.querySelectorAll('[style*="border: 5px solid"]');
-                    for (var i = 0; i < highlighted.length; i++) {
-                        highlighted[i].style.border = '';
-                    }
-                    
-                    // Search for Commercial Auto
-                    var found = false;
-                    var searchTerms = ['Commercial Auto/Trucking', 'Commercial Auto / Trucking', 'Commercial Auto', 'Trucking'];
-                    
-                    for (var t = 0; t < searchTerms.length; t++) {
-                        var elements = document.querySelectorAll('a, button, [role="tab"], [role="button"], li, span, div');
-                        
-                        for (var i = 0; i < elements.length; i++) {
-                            var elem = elements[i];
-                            var text = elem.textContent || '';
-                            
-                            if (text.includes(searchTerms[t]) && text.length < 100) {
-                                console.log('Found element with text:', text);
-                                
-                                // Find clickable element
-                                var clickable = elem;
-                                if (elem.tagName === 'SPAN' || elem.tagName === 'DIV') {
-                                    var parent = elem.parentElement;
-                                    while (parent) {
-                                        if (parent.tagName === 'A' || parent.tagName === 'BUTTON' || 
-                                            parent.getAttribute('role') === 'tab' || 
-                                            parent.getAttribute('onclick') ||
-                                            parent.style.cursor === 'pointer') {
-                                            clickable = parent;
-                                            break;
-                                        }
-                                        parent = parent.parentElement;
-                                    }
-                                }
-                                
-                                // Highlight in GREEN
-                                clickable.style.border = '5px solid #00FF00';
-                                clickable.style.backgroundColor = 'rgba(0, 255, 0, 0.3)';
-                                clickable.style.boxShadow = '0 0 30px #00FF00';
-                                clickable.scrollIntoView({block: 'center'});
-                                
-                                // Click it
-                                clickable.click();
-                                found = true;
-                                
-                                return {
-                                    found: true,
-                                    text: text,
-                                    tag: clickable.tagName
-                                };
-                            }
-                        }
-                    }
-                    
-                    return {found: false};
-                """)
+                # Method 1: Search for Commercial Auto via the shared text
+                # index, one term at a time, then highlight and click it
+                result = find_label(driver, SEARCH_TERMS, priority=True, max_area=None, max_text_length=100)
                 
                 if result['found']:
+                    driver.execute_script(HIGHLIGHT_AND_CLICK_SCRIPT, result['element'])
                     print(f"\n✓ FOUND AND CLICKED: {result['text']} ({result['tag']})")
+                    print(f"Text index timings: {result['timings']}")
                     print("✓ Look for GREEN highlight!")
                     time.sleep(3)
                     print(f"New URL: {driver.current_url}")
@@ -136,8 +110,8 @@ def fix_geico_scanner():
     except Exception as e:
         print(f"\n✗ Error: {e}")
         print("\nMake sure:")
-        print("1. Chrome is running with --remote-debugging-port=9222")
+        print("1. The scanner session is running (pass --session <id> if there are several)")
         print("2. You're logged into GEICO")
 
 if __name__ == "__main__":
-    fix_geico_scanner()
\ No newline at end of file
+    fix_geico_scanner(session_from_args())
\ No newline at end of file
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Targeted Chrome/chromedriver cleanup for the Geico scanner
+Instead of `pkill -9 -f chrome`, which takes down every browser on the box
+(other sessions included), each browser records the process tree chromedriver
+started for it and only that tree is reaped when the browser closes.
+
+Browsers that leak anyway (a crashed server, a killed scan thread) are found by
+their profile directory: scanner profiles are named
+geico_scanner_<server pid>_<timestamp>_*, so the orphan sweeper can tell
+leaked scanner browsers apart from everything else, and from browsers another
+live scanner process still owns.
+
+Reads /proc directly, so it is Linux-only like the pkill calls it replaces.
+"""
+
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+
+from scanner_logging import get_logger
+
+log = get_logger('processes')
+
+PROFILE_PREFIX = 'geico_scanner_'
+SWEEP_INTERVAL = float(os.environ.get('SCANNER_SWEEP_INTERVAL', '60'))
+# Our own profiles not (yet) registered as active are left alone this long,
+# so a browser that is still launching isn't mistaken for a leak
+ORPHAN_GRACE = 30.0
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def make_profile_dir():
+    """New scanner profile directory tagged with this server's PID"""
+    return tempfile.mkdtemp(prefix=f'{PROFILE_PREFIX}{os.getpid()}_{int(time.time())}_')
+
+
+def _pid_max():
+    try:
+        with open('/proc/sys/kernel/pid_max') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 4194304
+
+
+def _uptime():
+    with open('/proc/uptime') as f:
+        return float(f.read().split()[0])
+
+
+def _stat(pid):
+    """(ppid, start ticks) from /proc/<pid>/stat, or None if the process is gone"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # comm can contain spaces and parentheses; fields resume after the last ')'
+    fields = data[data.rfind(')') + 2:].split()
+    return int(fields[1]), int(fields[19])
+
+
+def _cmdline(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return [part.decode(errors='replace') for part in f.read().split(b'\0') if part]
+    except OSError:
+        return []
+
+
+def process_table():
+    """pid -> {'ppid', 'start', 'age', 'cmdline'} for every visible process"""
+    table = {}
+    uptime = _uptime()
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        pid = int(name)
+        stat = _stat(pid)
+        if stat is None:
+            continue
+        ppid, start = stat
+        table[pid] = {
+            'ppid': ppid,
+            'start': start,
+            'age': uptime - start / _CLOCK_TICKS,
+            'cmdline': _cmdline(pid),
+        }
+    return table
+
+
+def descendants(root_pid, table=None):
+    """PIDs of every process below root_pid"""
+    table = table if table is not None else process_table()
+    children = {}
+    for pid, info in table.items():
+        children.setdefault(info['ppid'], []).append(pid)
+    found = set()
+    stack = [root_pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            if child not in found:
+                found.add(child)
+                stack.append(child)
+    return found
+
+
+def snapshot(pids, table=None):
+    """{pid: start ticks} so later kills can't hit a recycled PID"""
+    table = table if table is not None else process_table()
+    return {pid: table[pid]['start'] for pid in pids if pid in table}
+
+
+def driver_process_tree(driver):
+    """chromedriver plus the Chrome processes it launched, as a snapshot()"""
+    try:
+        root = driver.service.process.pid
+    except AttributeError:
+        return {}
+    table = process_table()
+    return snapshot({root} | descendants(root, table), table)
+
+
+def terminate(tracked, timeout=3.0):
+    """
+    SIGTERM the tracked processes that still exist (same PID and start time),
+    then SIGKILL whatever is left after `timeout`. Returns the PIDs signalled.
+    """
+    alive = {pid for pid, start in tracked.items()
+             if pid != os.getpid() and (_stat(pid) or (None, None))[1] == start}
+    for pid in alive:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    deadline = time.time() + timeout
+    remaining = set(alive)
+    while remaining and time.time() < deadline:
+        time.sleep(0.05)
+        remaining = {pid for pid in remaining if (_stat(pid) or (None, None))[1] == tracked[pid]}
+    for pid in remaining:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    return alive
+
+
+def profile_dir_of(cmdline):
+    for arg in cmdline:
+        if arg.startswith('--user-data-dir='):
+            return arg.split('=', 1)[1]
+    return None
+
+
+def profile_owner(profile_dir):
+    """Server PID encoded in a scanner profile name, or None for older names"""
+    name = os.path.basename(profile_dir.rstrip('/'))
+    if not name.startswith(PROFILE_PREFIX):
+        return None
+    head = name[len(PROFILE_PREFIX):].split('_', 1)[0]
+    if head.isdigit() and int(head) <= _pid_max():
+        return int(head)
+    # geico_scanner_<timestamp>_ from before PIDs were recorded
+    return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def find_orphans(active_profiles=(), grace=ORPHAN_GRACE, table=None):
+    """
+    Scanner-owned processes nobody is using: Chrome processes whose profile
+    starts with geico_scanner_ and is neither active here nor owned by
+    another live scanner process, plus their process trees and the
+    chromedriver that started them.
+    """
+    table = table if table is not None else process_table()
+    active = {os.path.normpath(p) for p in active_profiles if p}
+    me = os.getpid()
+    roots = set()
+    for pid, info in table.items():
+        profile = profile_dir_of(info['cmdline'])
+        if not profile or not os.path.basename(profile.rstrip('/')).startswith(PROFILE_PREFIX):
+            continue
+        if os.path.normpath(profile) in active:
+            continue
+        owner = profile_owner(profile)
+        if owner == me:
+            if info['age'] < grace:
+                continue
+        elif owner is not None and _pid_alive(owner):
+            continue
+        roots.add(pid)
+        parent = table.get(info['ppid'])
+        if parent and any('chromedriver' in os.path.basename(arg) for arg in parent['cmdline'][:1]):
+            roots.add(info['ppid'])
+
+    orphans = set(roots)
+    for pid in roots:
+        orphans |= descendants(pid, table)
+    return snapshot(orphans, table)
+
+
+def sweep_orphans(active_profiles=()):
+    """Reap leaked scanner browsers; returns the PIDs signalled"""
+    try:
+        orphans = find_orphans(active_profiles)
+    except OSError as e:
+        log.warning("Could not scan processes for orphans: %s", e)
+        return set()
+    if not orphans:
+        return set()
+    killed = terminate(orphans)
+    log.info("Reaped %s orphaned scanner processes: %s", len(killed), sorted(killed))
+    return killed
+
+
+def remove_stale_profiles(active_profiles=(), grace=ORPHAN_GRACE, table=None):
+    """
+    Delete scanner profile dirs nobody is using: not active here, not owned
+    by another live scanner process and not open in any running Chrome.
+    Returns the paths removed.
+    """
+    directory = tempfile.gettempdir()
+    try:
+        names = [name for name in os.listdir(directory) if name.startswith(PROFILE_PREFIX)]
+    except OSError:
+        return []
+    if not names:
+        return []
+    table = table if table is not None else process_table()
+    in_use = {os.path.normpath(profile) for profile in
+              (profile_dir_of(info['cmdline']) for info in table.values()) if profile}
+    active = {os.path.normpath(p) for p in active_profiles if p}
+    me = os.getpid()
+    now = time.time()
+    removed = []
+    for name in names:
+        path = os.path.normpath(os.path.join(directory, name))
+        if path in active or path in in_use or not os.path.isdir(path):
+            continue
+        owner = profile_owner(path)
+        if owner is not None and owner != me and _pid_alive(owner):
+            continue
+        try:
+            if now - os.path.getmtime(path) < grace:
+                continue  # Just created; its browser may still be launching
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path)
+    if removed:
+        log.info("Removed %s stale scanner profiles", len(removed))
+    return removed
+
+
+class OrphanSweeper:
+    """Runs sweep_orphans and remove_stale_profiles every `interval` seconds on a daemon thread"""
+
+    def __init__(self, active_profiles, interval=SWEEP_INTERVAL):
+        self.active_profiles = active_profiles  # callable returning profile dirs in use
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None and self.interval > 0:
+            self.thread = threading.Thread(target=self._run, name='orphan-sweeper', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            sweep_orphans(self.active_profiles())
+            remove_stale_profiles(self.active_profiles())
+
+    def stop(self):
+        self.stopped.set()
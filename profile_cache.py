@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Template Chrome profile for the Geico scanner
+A fresh, empty profile per quote means Chrome rebuilds its caches and
+re-downloads every GEICO static asset on each scan. Instead, one template
+profile is warmed by loading the GEICO pages once, and each new browser gets
+a clone of it: reflinked (copy-on-write, on btrfs/XFS/APFS-style
+filesystems), hardlinked or plainly copied, in that order of preference.
+
+The template is rebuilt when it is older than SCANNER_PROFILE_TEMPLATE_MAX_AGE
+by warming a new directory and swapping it in, so clones in progress never
+see a half-built template. Clones are ordinary geico_scanner_* profiles and
+are removed by whoever closes the browser, or by the stale-profile sweep in
+process_cleanup.py if that never happens.
+
+Configure with SCANNER_PROFILE_TEMPLATE (directory, default
+<tmp>/geico_profile_template), SCANNER_PROFILE_TEMPLATE_MAX_AGE (seconds,
+default 86400, 0 disables the template), SCANNER_PROFILE_WARM_URLS
+(comma-separated) and SCANNER_PROFILE_CLONE (auto, hardlink or copy).
+"""
+
+import errno
+import fcntl
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from process_cleanup import make_profile_dir
+from scanner_logging import get_logger
+
+log = get_logger('profiles')
+
+TEMPLATE_DIR = os.environ.get('SCANNER_PROFILE_TEMPLATE',
+                              os.path.join(tempfile.gettempdir(), 'geico_profile_template'))
+TEMPLATE_MAX_AGE = float(os.environ.get('SCANNER_PROFILE_TEMPLATE_MAX_AGE', '86400'))
+WARM_URLS = [url.strip() for url in
+             os.environ.get('SCANNER_PROFILE_WARM_URLS', 'https://gateway.geico.com/').split(',')
+             if url.strip()]
+# auto: reflink, falling back to a copy. hardlink shares cache entry files
+# with the template, so a clone that rewrites an entry changes it for later
+# clones too; use it only where reflinks aren't available and disk matters.
+CLONE_MODE = os.environ.get('SCANNER_PROFILE_CLONE', 'auto')
+
+WARM_PAGE_TIMEOUT = 30.0
+
+# Per-browser state that must not be carried into a clone
+SKIP_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie',
+              'DevToolsActivePort', 'lockfile', 'LOCK')
+SKIP_DIRS = ('Crashpad', 'ShaderCache', 'GrShaderCache', 'component_crx_cache')
+# Cache directories whose entry files may be hardlinked in hardlink mode
+SHARED_CACHE_DIRS = ('Cache_Data', 'Code Cache', 'js', 'wasm')
+
+FICLONE = 0x40049409  # linux/fs.h _IOW(0x94, 9, int)
+
+
+def reflink(src, dst):
+    """Copy-on-write clone of one file; raises OSError where unsupported"""
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def _ignore(directory, names):
+    return [name for name in names if name in SKIP_FILES or name in SKIP_DIRS]
+
+
+class ProfileTemplate:
+    """
+    The warmed template profile plus clone statistics. refresh() needs a
+    callable that opens a Chrome driver on a given profile dir, so the
+    Chrome options stay in browser_pool.py.
+    """
+
+    def __init__(self, path=TEMPLATE_DIR, max_age=TEMPLATE_MAX_AGE, urls=WARM_URLS, mode=CLONE_MODE):
+        self.path = path
+        self.max_age = max_age
+        self.urls = urls
+        self.mode = mode
+        self.lock = threading.Lock()  # One refresh at a time in this process
+        self.stats_lock = threading.Lock()
+        self.reflink_supported = mode == 'auto'
+        self.clones = 0
+        self.clone_seconds = 0.0
+        self.clone_method = None
+        self.refreshes = 0
+        self.last_refresh_seconds = None
+
+    @property
+    def enabled(self):
+        return self.max_age > 0
+
+    def age(self):
+        try:
+            return time.time() - os.path.getmtime(os.path.join(self.path, '.warmed'))
+        except OSError:
+            return None
+
+    def is_fresh(self):
+        age = self.age()
+        return age is not None and age < self.max_age
+
+    def _file_lock(self, mode):
+        """flock on a sibling file: shared while cloning, exclusive while swapping"""
+        handle = open(f'{self.path}.lock', 'a')
+        fcntl.flock(handle, mode)
+        return handle
+
+    def _remove_leftovers(self):
+        parent, name = os.path.split(self.path)
+        for entry in os.listdir(parent or '.'):
+            if not entry.startswith(f'{name}.') or entry.endswith('.lock'):
+                continue
+            pid = entry.rsplit('-', 1)[-1]
+            if pid.isdigit() and int(pid) != os.getpid():
+                try:
+                    os.kill(int(pid), 0)
+                    continue
+                except ProcessLookupError:
+                    pass
+                except PermissionError:
+                    continue
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+    def refresh(self, open_driver):
+        """
+        Build a new template by loading the warm-up URLs in a browser on a
+        scratch profile, then swap it in. open_driver(profile_dir) -> driver.
+        """
+        if not self.enabled:
+            return False
+        with self.lock:
+            if self.is_fresh():
+                return False
+            started = time.time()
+            self._remove_leftovers()
+            building = f'{self.path}.building-{os.getpid()}'
+            shutil.rmtree(building, ignore_errors=True)
+            os.makedirs(building)
+            driver = None
+            try:
+                driver = open_driver(building)
+                for url in self.urls:
+                    driver.get(url)
+                    deadline = time.time() + WARM_PAGE_TIMEOUT
+                    while time.time() < deadline:
+                        if driver.execute_script('return document.readyState') == 'complete':
+                            break
+                        time.sleep(0.25)
+                # Let late subresources land in the cache before Chrome exits
+                time.sleep(2)
+            except Exception as e:
+                log.warning("Could not warm the profile template: %s", e)
+                shutil.rmtree(building, ignore_errors=True)
+                return False
+            finally:
+                if driver is not None:
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+            with open(os.path.join(building, '.warmed'), 'w') as f:
+                f.write(' '.join(self.urls))
+
+            old = f'{self.path}.old-{os.getpid()}'
+            handle = self._file_lock(fcntl.LOCK_EX)
+            try:
+                if os.path.exists(self.path):
+                    os.rename(self.path, old)
+                os.rename(building, self.path)
+            finally:
+                handle.close()
+            shutil.rmtree(old, ignore_errors=True)
+            with self.stats_lock:
+                self.refreshes += 1
+                self.last_refresh_seconds = time.time() - started
+            log.info("Warmed profile template %s in %.1fs", self.path, self.last_refresh_seconds)
+            return True
+
+    def _copy_file(self, src, dst):
+        if self.reflink_supported:
+            try:
+                reflink(src, dst)
+                return 'reflink'
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                    raise
+                # Same filesystem for every file, so stop trying after one miss
+                self.reflink_supported = False
+                log.info("Reflinks unsupported for %s (%s), copying instead", self.path, e)
+        if self.mode == 'hardlink' and os.path.basename(os.path.dirname(src)) in SHARED_CACHE_DIRS:
+            try:
+                os.link(src, dst)
+                return 'hardlink'
+            except OSError:
+                pass
+        shutil.copy2(src, dst)
+        return 'copy'
+
+    def clone(self):
+        """
+        New scanner profile dir, pre-filled from the template when one is
+        ready (an empty profile otherwise). The caller removes it.
+        """
+        profile_dir = make_profile_dir()
+        if not self.enabled or not os.path.exists(os.path.join(self.path, '.warmed')):
+            return profile_dir
+        started = time.time()
+        methods = set()
+
+        def copy_function(src, dst):
+            methods.add(self._copy_file(src, dst))
+            return dst
+
+        handle = self._file_lock(fcntl.LOCK_SH)
+        try:
+            shutil.copytree(self.path, profile_dir, symlinks=True, ignore=_ignore,
+                            copy_function=copy_function, dirs_exist_ok=True)
+        except (OSError, shutil.Error) as e:
+            log.warning("Could not clone profile template, using an empty profile: %s", e)
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            return make_profile_dir()
+        finally:
+            handle.close()
+        elapsed = time.time() - started
+        with self.stats_lock:
+            self.clones += 1
+            self.clone_seconds += elapsed
+            self.clone_method = '+'.join(sorted(methods)) or None
+        log.debug("Cloned profile template into %s in %.3fs (%s)", profile_dir, elapsed, self.clone_method)
+        return profile_dir
+
+    def summary(self):
+        age = self.age()
+        with self.stats_lock:
+            return {
+                'path': self.path,
+                'enabled': self.enabled,
+                'age': round(age, 1) if age is not None else None,
+                'refreshes': self.refreshes,
+                'last_refresh_seconds': self.last_refresh_seconds,
+                'clones': self.clones,
+                'clone_method': self.clone_method,
+                'avg_clone_ms': round(self.clone_seconds / self.clones * 1000, 2) if self.clones else None,
+            }
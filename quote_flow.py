@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Quote-flow state machine for scan_geico_site
+The scan loop used to run every section (login field lookup, Commercial Auto
+search, zip/USDOT entry) on every frame and work out where it was from page
+flags such as window.geicoLoginAttempted and window.commercialAutoClicked,
+which a navigation silently clears. QuoteFlow keeps the position in Python
+instead:
+
+    gateway -> login -> dashboard -> commercial_auto -> zip -> usdot -> result
+
+and SECTIONS says which loop sections run in each state, so a frame on the
+dashboard no longer pays for login field lookups and a frame in the zip form
+no longer searches for the Commercial Auto tab. Frame capture and element
+detection for the overlay run in every state.
+
+Reaching result ends the quote: once the result page has been on the live
+view for SCANNER_RESULT_LINGER seconds (default 15), complete() turns true
+and the scan loop exits, which closes the browser and frees its pool slot.
+
+Time spent in each state is recorded per quote (summary(), served by
+/get-status) and in the scan_metrics histograms as state_<name>.
+"""
+
+import os
+import threading
+import time
+
+from scanner_logging import get_logger
+
+log = get_logger('flow')
+
+GATEWAY = 'gateway'
+LOGIN = 'login'
+DASHBOARD = 'dashboard'
+COMMERCIAL_AUTO = 'commercial_auto'
+ZIP = 'zip'
+USDOT = 'usdot'
+RESULT = 'result'
+
+STATES = (GATEWAY, LOGIN, DASHBOARD, COMMERCIAL_AUTO, ZIP, USDOT, RESULT)
+
+# Loop sections each state runs
+SECTIONS = {
+    GATEWAY: {'login'},
+    LOGIN: {'login'},
+    DASHBOARD: {'commercial_auto'},
+    COMMERCIAL_AUTO: {'zip'},
+    ZIP: {'zip'},
+    USDOT: set(),
+    RESULT: set(),
+}
+
+# With no login form this long after start, assume the session is already
+# signed in (or the gateway went straight through) and move on
+LOGIN_FORM_TIMEOUT = 30.0
+
+# How long the result page stays on the live view before the scan ends
+RESULT_LINGER = float(os.environ.get('SCANNER_RESULT_LINGER', '15'))
+
+
+class QuoteFlow:
+    """Current quote-flow state plus how long each state took"""
+
+    def __init__(self, metrics=None, state=GATEWAY):
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.state = state
+        self.entered = time.time()
+        self.started = self.entered
+        self.totals = {}  # state -> seconds, over every visit
+        self.history = []  # (state, seconds, reason that ended it)
+
+    def runs(self, section):
+        """Whether the loop section belongs to the current state"""
+        return section in SECTIONS[self.state]
+
+    def in_state(self):
+        return time.time() - self.entered
+
+    def complete(self, linger=RESULT_LINGER):
+        """The quote reached its result and it has been shown for `linger` seconds"""
+        return self.state == RESULT and self.in_state() >= linger
+
+    def advance(self, state, reason=''):
+        """Move to `state` (a no-op if already there); returns True on a change"""
+        if state not in SECTIONS:
+            raise ValueError(f"Unknown quote-flow state: {state}")
+        with self.lock:
+            if state == self.state:
+                return False
+            now = time.time()
+            seconds = now - self.entered
+            previous = self.state
+            self.totals[previous] = self.totals.get(previous, 0.0) + seconds
+            self.history.append((previous, seconds, reason))
+            self.state = state
+            self.entered = now
+        if self.metrics is not None:
+            self.metrics.observe(f'state_{previous}', seconds)
+        log.info("Quote flow %s -> %s after %.1fs%s", previous, state, seconds,
+                 f" ({reason})" if reason else '')
+        return True
+
+    def summary(self):
+        with self.lock:
+            totals = dict(self.totals)
+            current = time.time() - self.entered
+            totals[self.state] = totals.get(self.state, 0.0) + current
+            return {
+                'state': self.state,
+                'in_state_s': round(current, 2),
+                'elapsed_s': round(time.time() - self.started, 2),
+                'states_s': {state: round(totals[state], 2) for state in STATES if state in totals},
+                'history': [{'state': state, 'seconds': round(seconds, 2), 'exit': reason}
+                            for state, seconds, reason in self.history],
+            }
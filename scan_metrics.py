@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency metrics for the Geico scanner loop
+Each stage of scan_geico_site (capture, login detection, Commercial Auto
+checks, the detection collector and each Python filter pass, ...) is timed into
+a histogram. instrument_driver() wraps the WebDriver's execute() so every
+command sent to chromedriver is counted, both in total per command and per
+frame. The result is served as Prometheus text from /metrics, and as
+p50/p95/p99 summaries in /get-status.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond filter passes up to multi-second stalls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# WebDriver commands per frame
+CALL_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Recent samples kept per histogram for the quantiles in /get-status
+WINDOW_SIZE = 1024
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Cumulative-bucket histogram plus a sliding window for quantiles"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.window = deque(maxlen=WINDOW_SIZE)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.window.append(value)
+
+    def quantiles(self):
+        if not self.window:
+            return {}
+        ordered = sorted(self.window)
+        last = len(ordered) - 1
+        return {f"p{int(q * 100)}": ordered[min(last, int(round(q * last)))] for q in QUANTILES}
+
+    def prometheus_lines(self, name, labels=''):
+        sep = ',' if labels else ''
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        label_block = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{label_block} {self.sum:.6f}')
+        lines.append(f'{name}_count{label_block} {self.count}')
+        return lines
+
+
+class FrameCalls:
+    """WebDriver calls in one scan thread's current frame"""
+
+    def __init__(self):
+        self.count = 0
+
+
+class ScanMetrics:
+    """
+    Thread-safe registry of stage timings and WebDriver call counts.
+    Scan threads write; Flask request threads read. Frame and lap state is
+    per thread, so concurrent sessions share the histograms without mixing
+    up each other's stage boundaries. Threads working for a scan thread
+    (its pipeline stages) count their calls into its frames through
+    share_frame().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.frame_latency = Histogram(LATENCY_BUCKETS)
+            self.calls_per_frame = Histogram(CALL_BUCKETS)
+            self.webdriver_calls = {}
+            self.frames = 0
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block: with scan_metrics.stage('capture'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def lap(self, stage):
+        """
+        Record the time since the previous lap (or start_frame) under `stage`.
+        Consecutive laps split one loop iteration into contiguous stages
+        without re-indenting the code they cover.
+        """
+        now = time.perf_counter()
+        start = getattr(self.local, 'lap_start', None)
+        self.local.lap_start = now
+        if start is not None:
+            self.observe(stage, now - start)
+
+    def frame_calls(self):
+        """The calling thread's FrameCalls, to hand to share_frame() on its helper threads"""
+        calls = getattr(self.local, 'frame_calls', None)
+        if calls is None:
+            calls = self.local.frame_calls = FrameCalls()
+        return calls
+
+    def share_frame(self, calls):
+        """Count the calling thread's calls into another thread's frames"""
+        self.local.frame_calls = calls
+
+    def count_call(self, command):
+        calls = self.frame_calls()
+        with self.lock:
+            self.webdriver_calls[command] = self.webdriver_calls.get(command, 0) + 1
+            calls.count += 1
+
+    def start_frame(self):
+        calls = self.frame_calls()
+        with self.lock:
+            calls.count = 0
+        self.local.frame_start = self.local.lap_start = time.perf_counter()
+
+    def end_frame(self):
+        start = getattr(self.local, 'frame_start', None)
+        if start is None:
+            return
+        calls = self.frame_calls()
+        with self.lock:
+            self.frame_latency.observe(time.perf_counter() - start)
+            self.calls_per_frame.observe(calls.count)
+            self.frames += 1
+        self.local.frame_start = self.local.lap_start = None
+
+    def summary(self):
+        """Milliseconds quantiles per stage, for /get-status"""
+        with self.lock:
+            stages = {}
+            for name, histogram in self.stages.items():
+                stage = {key: round(value * 1000, 2) for key, value in histogram.quantiles().items()}
+                stage['count'] = histogram.count
+                stages[name] = stage
+            frame = {key: round(value * 1000, 2) for key, value in self.frame_latency.quantiles().items()}
+            return {
+                'frames': self.frames,
+                'frame_ms': frame,
+                'stages_ms': stages,
+                'webdriver_calls_per_frame': self.calls_per_frame.quantiles(),
+                'webdriver_calls': dict(self.webdriver_calls),
+            }
+
+    def prometheus(self):
+        """Prometheus text exposition format"""
+        with self.lock:
+            lines = [
+                '# HELP scanner_stage_seconds Time spent in each scan loop stage',
+                '# TYPE scanner_stage_seconds histogram',
+            ]
+            for name in sorted(self.stages):
+                lines.extend(self.stages[name].prometheus_lines('scanner_stage_seconds', f'stage="{name}"'))
+            lines += [
+                '# HELP scanner_frame_seconds Wall time of one scan loop iteration',
+                '# TYPE scanner_frame_seconds histogram',
+            ]
+            lines.extend(self.frame_latency.prometheus_lines('scanner_frame_seconds'))
+            lines += [
+                '# HELP scanner_webdriver_calls_per_frame WebDriver round trips per scan loop iteration',
+                '# TYPE scanner_webdriver_calls_per_frame histogram',
+            ]
+            lines.extend(self.calls_per_frame.prometheus_lines('scanner_webdriver_calls_per_frame'))
+            lines += [
+                '# HELP scanner_webdriver_calls_total WebDriver round trips by command',
+                '# TYPE scanner_webdriver_calls_total counter',
+            ]
+            for command in sorted(self.webdriver_calls):
+                lines.append(f'scanner_webdriver_calls_total{{command="{command}"}} {self.webdriver_calls[command]}')
+            lines += [
+                '# HELP scanner_frames_total Scan loop iterations',
+                '# TYPE scanner_frames_total counter',
+                f'scanner_frames_total {self.frames}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_driver(driver, metrics):
+    """
+    Count every WebDriver command sent through `driver`. WebElement methods
+    call their parent driver's execute(), so element lookups, clicks and
+    attribute reads are counted too.
+    """
+    execute = driver.execute
+
+    def counted_execute(driver_command, params=None):
+        metrics.count_call(driver_command)
+        return execute(driver_command, params)
+
+    driver.execute = counted_execute
+    return driver
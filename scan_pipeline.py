@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Staged capture / detection / automation pipeline for scan_geico_site
+The scan loop used to capture a frame, run the login/Commercial Auto/zip
+automation and re-detect overlay elements one after the other on a single
+thread, so a multi-second automation wait froze the live view and a slow
+detection pass held up the automation. The stages now run on their own
+threads at their own rates:
+
+- capture (producer): grabs frames (or takes Chrome's screencast pushes),
+  publishes them to the live view and hands them to detection, at the rate
+  the session's FrameRateGovernor picks (frame_governor.py)
+- detection (consumer): takes the newest frame, re-detects overlay elements
+  when the DOM moved (or every redetect interval) and publishes them
+- automation (worker): the quote flow itself, still on the scan thread, which
+  paces itself with pace()
+
+Capture and detection are connected by a bounded queue that drops the oldest
+frame when full, so detection always works on the newest frame and never
+builds a backlog. The automation feeds detection the login field overlay
+through seed_elements. Per-stage rates are served by /get-status.
+
+The per-frame calls go over the DevTools websocket when cdp_client is in use,
+which lets them overlap the automation's Selenium commands; on the Selenium
+fallback chromedriver serializes the commands, so the stages interleave
+instead of overlapping.
+
+Configure with SCANNER_CAPTURE_INTERVAL, SCANNER_DETECTION_INTERVAL and
+SCANNER_AUTOMATION_INTERVAL (minimum seconds between iterations of each
+stage; capture usually runs slower, at the governor's target rate).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from dom_watch import DomChangeWatcher
+from element_detector import detect_elements
+from frame_capture import capture_frame
+from frame_encoding import FrameEncoder
+from scanner_logging import get_logger
+from spatial_dedup import UniqueElementSet
+
+log = get_logger('pipeline')
+
+CAPTURE_INTERVAL = float(os.environ.get('SCANNER_CAPTURE_INTERVAL', '0.01'))
+DETECTION_INTERVAL = float(os.environ.get('SCANNER_DETECTION_INTERVAL', '0.1'))
+AUTOMATION_INTERVAL = float(os.environ.get('SCANNER_AUTOMATION_INTERVAL', '0.1'))
+
+FRAME_QUEUE_SIZE = 2
+STAGE_ERROR_BACKOFF = 0.5
+STOP_TIMEOUT = 5.0
+
+
+class LatestQueue:
+    """
+    Bounded queue that drops its oldest item instead of blocking the
+    producer when full; get() hands out the newest item and discards the
+    older ones, which are stale by then.
+    """
+
+    def __init__(self, maxsize=FRAME_QUEUE_SIZE):
+        self.items = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout):
+        """Newest item, or None on timeout or once closed"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.items or self.closed, timeout)
+            if not self.items:
+                return None
+            item = self.items.pop()
+            self.dropped += len(self.items)
+            self.items.clear()
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __len__(self):
+        with self.condition:
+            return len(self.items)
+
+
+class StageRate:
+    """Iterations per second and busy time of one pipeline stage"""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.lock = threading.Lock()
+        self.ticks = deque()
+        self.iterations = 0
+        self.busy = 0.0
+        self.errors = 0
+
+    def tick(self, busy):
+        now = time.time()
+        with self.lock:
+            self.ticks.append(now)
+            while self.ticks and self.ticks[0] < now - self.window:
+                self.ticks.popleft()
+            self.iterations += 1
+            self.busy += busy
+
+    def fps(self):
+        cutoff = time.time() - self.window
+        with self.lock:
+            return sum(1 for t in self.ticks if t >= cutoff) / self.window
+
+    def summary(self):
+        fps = self.fps()
+        with self.lock:
+            return {
+                'fps': round(fps, 1),
+                'iterations': self.iterations,
+                'avg_busy_ms': round(self.busy / self.iterations * 1000, 2) if self.iterations else None,
+                'errors': self.errors,
+            }
+
+
+class ScanPipeline:
+    """
+    Capture and detection threads for one session, plus the pacing of the
+    automation loop that runs on the scan thread. start() once the browser
+    is ready; stop() before the browser is closed.
+    """
+
+    def __init__(self, session, driver, cdp=None, screencast=None, metrics=None,
+                 redetect_interval=5.0, capture_interval=CAPTURE_INTERVAL,
+                 detection_interval=DETECTION_INTERVAL, automation_interval=AUTOMATION_INTERVAL):
+        self.session = session
+        self.driver = driver
+        self.cdp = cdp
+        self.screencast = screencast
+        self.metrics = metrics
+        self.redetect_interval = redetect_interval
+        self.intervals = {
+            'capture': capture_interval,
+            'detection': detection_interval,
+            'automation': automation_interval,
+        }
+        self.rates = {stage: StageRate() for stage in self.intervals}
+        # Built on the scan thread; the stage threads' WebDriver/CDP calls
+        # count toward its current frame
+        self.frame_calls = metrics.frame_calls() if metrics is not None else None
+        self.frames = LatestQueue()
+        self.encoder = FrameEncoder(session.view_sizes)
+        self.stopping = threading.Event()
+        self.page_lock = threading.Lock()
+        self.dom_watcher = DomChangeWatcher(cdp or driver)
+        self.threads = []
+        self.started = None
+        self.last_detection = 0
+        self.last_seeds = None
+        self.last_document = None
+        self.detections = 0  # Frames that were actually re-detected
+        self.screencast_sequence = 0
+        # Overlay entries the automation knows about (the login fields), put
+        # first so they keep their labels over the generic detections. The
+        # automation replaces the list rather than mutating it
+        self.seed_elements = []
+
+    @property
+    def running(self):
+        return not self.stopping.is_set() and self.session.is_scanning
+
+    def page(self):
+        """The DevTools driver while its connection is up, else Selenium"""
+        with self.page_lock:
+            if self.cdp is not None and not self.cdp.alive:
+                log.warning("DevTools connection lost, pipeline falling back to Selenium")
+                self.cdp = None
+                self.dom_watcher = DomChangeWatcher(self.driver)
+                self.session.driver_backend = 'selenium'
+            return self.cdp or self.driver
+
+    def _observe(self, stage, seconds):
+        if self.metrics is not None:
+            self.metrics.observe(stage, seconds)
+
+    def _interval(self, stage):
+        if stage == 'capture':
+            return max(self.intervals['capture'], self.session.governor.interval())
+        return self.intervals[stage]
+
+    def _run_stage(self, stage, step):
+        rate = self.rates[stage]
+        if self.metrics is not None:
+            self.metrics.share_frame(self.frame_calls)
+        # Capture pauses on the governor so a viewer or click ends an idle wait
+        pause = self.session.governor.pause if stage == 'capture' else self.stopping.wait
+        while self.running:
+            started = time.perf_counter()
+            idle = False
+            try:
+                # A step returns False when there was nothing to work on
+                idle = step() is False
+            except Exception as e:
+                rate.errors += 1
+                log.exception("Error in %s stage: %s", stage, e)
+                self.stopping.wait(STAGE_ERROR_BACKOFF)
+            busy = time.perf_counter() - started
+            if not idle:
+                rate.tick(busy)
+            interval = self._interval(stage)
+            if interval > busy and self.running:
+                pause(interval - busy)
+        log.debug("%s stage stopped", stage)
+
+    def capture(self):
+        """One capture-stage iteration: newest frame to the live view and detection"""
+        session = self.session
+        started = time.perf_counter()
+        frame = None
+        screencast = self.screencast
+        if screencast is not None and screencast.is_alive():
+            # Chrome scales the pushed frames to the viewers' size itself
+            screencast.resize(session.view_sizes.size())
+            sequence, frame = screencast.wait_for_frame(self.screencast_sequence, timeout=0.5)
+            if sequence == self.screencast_sequence:
+                return False
+            self.screencast_sequence = sequence
+        if frame is None:
+            frame = capture_frame(self.page())
+        frame = self.encoder.encode(frame)
+        # Only frames whose content changed are published; clients holding the
+        # current sequence/ETag get a "no change" answer
+        frame_changed = session.view.publish_frame(frame) is not None
+        session.capture_stats.record(frame, frame_changed)
+        log.debug("Frame captured, size: %s bytes, timings: %s", frame['size'], frame['timings'])
+        self.frames.put(frame)
+        if screencast is not None and screencast.is_alive():
+            session.fps = screencast.fps()
+        else:
+            session.fps = round(self.rates['capture'].fps())
+        self._observe('capture', time.perf_counter() - started)
+
+    def detect(self):
+        """One detection-stage iteration over the newest captured frame"""
+        frame = self.frames.get(timeout=self.intervals['detection'] or 0.1)
+        if frame is None:
+            return False
+        started = time.perf_counter()
+        page = self.page()
+        # Re-detect only when the DOM/layout/scroll version moved; otherwise
+        # keep the previous overlay (re-check periodically regardless)
+        dom_changed = self.dom_watcher.changed()
+        self._observe('dom_watch', time.perf_counter() - started)
+        if dom_changed:
+            self._report_activity()
+        seeds = self.seed_elements
+        if not dom_changed and seeds is self.last_seeds and \
+           time.time() - self.last_detection < self.redetect_interval:
+            return
+        self.last_detection = time.time()
+        self.last_seeds = seeds
+        self.detections += 1
+        started = time.perf_counter()
+        elements_found = list(seeds)
+        # Skip duplicate/overlapping/contained boxes, keeping the smaller,
+        # more specific element; the seeded login fields win over the
+        # generic input detections for the same boxes
+        add_unique_element = UniqueElementSet(elements_found).add
+        detect_elements(page, add_unique_element, self.metrics.observe if self.metrics else None)
+        self.session.view.publish_elements(elements_found)
+        self._observe('detection', time.perf_counter() - started)
+
+    def _report_activity(self):
+        """Tell the governor whether the DOM change was a new document"""
+        state = self.dom_watcher.state
+        document = state.get('documentId') if state else None
+        if document is not None and document != self.last_document:
+            if self.last_document is not None:
+                self.session.governor.navigation()
+            self.last_document = document
+        else:
+            self.session.governor.activity()
+
+    def start(self):
+        self.started = time.time()
+        for stage, step in (('capture', self.capture), ('detection', self.detect)):
+            thread = threading.Thread(target=self._run_stage, args=(stage, step),
+                                      name=f'{stage}-{self.session.session_id}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        log.info("Pipeline started for session %s (capture every %ss, detection every %ss)",
+                 self.session.session_id, self.intervals['capture'], self.intervals['detection'])
+
+    def pace(self, started):
+        """
+        End of one automation iteration that began at perf_counter() value
+        `started`: record it, then spend the rest of the automation interval
+        running driver commands queued by request handlers
+        """
+        busy = time.perf_counter() - started
+        self.rates['automation'].tick(busy)
+        self.session.commands.serve(self.driver, max(0.0, self.intervals['automation'] - busy))
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Stop the stage threads; returns once they are done with the driver"""
+        self.stopping.set()
+        self.frames.close()
+        self.session.governor.wake()
+        deadline = time.time() + timeout
+        for thread in self.threads:
+            thread.join(max(0.0, deadline - time.time()))
+            if thread.is_alive():
+                log.warning("%s did not stop within %ss", thread.name, timeout)
+
+    def summary(self):
+        stages = {}
+        for stage, rate in self.rates.items():
+            stages[stage] = rate.summary()
+            stages[stage]['interval_s'] = self.intervals[stage]
+        stages['capture']['queued'] = len(self.frames)
+        stages['capture']['dropped'] = self.frames.dropped
+        stages['capture']['target_fps'] = round(self.session.governor.target, 1)
+        stages['detection']['detections'] = self.detections
+        uptime = time.time() - self.started if self.started else 0.0
+        return {'running': self.running, 'uptime_s': round(uptime, 2), 'stages': stages}
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Logging setup for the Geico scanner
+Every subsystem gets a child of the 'scanner' logger (scanner.capture,
+scanner.login, scanner.detection, ...). Records go onto an in-memory queue and
+a background QueueListener does the formatting and I/O, so the scan loop never
+opens a file or waits on a terminal. The log file rotates by size, and a
+message repeated within SCANNER_LOG_RATE_LIMIT seconds is dropped, with the
+number of dropped repeats added to the next copy that gets through.
+
+Configure with SCANNER_LOG_LEVEL (DEBUG, INFO, WARNING, ...), SCANNER_LOG_FILE,
+SCANNER_LOG_MAX_BYTES, SCANNER_LOG_BACKUPS, SCANNER_LOG_RATE_LIMIT and
+SCANNER_LOG_CONSOLE (0 to log to the file only). capture_library_logging()
+sends Flask/werkzeug and other libraries' records through the same queue.
+
+Debug calls are free when DEBUG is off as long as they use %-style arguments
+(log.debug("size %s", size)) rather than f-strings. Guard arguments that cost a
+WebDriver call (driver.current_url) with log.isEnabledFor(logging.DEBUG).
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_FILE = os.environ.get('SCANNER_LOG_FILE', 'scanner_debug_thread.log')
+LOG_LEVEL = os.environ.get('SCANNER_LOG_LEVEL', 'INFO').upper()
+LOG_MAX_BYTES = int(os.environ.get('SCANNER_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+LOG_BACKUPS = int(os.environ.get('SCANNER_LOG_BACKUPS', '3'))
+LOG_RATE_LIMIT = float(os.environ.get('SCANNER_LOG_RATE_LIMIT', '5'))
+LOG_CONSOLE = os.environ.get('SCANNER_LOG_CONSOLE', '1') != '0'
+
+# Records waiting for the writer thread; beyond this they are dropped
+LOG_QUEUE_SIZE = 10000
+
+ROOT_LOGGER = 'scanner'
+FILE_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+CONSOLE_FORMAT = '[%(levelname)s] %(name)s: %(message)s'
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops a record when the same message (logger, level and formatted
+    text) was let through less than `interval` seconds ago, so distinct
+    errors sharing a template are all kept. The next copy that passes
+    reports how many repeats were dropped.
+    """
+
+    MAX_KEYS = 2048
+
+    def __init__(self, interval=LOG_RATE_LIMIT):
+        super().__init__()
+        self.interval = interval
+        self.last_seen = {}
+        self.suppressed = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.interval <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            last = self.last_seen.get(key)
+            if last is not None and now - last < self.interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return False
+            if len(self.last_seen) >= self.MAX_KEYS:
+                self.last_seen.clear()
+            self.last_seen[key] = now
+            dropped = self.suppressed.pop(key, 0)
+        if dropped:
+            record.msg = f"{record.msg} (repeated {dropped} more times)"
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=None, log_file=None, console=None):
+    """
+    Attach the queue handler to the 'scanner' logger and start the
+    background writer. Safe to call more than once; later calls only
+    change the level (when one is given).
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger(ROOT_LOGGER)
+    if isinstance(level, str):
+        level = level.upper()
+    with _lock:
+        if _listener is not None:
+            if level is not None:
+                root.setLevel(level)
+            return root
+        root.setLevel(level or LOG_LEVEL)
+
+        handlers = []
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file or LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+        handlers.append(file_handler)
+        if LOG_CONSOLE if console is None else console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+            handlers.append(console_handler)
+
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        queue_handler = DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter())
+        root.addHandler(queue_handler)
+        _queue_handler = queue_handler
+        # Flask's basicConfig configures the root logger; keep our records out of it
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    return root
+
+
+def capture_library_logging(level=None):
+    """
+    Route the Python root logger (Flask, werkzeug, urllib3, ...) through the
+    scanner's queue, rotating file and rate limit, instead of a second
+    unrotated logging.basicConfig stream
+    """
+    setup_logging()
+    root = logging.getLogger()
+    with _lock:
+        if _queue_handler not in root.handlers:
+            root.addHandler(_queue_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level or LOG_LEVEL)
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def get_logger(subsystem):
+    """Logger for one scanner subsystem, e.g. get_logger('capture')"""
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Browser session pool for the Geico scanner
+Each quote runs in its own ScanSession: one Chrome/chromedriver instance with
+its own profile directory, DevTools port, frame state and broadcaster (the
+browser itself comes from browser_pool.py). The
+SessionPool keys sessions by ID, caps how many browsers run at once and queues
+start requests beyond that; when a session finishes, the oldest queued one is
+started in its slot. Only start() creates sessions; one that is not running,
+not queued and has no open stream is dropped after SCANNER_SESSION_IDLE_TTL
+seconds without a request.
+
+Configure with SCANNER_MAX_SESSIONS (concurrent browsers, default 4),
+SCANNER_SESSION_QUEUE_SIZE (waiting start requests, default 16) and
+SCANNER_SESSION_IDLE_TTL (default 600).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from frame_capture import CaptureStats
+from frame_encoding import ViewerSizes
+from frame_governor import FrameRateGovernor
+from frame_stream import FrameBroadcaster
+from scanner_logging import get_logger
+from session_state import LiveView, DriverCommands
+from waits import WaitReport
+
+log = get_logger('sessions')
+
+MAX_SESSIONS = int(os.environ.get('SCANNER_MAX_SESSIONS', '4'))
+SESSION_QUEUE_SIZE = int(os.environ.get('SCANNER_SESSION_QUEUE_SIZE', '16'))
+SESSION_IDLE_TTL = float(os.environ.get('SCANNER_SESSION_IDLE_TTL', '600'))
+# Idle sessions are looked for at most this often
+EVICT_INTERVAL = 30.0
+
+DEFAULT_SESSION_ID = 'default'
+
+
+class SessionPoolFull(Exception):
+    """Raised when every slot is busy and the start queue is full too"""
+
+
+class SessionBusy(Exception):
+    """Raised when the session's previous scan still holds its slot"""
+
+
+class ScanSession:
+    """Everything one running quote owns; replaces the old module globals"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.driver = None
+        self.is_scanning = False
+        self.thread = None
+        self.debug_port = None
+        self.profile_dir = None
+        self.driver_backend = None  # 'cdp' or 'selenium' for the hot-loop calls
+        self.status = "Ready to scan"
+        self.broadcaster = FrameBroadcaster()
+        # Frame/element snapshots for readers on other threads, and the queue
+        # request handlers reach the driver through
+        self.view = LiveView(self.broadcaster)
+        self.commands = DriverCommands()
+        self.fps = 0
+        # Capture rate from viewer presence and page activity; kept across
+        # quotes, since the viewers' streams outlive a single quote
+        self.governor = FrameRateGovernor()
+        self.view_sizes = ViewerSizes()  # Display sizes frames are encoded for
+        self.capture_stats = CaptureStats()
+        self.waits = WaitReport()  # Time the quote flow spent waiting, per quote
+        self.flow = None  # QuoteFlow of the running quote, set by the scan loop
+        self.pipeline = None  # ScanPipeline (capture/detection threads) of the running quote
+        self.created = time.time()
+        self.started = None
+        self.last_used = self.created
+
+    def touch(self):
+        self.last_used = time.time()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def streaming(self):
+        """A viewer holds an open stream on this session"""
+        return self.governor.streams > 0 or self.view_sizes.tile_streams > 0
+
+    @property
+    def detected_elements(self):
+        return self.view.elements.elements
+
+    def summary(self):
+        return {
+            'session_id': self.session_id,
+            'status': self.status,
+            'scanning': self.is_scanning,
+            'running': self.running,
+            'debug_port': self.debug_port,
+            'profile_dir': self.profile_dir,
+            'driver_backend': self.driver_backend,
+            'flow_state': self.flow.state if self.flow is not None else None,
+            'fps': self.fps,
+            'target_fps': self.governor.target,
+            'frame_sequence': self.view.frame.sequence if self.view.frame else 0,
+            'commands': self.commands.summary(),
+            'started': self.started,
+        }
+
+
+class SessionPool:
+    """
+    Session registry with a cap on concurrent browsers. start() runs
+    target(session) on a new thread when a slot is free, otherwise queues
+    the session; release() (called when a scan thread exits) frees the slot
+    and starts the next queued session.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, queue_size=SESSION_QUEUE_SIZE, idle_ttl=SESSION_IDLE_TTL):
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.idle_ttl = idle_ttl
+        self.last_eviction = time.time()
+        self.lock = threading.RLock()
+        self.sessions = {}
+        self.active = {}  # session_id -> session holding a slot
+        self.waiting = deque()  # (session, target) in arrival order
+
+    def get(self, session_id, create=False):
+        """The session, or None if unknown; only start() passes create"""
+        with self.lock:
+            self._evict_idle()
+            session = self.sessions.get(session_id)
+            if session is None and create:
+                session = self.sessions[session_id] = ScanSession(session_id)
+            if session is not None:
+                session.touch()
+            return session
+
+    def _evict_idle(self):
+        """Drop sessions nobody has used for idle_ttl and that hold nothing"""
+        now = time.time()
+        if now - self.last_eviction < EVICT_INTERVAL:
+            return
+        self.last_eviction = now
+        queued = {session.session_id for session, _ in self.waiting}
+        for session_id, session in list(self.sessions.items()):
+            if (session_id in self.active or session_id in queued or session.running
+                    or session.is_scanning or session.streaming):
+                continue
+            if now - session.last_used >= self.idle_ttl:
+                del self.sessions[session_id]
+                log.info("Session %s evicted after %.0fs idle", session_id, now - session.last_used)
+
+    def active_count(self):
+        with self.lock:
+            return len(self.active)
+
+    def queue_position(self, session_id):
+        """1-based position in the start queue, or None if not queued"""
+        with self.lock:
+            for position, (session, _) in enumerate(self.waiting, start=1):
+                if session.session_id == session_id:
+                    return position
+            return None
+
+    def start(self, session_id, target):
+        """
+        Start (or queue) a scan for session_id. Returns the session and
+        'started' or 'queued'. Raises SessionPoolFull if it cannot queue, and
+        SessionBusy while the session's previous scan still holds its slot.
+        """
+        with self.lock:
+            created = session_id not in self.sessions
+            session = self.get(session_id, create=True)
+            if session_id in self.active or self.queue_position(session_id):
+                raise SessionBusy(f"Session {session_id} is still stopping its previous scan")
+            if len(self.active) < self.max_sessions:
+                self._launch(session, target)
+                return session, 'started'
+            if len(self.waiting) >= self.queue_size:
+                if created:
+                    del self.sessions[session_id]
+                raise SessionPoolFull(f"{len(self.active)} sessions running and "
+                                      f"{len(self.waiting)} queued")
+            session.is_scanning = True
+            self.waiting.append((session, target))
+            session.status = f"Queued (position {len(self.waiting)})"
+            log.info("Session %s queued at position %s", session_id, len(self.waiting))
+            return session, 'queued'
+
+    def _launch(self, session, target):
+        session.debug_port = None  # Set once the scan has its browser
+        session.status = "Starting..."
+        session.is_scanning = True
+        session.started = time.time()
+        session.waits = WaitReport()
+        session.flow = None
+        session.pipeline = None
+        self.active[session.session_id] = session
+
+        def run():
+            try:
+                target(session)
+            finally:
+                self.release(session)
+
+        session.thread = threading.Thread(target=run, name=f"scan-{session.session_id}", daemon=True)
+        session.thread.start()
+        log.info("Session %s started (%s/%s slots)",
+                 session.session_id, len(self.active), self.max_sessions)
+
+    def release(self, session):
+        """Free the session's slot and start the next queued session"""
+        with self.lock:
+            if self.active.get(session.session_id) is session:
+                del self.active[session.session_id]
+            session.is_scanning = False
+            while self.waiting and len(self.active) < self.max_sessions:
+                queued, target = self.waiting.popleft()
+                if queued.is_scanning:
+                    self._launch(queued, target)
+            for position, (queued, _) in enumerate(self.waiting, start=1):
+                queued.status = f"Queued (position {position})"
+
+    def stop(self, session_id, wait=0):
+        """
+        Ask a session to stop (or drop it from the queue). The scan thread
+        notices between steps and closes its own browser, so the driver is
+        never quit under a command in flight. With wait > 0, block up to that
+        many seconds for the thread to exit, and only then quit the driver
+        to unstick it.
+        """
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            self.waiting = deque(item for item in self.waiting if item[0] is not session)
+            session.is_scanning = False
+        session.commands.close()
+        if wait and session.thread is not None and session.thread is not threading.current_thread():
+            session.thread.join(timeout=wait)
+            driver = session.driver
+            if session.thread.is_alive() and driver:
+                log.warning("Session %s did not stop within %ss, quitting its browser", session_id, wait)
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        return session
+
+    def summary(self):
+        with self.lock:
+            return {
+                'max_sessions': self.max_sessions,
+                'idle_ttl': self.idle_ttl,
+                'active': len(self.active),
+                'queued': [session.session_id for session, _ in self.waiting],
+                'sessions': {sid: session.summary() for sid, session in self.sessions.items()},
+            }
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+DevTools port allocation and session registry for the Geico scanner
+Every scanner browser gets its own --remote-debugging-port from a free range
+instead of the hard-coded 9222, and the running sessions are recorded on disk
+so separate processes (check_geico_state.py, deep_click_investigation.py,
+geico_scanner_ultimate_fix.py, ...) can attach to the right browser by
+session ID.
+
+Ports are reserved with one lock file per port (created with O_EXCL), so two
+scanner processes on the same box never hand out the same port. Each session
+is one small JSON file. Entries whose owning process has died are treated as
+stale and cleaned up on read.
+
+Configure with SCANNER_DEBUG_PORT_BASE (default 9222),
+SCANNER_DEBUG_PORT_COUNT (size of the range, default 100) and
+SCANNER_SESSION_REGISTRY (directory, default <tmp>/geico_scanner_sessions).
+Attach tools take the session from --session <id> or SCANNER_SESSION.
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+DEBUG_PORT_BASE = int(os.environ.get('SCANNER_DEBUG_PORT_BASE', '9222'))
+DEBUG_PORT_COUNT = int(os.environ.get('SCANNER_DEBUG_PORT_COUNT', '100'))
+REGISTRY_DIR = os.environ.get('SCANNER_SESSION_REGISTRY',
+                              os.path.join(tempfile.gettempdir(), 'geico_scanner_sessions'))
+
+# Where the attach tools look when no session is named and none is registered
+LEGACY_DEBUG_PORT = 9222
+
+
+class NoFreePort(RuntimeError):
+    """Every port in the configured range is reserved or in use"""
+
+
+def _registry_dir():
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    return REGISTRY_DIR
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _port_lock(port):
+    return os.path.join(_registry_dir(), f'port-{port}.lock')
+
+
+def _session_file(session_id):
+    safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(session_id))
+    return os.path.join(_registry_dir(), f'session-{safe}.json')
+
+
+def port_is_free(port, host='127.0.0.1'):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+        return True
+
+
+def _read_lock_owner(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def allocate_port(base=DEBUG_PORT_BASE, count=DEBUG_PORT_COUNT):
+    """Reserve a free DevTools port for this process; release_port() when done"""
+    for port in range(base, base + count):
+        path = _port_lock(port)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            owner = _read_lock_owner(path)
+            if owner and _pid_alive(owner):
+                continue
+            # Left behind by a process that died; reclaim it
+            try:
+                os.unlink(path)
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except OSError:
+                continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        if port_is_free(port):
+            return port
+        # Something outside the scanner holds it; keep the reservation out of
+        # our way but don't hand it out
+        os.unlink(path)
+    raise NoFreePort(f"No free DevTools port in {base}-{base + count - 1}")
+
+
+def release_port(port):
+    path = _port_lock(port)
+    if _read_lock_owner(path) == os.getpid():
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def register(session_id, debug_port, profile_dir=None, **extra):
+    """Record a running session so other processes can attach to it"""
+    entry = {
+        'session_id': session_id,
+        'debug_port': debug_port,
+        'debugger_address': f'127.0.0.1:{debug_port}',
+        'profile_dir': profile_dir,
+        'server_pid': os.getpid(),
+        'registered': time.time(),
+    }
+    entry.update(extra)
+    path = _session_file(session_id)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp, path)
+    return entry
+
+
+def unregister(session_id):
+    path = _session_file(session_id)
+    try:
+        with open(path) as f:
+            owner = json.load(f).get('server_pid')
+    except (OSError, ValueError):
+        return
+    if owner == os.getpid():
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not _pid_alive(entry.get('server_pid', 0)):
+        # The scanner that registered it is gone
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        return None
+    return entry
+
+
+def lookup(session_id):
+    """Registry entry for a live session, or None"""
+    return _load(_session_file(session_id))
+
+
+def list_sessions():
+    directory = _registry_dir()
+    entries = []
+    for name in sorted(os.listdir(directory)):
+        if name.startswith('session-') and name.endswith('.json'):
+            entry = _load(os.path.join(directory, name))
+            if entry:
+                entries.append(entry)
+    return entries
+
+
+def session_from_args(argv=None):
+    """Session ID from --session <id> / --session=<id>, else SCANNER_SESSION"""
+    argv = sys.argv[1:] if argv is None else argv
+    for i, arg in enumerate(argv):
+        if arg == '--session' and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith('--session='):
+            return arg.split('=', 1)[1]
+    return os.environ.get('SCANNER_SESSION')
+
+
+def debugger_address(session_id=None):
+    """
+    host:port of the browser to attach to. A named session must be
+    registered. Without a name, the only registered session is used, or
+    the legacy 127.0.0.1:9222 when nothing is registered.
+    """
+    session_id = session_id if session_id is not None else session_from_args()
+    if session_id:
+        entry = lookup(session_id)
+        if entry is None:
+            known = ', '.join(e['session_id'] for e in list_sessions()) or 'none'
+            raise LookupError(f"No running scanner session '{session_id}' (running: {known})")
+        return entry['debugger_address']
+    sessions = list_sessions()
+    if len(sessions) == 1:
+        return sessions[0]['debugger_address']
+    if len(sessions) > 1:
+        known = ', '.join(e['session_id'] for e in sessions)
+        raise LookupError(f"Several scanner sessions are running ({known}); pass --session <id>")
+    return f'127.0.0.1:{LEGACY_DEBUG_PORT}'
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+State shared between a scan's threads and the Flask request threads
+The scan, capture and detection threads write the live view while request
+threads read it, and the HTTP handlers used to call the WebDriver directly,
+racing the scan thread (and stop_scan quit the driver in the middle of its
+commands). Two pieces replace that:
+
+- LiveView publishes the latest frame and element set as immutable
+  snapshots, swapped in with a single reference assignment. Readers take
+  the snapshot once and never lock, so they cannot hold up the loop or see
+  a frame paired with another frame's hash or sequence number.
+- DriverCommands is the queue HTTP handlers submit WebDriver work to. The
+  scan thread, which owns the driver, runs the commands between automation
+  steps and while its waits poll; the handler waits for the result with a
+  timeout.
+"""
+
+import concurrent.futures
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from frame_encoding import scale_elements
+from scanner_logging import get_logger
+
+log = get_logger('state')
+
+COMMAND_TIMEOUT = 15.0
+
+# data is the base64 payload; hash doubles as the HTTP ETag. width/height are
+# the encoded size and scale its pixels per page pixel (frame_encoding.py);
+# tiles, when not None, turn frame sequence - 1 into this one
+FrameSnapshot = namedtuple('FrameSnapshot', ['sequence', 'data', 'mime', 'hash', 'captured',
+                                             'width', 'height', 'scale', 'tiles'])
+# elements is a tuple of overlay dicts that nothing mutates after publishing
+ElementSnapshot = namedtuple('ElementSnapshot', ['version', 'elements', 'frame_sequence', 'detected'])
+
+NO_ELEMENTS = ElementSnapshot(0, (), 0, None)
+
+# What readers take: the frame and the element set as one reference
+Snapshot = namedtuple('Snapshot', ['frame', 'elements'])
+
+
+class LiveView:
+    """
+    Latest frame and element snapshots of one session. Publishers (the
+    capture and detection threads) are serialized by a lock; readers take
+    `current` without locking. An optional FrameBroadcaster is fed too, so
+    the streams and the polling endpoints show the same frames; it gets
+    the elements rescaled to the current frame's pixels.
+    """
+
+    def __init__(self, broadcaster=None):
+        self.broadcaster = broadcaster
+        self.lock = threading.Lock()
+        self.current = Snapshot(None, NO_ELEMENTS)
+
+    @property
+    def frame(self):
+        return self.current.frame
+
+    @property
+    def elements(self):
+        return self.current.elements
+
+    def snapshot(self):
+        """(frame, elements) as one consistent pair"""
+        return self.current
+
+    def publish_frame(self, frame):
+        """
+        Publish a capture_frame() result. Returns the new FrameSnapshot, or
+        None when its content matches the current frame (nothing published).
+        """
+        with self.lock:
+            current = self.current
+            if current.frame is not None and current.frame.hash == frame['hash']:
+                return None
+            snapshot = FrameSnapshot(current.frame.sequence + 1 if current.frame else 1,
+                                     frame['base64'], frame['mime'], frame['hash'], time.time(),
+                                     frame.get('width'), frame.get('height'), frame.get('scale', 1.0),
+                                     frame.get('tiles'))
+            self.current = current._replace(frame=snapshot)
+            rescaled = current.frame is not None and current.frame.scale != snapshot.scale
+        if self.broadcaster is not None:
+            self.broadcaster.publish_frame(frame)
+            if rescaled:
+                self.broadcaster.publish_elements(scale_elements(current.elements.elements, snapshot.scale))
+        return snapshot
+
+    def publish_elements(self, elements):
+        """Publish a detection pass; the caller must not modify `elements` afterwards"""
+        with self.lock:
+            current = self.current
+            snapshot = ElementSnapshot(current.elements.version + 1, tuple(elements),
+                                       current.frame.sequence if current.frame else 0, time.time())
+            self.current = current._replace(elements=snapshot)
+            scale = current.frame.scale if current.frame else 1.0
+        if self.broadcaster is not None:
+            self.broadcaster.publish_elements(scale_elements(elements, scale))
+        return snapshot
+
+    def clear(self):
+        with self.lock:
+            self.current = Snapshot(None, ElementSnapshot(self.current.elements.version + 1, (), 0, None))
+        if self.broadcaster is not None:
+            self.broadcaster.reset()
+
+
+class CommandsClosed(Exception):
+    """The session is stopping (or not running) and takes no driver commands"""
+
+
+class DriverCommands:
+    """
+    WebDriver work from other threads, run by the thread that owns the
+    driver. submit() blocks the caller until the command ran or timed out;
+    a command that timed out before it started is dropped, not run late.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = True
+        self.executed = 0
+        self.timeouts = 0
+
+    def open(self):
+        with self.lock:
+            self.closed = False
+
+    def submit(self, command, timeout=COMMAND_TIMEOUT, label=None):
+        """Run command(driver) on the owning thread and return its result"""
+        future = concurrent.futures.Future()
+        with self.lock:
+            if self.closed:
+                raise CommandsClosed('Scanner not running')
+            self.queue.put((command, future, label or getattr(command, '__name__', 'command')))
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            if future.cancel():
+                with self.lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"Scanner busy: {label or 'command'} not started within {timeout}s")
+            # Already running; it finishes shortly
+            return future.result()
+
+    def serve(self, driver, timeout=0):
+        """
+        Run queued commands against driver for up to `timeout` seconds (just
+        the ones already queued when 0). Returns how many ran.
+        """
+        deadline = time.perf_counter() + timeout
+        ran = 0
+        while True:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self.queue.get(timeout=remaining)
+                else:
+                    item = self.queue.get_nowait()
+            except queue.Empty:
+                return ran
+            command, future, label = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                future.set_result(command(driver))
+            except Exception as e:
+                future.set_exception(e)
+            log.debug("Ran %s for a request thread in %.1fms", label, (time.perf_counter() - started) * 1000)
+            ran += 1
+            with self.lock:
+                self.executed += 1
+
+    def close(self):
+        """Refuse new commands and fail the queued ones"""
+        with self.lock:
+            self.closed = True
+            pending = []
+            while True:
+                try:
+                    pending.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+        for item in pending:
+            if item[1].set_running_or_notify_cancel():
+                item[1].set_exception(CommandsClosed('Scanner stopped'))
+
+    def summary(self):
+        with self.lock:
+            return {'open': not self.closed, 'queued': self.queue.qsize(),
+                    'executed': self.executed, 'timeouts': self.timeouts}
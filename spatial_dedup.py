@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Grid-backed duplicate filter for detected elements
+Replaces the linear scan in add_unique_element: every accepted box is bucketed
+into fixed-size grid cells, so an overlap/containment query only looks at the
+handful of boxes sharing a cell with the new one instead of every box found
+so far this frame.
+"""
+
+import math
+
+# Boxes larger than this are rejected before indexing, so a box never spans
+# more than a few cells at the default cell size
+MAX_WIDTH = 800
+MAX_HEIGHT = 400
+MIN_WIDTH = 15
+MIN_HEIGHT = 8
+
+# If more than 70% of the new box is covered by an existing one, it's a duplicate
+OVERLAP_THRESHOLD = 0.7
+
+DEFAULT_CELL_SIZE = 128
+
+
+def is_element_overlapping(new_elem, existing_elem):
+    """Check if two elements overlap significantly"""
+    # Calculate the overlap area
+    x_overlap = max(0, min(new_elem['x'] + new_elem['width'], existing_elem['x'] + existing_elem['width']) -
+                   max(new_elem['x'], existing_elem['x']))
+    y_overlap = max(0, min(new_elem['y'] + new_elem['height'], existing_elem['y'] + existing_elem['height']) -
+                   max(new_elem['y'], existing_elem['y']))
+
+    overlap_area = x_overlap * y_overlap
+    new_area = new_elem['width'] * new_elem['height']
+
+    return overlap_area > (new_area * OVERLAP_THRESHOLD)
+
+
+def is_element_contained(child, parent):
+    """Check if child element is fully contained within parent"""
+    return (child['x'] >= parent['x'] and
+            child['y'] >= parent['y'] and
+            child['x'] + child['width'] <= parent['x'] + parent['width'] and
+            child['y'] + child['height'] <= parent['y'] + parent['height'])
+
+
+def is_duplicate_of(new_elem, existing):
+    """The three rejection rules add_unique_element has always applied"""
+    # Skip if this element significantly overlaps with existing
+    if is_element_overlapping(new_elem, existing):
+        return True
+    # Skip if this element is contained within existing
+    if is_element_contained(new_elem, existing):
+        return True
+    # Skip if existing element is contained within this one
+    # (keep the smaller, more specific element)
+    return is_element_contained(existing, new_elem)
+
+
+class UniqueElementSet:
+    """
+    Accepts element boxes that are not duplicates of boxes already accepted.
+    Any box that can reject a new one must intersect it (all accepted boxes
+    have positive area), so only boxes in the cells the new box covers are
+    checked. Accepted boxes are appended to `elements`, which may be a list
+    the caller already owns.
+    """
+
+    def __init__(self, elements=None, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.elements = elements if elements is not None else []
+        self.cells = {}
+        self.comparisons = 0
+        # Seed with boxes the caller added directly (e.g. login fields)
+        for idx, elem in enumerate(self.elements):
+            self._index(idx, elem)
+
+    def _cell_range(self, elem):
+        size = self.cell_size
+        x0 = math.floor(elem['x'] / size)
+        y0 = math.floor(elem['y'] / size)
+        x1 = math.floor((elem['x'] + elem['width']) / size)
+        y1 = math.floor((elem['y'] + elem['height']) / size)
+        return x0, y0, x1, y1
+
+    def _index(self, idx, elem):
+        x0, y0, x1, y1 = self._cell_range(elem)
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = [idx]
+                else:
+                    bucket.append(idx)
+
+    def is_duplicate(self, elem_data):
+        """True if any accepted box overlaps, contains or is contained by elem_data"""
+        x0, y0, x1, y1 = self._cell_range(elem_data)
+        cells = self.cells
+        elements = self.elements
+        seen = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for idx in bucket:
+                    if idx in seen:
+                        continue
+                    seen.add(idx)
+                    self.comparisons += 1
+                    if is_duplicate_of(elem_data, elements[idx]):
+                        return True
+        return False
+
+    def add(self, elem_data):
+        """Add element only if it's not duplicate/overlapping/contained"""
+        # Skip elements that are too large (likely containers/backgrounds)
+        if elem_data['width'] > MAX_WIDTH or elem_data['height'] > MAX_HEIGHT:
+            return False
+
+        # Skip elements that are too small
+        if elem_data['width'] < MIN_WIDTH or elem_data['height'] < MIN_HEIGHT:
+            return False
+
+        if self.is_duplicate(elem_data):
+            return False
+
+        self._index(len(self.elements), elem_data)
+        self.elements.append(elem_data)
+        return True
+
+    def __len__(self):
+        return len(self.elements)
+
+
+def add_unique_element_linear(elements_found, elem_data):
+    """Reference O(n) implementation, kept for benchmarks and comparisons"""
+    if elem_data['width'] > MAX_WIDTH or elem_data['height'] > MAX_HEIGHT:
+        return False
+    if elem_data['width'] < MIN_WIDTH or elem_data['height'] < MIN_HEIGHT:
+        return False
+    for existing in elements_found:
+        if is_duplicate_of(elem_data, existing):
+            return False
+    elements_found.append(elem_data)
+    return True
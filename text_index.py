@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Shared in-page text index for product label lookups
+The Commercial Auto sweeps used to walk document.querySelectorAll('*') and
+read textContent on every node, which recomputes the same text for every
+ancestor and is quadratic in DOM depth. This index walks text nodes once with a
+TreeWalker, groups them by their parent element, and is rebuilt only when the
+DOM version from dom_watch.py moves. Lookups resolve a label such as
+"Commercial Auto/Trucking" to its nearest clickable ancestor in one pass.
+
+Scripts that need it are wrapped with with_text_index(), which installs the
+index (and the DOM watcher it keys on) and exposes window.__scannerTextIndex.
+"""
+
+from dom_watch import DOM_WATCH_INSTALL
+
+# Labels every Commercial Auto lookup searches for, most specific first
+COMMERCIAL_AUTO_LABELS = [
+    'Commercial Auto/Trucking',
+    'Commercial Auto / Trucking',
+    'Commercial Auto'
+]
+
+TEXT_INDEX_INSTALL = DOM_WATCH_INSTALL + r"""
+if (!window.__scannerTextIndex) {
+    (function() {
+        var index = window.__scannerTextIndex = {
+            documentId: null,
+            version: -1,
+            entries: [],
+            stats: {builds: 0, lastBuildMs: 0, entries: 0, lookups: 0, lastLookupMs: 0, totalLookupMs: 0}
+        };
+
+        var SKIP_TAGS = {SCRIPT: true, STYLE: true, NOSCRIPT: true, TEMPLATE: true};
+
+        index.normalize = function(text) {
+            return (text || '').replace(/\s+/g, ' ').trim().toLowerCase();
+        };
+
+        index.build = function() {
+            var started = performance.now();
+            var owners = new Map();
+            var entries = [];
+            var root = document.body || document.documentElement;
+            if (root) {
+                var walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT, {
+                    acceptNode: function(node) {
+                        var parent = node.parentElement;
+                        if (!parent || SKIP_TAGS[parent.tagName] || !node.nodeValue.trim()) {
+                            return NodeFilter.FILTER_REJECT;
+                        }
+                        return NodeFilter.FILTER_ACCEPT;
+                    }
+                });
+                var node;
+                while ((node = walker.nextNode())) {
+                    var owner = node.parentElement;
+                    var entry = owners.get(owner);
+                    if (!entry) {
+                        entry = {element: owner, raw: ''};
+                        owners.set(owner, entry);
+                        entries.push(entry);
+                    }
+                    entry.raw += ' ' + node.nodeValue;
+                }
+            }
+            for (var i = 0; i < entries.length; i++) {
+                entries[i].text = index.normalize(entries[i].raw);
+            }
+            index.entries = entries;
+            index.documentId = window.__scannerDomState.documentId;
+            index.version = window.__scannerDomState.version;
+            index.stats.builds += 1;
+            index.stats.entries = entries.length;
+            index.stats.lastBuildMs = performance.now() - started;
+        };
+
+        index.ensure = function() {
+            var dom = window.__scannerDomState;
+            if (index.documentId !== dom.documentId || index.version !== dom.version) {
+                index.build();
+                return true;
+            }
+            return false;
+        };
+
+        index.isClickable = function(el) {
+            var tag = el.tagName;
+            if (tag === 'A' || tag === 'BUTTON' || tag === 'LABEL') return true;
+            var role = el.getAttribute('role');
+            if (role === 'tab' || role === 'button' || role === 'link') return true;
+            return !!(el.onclick || el.getAttribute('onclick'));
+        };
+
+        index.nearestClickable = function(el) {
+            for (var current = el; current && current.tagName !== 'BODY'; current = current.parentElement) {
+                if (index.isClickable(current)) return current;
+            }
+            return null;
+        };
+
+        index.resolve = function(el, maxArea) {
+            if (!el.getClientRects().length) return null;
+            var clickable = index.nearestClickable(el) || el;
+            var rect = clickable.getBoundingClientRect();
+            if (rect.width * rect.height > maxArea) {
+                // Clickable ancestor is a whole container - use the label itself
+                clickable = el;
+                rect = el.getBoundingClientRect();
+                if (rect.width * rect.height > maxArea) return null;
+            }
+            return {element: el, clickable: clickable, rect: rect};
+        };
+
+        // Returns every hit in document order; with priority=true, all hits
+        // for the first phrase come before hits for the second, and so on
+        index.findAll = function(phrases, options) {
+            options = options || {};
+            var maxArea = options.maxArea || 100000;
+            var maxLength = options.maxTextLength || 0;
+            var limit = options.limit || 0;
+            var rebuilt = index.ensure();
+            var started = performance.now();
+            var wanted = phrases.map(index.normalize);
+            var groups = options.priority ? wanted.map(function(p) { return [p]; }) : [wanted];
+            var hits = [];
+            var seen = new Set();
+
+            function consider(el, text, phrase) {
+                if (seen.has(el)) return;
+                var hit = index.resolve(el, maxArea);
+                if (!hit) return;
+                seen.add(el);
+                hit.text = text;
+                hit.phrase = phrase;
+                hits.push(hit);
+            }
+
+            for (var g = 0; g < groups.length && !(limit && hits.length >= limit); g++) {
+                var group = groups[g];
+                for (var i = 0; i < index.entries.length && !(limit && hits.length >= limit); i++) {
+                    var entry = index.entries[i];
+                    if (maxLength && entry.text.length >= maxLength) continue;
+                    for (var p = 0; p < group.length; p++) {
+                        if (entry.text.indexOf(group[p]) !== -1) {
+                            consider(entry.element, entry.text, group[p]);
+                            break;
+                        }
+                    }
+                }
+                if (!hits.length) {
+                    // Label split across child elements (e.g. <span>Commercial Auto</span>/
+                    // <span>Trucking</span>): check a few ancestors of entries holding the
+                    // first word, reading textContent only for those
+                    for (var i = 0; i < index.entries.length && !(limit && hits.length >= limit); i++) {
+                        var entry = index.entries[i];
+                        for (var p = 0; p < group.length; p++) {
+                            var firstWord = group[p].split(' ')[0].split('/')[0];
+                            if (entry.text.indexOf(firstWord) === -1) continue;
+                            var ancestor = entry.element.parentElement;
+                            for (var level = 0; level < 3 && ancestor && ancestor.tagName !== 'BODY'; level++) {
+                                var text = index.normalize(ancestor.textContent);
+                                if ((!maxLength || text.length < maxLength) && text.indexOf(group[p]) !== -1) {
+                                    consider(ancestor, text, group[p]);
+                                    break;
+                                }
+                                ancestor = ancestor.parentElement;
+                            }
+                        }
+                    }
+                }
+            }
+
+            var lookupMs = performance.now() - started;
+            index.stats.lookups += 1;
+            index.stats.lastLookupMs = lookupMs;
+            index.stats.totalLookupMs += lookupMs;
+            index.lastTimings = {rebuilt: rebuilt, buildMs: rebuilt ? index.stats.lastBuildMs : 0, lookupMs: lookupMs};
+            return hits;
+        };
+
+        index.find = function(phrases, options) {
+            options = Object.assign({}, options || {}, {limit: 1});
+            var hits = index.findAll(phrases, options);
+            return hits.length ? hits[0] : null;
+        };
+
+        index.timings = function() {
+            return Object.assign({version: index.version, entries: index.entries.length},
+                                 index.stats, index.lastTimings || {});
+        };
+    })();
+}
+"""
+
+# arguments[0] = phrases, arguments[1] = options (maxArea null for no limit);
+# returns the clickable element
+FIND_LABEL_SCRIPT = TEXT_INDEX_INSTALL + r"""
+var options = arguments[1] || {};
+if (options.maxArea === null) options.maxArea = Number.MAX_VALUE;
+var hit = window.__scannerTextIndex.find(arguments[0], options);
+var timings = window.__scannerTextIndex.timings();
+if (!hit) return {found: false, timings: timings};
+return {
+    found: true,
+    element: hit.clickable,
+    label: hit.element,
+    text: hit.text,
+    phrase: hit.phrase,
+    tag: hit.clickable.tagName,
+    timings: timings
+};
+"""
+
+
+def with_text_index(script):
+    """Prefix an injected script so it can use window.__scannerTextIndex"""
+    return TEXT_INDEX_INSTALL + script
+
+
+def find_label(driver, phrases, priority=False, max_area=100000, max_text_length=0):
+    """
+    Resolve the first visible label matching any of `phrases` to its nearest
+    clickable ancestor (max_area=None accepts any size). Returns a dict with
+    found, element (a WebElement), text, tag and the index timings.
+    """
+    options = {'priority': priority, 'maxArea': max_area, 'maxTextLength': max_text_length}
+    return driver.execute_script(FIND_LABEL_SCRIPT, list(phrases), options)
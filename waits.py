@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Condition-based waits for the Geico quote flow
+The login, Commercial Auto and zip/USDOT steps used to sleep a fixed 0.3-5s
+after every click, which is usually too long and sometimes too short. A
+Waiter instead returns as soon as a concrete condition holds:
+
+- navigation_committed: a new document replaced the one marked before the
+  click (or the URL changed, for in-page routing) and it is past 'loading'
+- network_idle: the document is complete, no fetch/XHR is in flight and no
+  resource finished within the idle window
+- element_visible: a locator matches a displayed element
+- value_settled: an input's value stopped changing (optionally to an
+  expected value)
+- dom_settled: the MutationObserver from dom_watch.py saw no change for a
+  quiet window
+- page_settled: network idle and DOM quiet together, for clicks that may or
+  may not navigate
+- field_value: a displayed field's value (or selected option) satisfies a
+  predicate
+
+With the DevTools backend, navigation_committed reads the page events the
+CDP connection already receives (cdp_client.CDPDriver.page_state) instead of
+polling the page, and network_idle/page_settled skip their probe while a
+document is still loading.
+
+A wait that times out logs what it last saw (URL, ready state, in-flight
+requests, the value it was watching, ...) and, when strict, raises
+WaitTimeout with the same diagnostics. Every wait is recorded in a
+WaitReport, which /get-status serves per session, and in the scan_metrics
+histograms as wait_<kind>.
+"""
+
+import threading
+import time
+
+from selenium.webdriver.common.by import By
+
+from dom_watch import DOM_WATCH_INSTALL
+from scanner_logging import get_logger
+
+log = get_logger('waits')
+
+POLL_INTERVAL = 0.05
+NETWORK_IDLE_MS = 500
+DOM_QUIET_MS = 300
+VALUE_STABLE_MS = 250
+
+# Counts in-flight fetch/XHR requests for network_idle; installed once per
+# document, so requests started before the first wait on a page are only
+# seen through the resource timing entries
+NETWORK_WATCH_SCRIPT = """
+if (!window.__scannerNet) {
+    var net = window.__scannerNet = {inflight: 0, last: performance.now()};
+    var done = function() { net.inflight = Math.max(0, net.inflight - 1); net.last = performance.now(); };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function() {
+            net.inflight++;
+            return originalFetch.apply(this, arguments).then(
+                function(response) { done(); return response; },
+                function(error) { done(); throw error; });
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        net.inflight++;
+        this.addEventListener('loadend', done);
+        return originalSend.apply(this, arguments);
+    };
+}
+var lastResource = 0;
+var entries = performance.getEntriesByType('resource');
+for (var i = 0; i < entries.length; i++) {
+    lastResource = Math.max(lastResource, entries[i].responseEnd);
+}
+var now = performance.now();
+return {
+    readyState: document.readyState,
+    inflight: window.__scannerNet.inflight,
+    quietMs: now - Math.max(lastResource, window.__scannerNet.last),
+    resources: entries.length,
+    url: window.location.href
+};
+"""
+
+MARK_DOCUMENT_SCRIPT = """
+window.__scannerNavToken = arguments[0];
+return window.location.href;
+"""
+
+NAVIGATION_STATE_SCRIPT = """
+return {
+    token: window.__scannerNavToken || null,
+    readyState: document.readyState,
+    url: window.location.href
+};
+"""
+
+DOM_QUIET_SCRIPT = DOM_WATCH_INSTALL + """
+return {idleMs: Date.now() - state.lastChange, version: state.version, url: window.location.href};
+"""
+
+VALUE_SCRIPT = "return arguments[0].value;"
+
+# NETWORK_WATCH_SCRIPT's body, minus its return, plus the DOM quiet window
+PAGE_SETTLED_SCRIPT = DOM_WATCH_INSTALL + NETWORK_WATCH_SCRIPT.replace(
+    "return {", "var result = {", 1) + """
+result.domIdleMs = Date.now() - state.lastChange;
+return result;
+"""
+
+# Value and selected option text of every displayed element an XPath matches
+FIELD_VALUES_SCRIPT = """
+var found = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var fields = [];
+for (var i = 0; i < found.snapshotLength; i++) {
+    var el = found.snapshotItem(i);
+    if (!el.offsetWidth && !el.offsetHeight && !el.getClientRects().length) continue;
+    var text = el.tagName === 'SELECT' && el.selectedIndex >= 0 ? el.options[el.selectedIndex].text : '';
+    fields.push({value: el.value || '', text: text});
+}
+return fields;
+"""
+
+
+class WaitTimeout(Exception):
+    """A wait's condition did not hold in time; .diagnostics has what it last saw"""
+
+    def __init__(self, description, elapsed, diagnostics):
+        super().__init__(f"Timed out after {elapsed:.2f}s waiting for {description}: {diagnostics}")
+        self.description = description
+        self.elapsed = elapsed
+        self.diagnostics = diagnostics
+
+
+class WaitReport:
+    """Time spent waiting during one quote, per wait kind and label"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.waits = {}  # (kind, label) -> {'count', 'seconds', 'max', 'timeouts'}
+        self.total = 0.0
+
+    def record(self, kind, label, seconds, met):
+        with self.lock:
+            entry = self.waits.setdefault((kind, label), {'count': 0, 'seconds': 0.0, 'max': 0.0, 'timeouts': 0})
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            if not met:
+                entry['timeouts'] += 1
+            self.total += seconds
+
+    def summary(self):
+        with self.lock:
+            elapsed = time.time() - self.started
+            waits = sorted(self.waits.items(), key=lambda item: -item[1]['seconds'])
+            return {
+                'elapsed_s': round(elapsed, 2),
+                'waiting_s': round(self.total, 2),
+                'waiting_share': round(self.total / elapsed, 3) if elapsed else 0,
+                'waits': [{
+                    'kind': kind,
+                    'label': label,
+                    'count': entry['count'],
+                    'total_s': round(entry['seconds'], 3),
+                    'max_s': round(entry['max'], 3),
+                    'timeouts': entry['timeouts'],
+                } for (kind, label), entry in waits],
+            }
+
+
+class Waiter:
+    """
+    Waits against one driver. report (a WaitReport) and metrics (a
+    ScanMetrics) are optional sinks for the time spent; cancelled() -> True
+    (e.g. the session was stopped) ends any wait early as a timeout. With
+    commands (the session's DriverCommands), the time between polls runs
+    the driver commands request handlers queued instead of sleeping. events
+    (a CDPDriver) supplies the page events the navigation and settle waits
+    check before spending a round trip.
+    """
+
+    def __init__(self, driver, report=None, metrics=None, poll=POLL_INTERVAL, cancelled=None,
+                 commands=None, events=None):
+        self.driver = driver
+        self.report = report
+        self.metrics = metrics
+        self.poll = poll
+        self.cancelled = cancelled
+        self.commands = commands
+        self.events = events
+        self.marked_url = None
+        self.marked_events = None
+        self.tokens = 0
+
+    def _record(self, kind, label, seconds, met):
+        if self.report is not None:
+            self.report.record(kind, label, seconds, met)
+        if self.metrics is not None:
+            self.metrics.observe(f'wait_{kind}', seconds)
+
+    def _page_events(self):
+        # None without the DevTools backend, or once its connection is gone
+        return self.events.page_state() if self.events is not None else None
+
+    def _idle(self, seconds):
+        if self.commands is not None:
+            self.commands.serve(self.driver, seconds)
+        else:
+            time.sleep(seconds)
+
+    def until(self, probe, timeout, description, kind='condition', label=None, strict=False):
+        """
+        Poll probe() -> (done, value, diagnostics) until done or timeout.
+        Returns value when the condition held, None on timeout (or raises
+        WaitTimeout when strict). Exceptions from probe count as not done.
+        """
+        label = label or description
+        started = time.perf_counter()
+        deadline = started + timeout
+        diagnostics = None
+        cancelled = False
+        while True:
+            try:
+                done, value, diagnostics = probe()
+            except Exception as e:
+                done, value, diagnostics = False, None, {'error': str(e)[:200]}
+            if done:
+                self._record(kind, label, time.perf_counter() - started, True)
+                return value
+            if time.perf_counter() >= deadline:
+                break
+            if self.cancelled is not None and self.cancelled():
+                cancelled = True
+                break
+            self._idle(self.poll)
+        elapsed = time.perf_counter() - started
+        self._record(kind, label, elapsed, False)
+        if strict:
+            raise WaitTimeout(description, elapsed, diagnostics)
+        if not cancelled:
+            log.warning("Timed out after %.2fs waiting for %s: %s", elapsed, description, diagnostics)
+        return None
+
+    def pause(self, seconds, label='pause'):
+        """A deliberate fixed delay (e.g. letting a highlight show), still reported"""
+        self._idle(seconds)
+        self._record('pause', label, seconds, True)
+
+    def mark_document(self):
+        """Tag the current document; call before the action that navigates"""
+        self.tokens += 1
+        token = f'{id(self)}-{self.tokens}'
+        self.marked_url = self.driver.execute_script(MARK_DOCUMENT_SCRIPT, token)
+        self.marked_events = self._page_events()
+        return token
+
+    def navigation_committed(self, timeout=10, label='navigation', url_change=True, strict=False):
+        """
+        After mark_document(): wait for a new document (the token is gone)
+        or, with url_change, for the URL to change within the same document
+        """
+        marked_url = self.marked_url
+        marked_events = self.marked_events
+
+        def probe():
+            events = self._page_events() if marked_events is not None else None
+            if events is not None:
+                # Page.frameNavigated/navigatedWithinDocument/loadEventFired
+                # already told us, no round trip needed
+                new_document = events['navigations'] > marked_events['navigations']
+                moved = url_change and events['url'] != marked_events['url']
+                return (new_document or moved) and not events['loading'], events['url'], events
+            state = self.driver.execute_script(NAVIGATION_STATE_SCRIPT)
+            new_document = state['token'] is None
+            moved = url_change and marked_url is not None and state['url'] != marked_url
+            done = (new_document or moved) and state['readyState'] != 'loading'
+            state['marked_url'] = marked_url
+            return done, state['url'], state
+
+        return self.until(probe, timeout, f'navigation from {marked_url}', 'navigation', label, strict)
+
+    def _still_loading(self, idle_ms):
+        """Page events showing the page is not idle yet, else None"""
+        events = self._page_events()
+        if events is not None and (events['loading'] or events['idle_ms'] < idle_ms):
+            return events
+        return None
+
+    def network_idle(self, timeout=10, idle_ms=NETWORK_IDLE_MS, label='network idle', strict=False):
+        def probe():
+            events = self._still_loading(idle_ms)
+            if events is not None:
+                return False, None, events
+            state = self.driver.execute_script(NETWORK_WATCH_SCRIPT)
+            done = (state['readyState'] == 'complete' and state['inflight'] == 0
+                    and state['quietMs'] >= idle_ms)
+            return done, state, state
+
+        return self.until(probe, timeout, f'network idle ({idle_ms}ms)', 'network_idle', label, strict)
+
+    def dom_settled(self, timeout=5, quiet_ms=DOM_QUIET_MS, label='dom settled', strict=False):
+        def probe():
+            state = self.driver.execute_script(DOM_QUIET_SCRIPT)
+            return state['idleMs'] >= quiet_ms, state, state
+
+        return self.until(probe, timeout, f'DOM quiet ({quiet_ms}ms)', 'dom_settled', label, strict)
+
+    def page_settled(self, timeout=10, idle_ms=NETWORK_IDLE_MS, quiet_ms=DOM_QUIET_MS,
+                     label='page settled', strict=False):
+        """Network idle and DOM quiet in one probe per poll"""
+        def probe():
+            events = self._still_loading(idle_ms)
+            if events is not None:
+                return False, None, events
+            state = self.driver.execute_script(PAGE_SETTLED_SCRIPT)
+            done = (state['readyState'] == 'complete' and state['inflight'] == 0
+                    and state['quietMs'] >= idle_ms and state['domIdleMs'] >= quiet_ms)
+            return done, state, state
+
+        return self.until(probe, timeout, 'page to settle', 'page_settled', label, strict)
+
+    def element_visible(self, locator, timeout=10, label=None, strict=False):
+        """
+        First displayed element for a (By, value) locator, or an XPath
+        string. Returns the WebElement, or None on timeout.
+        """
+        by, value = locator if isinstance(locator, tuple) else (By.XPATH, locator)
+
+        def probe():
+            elements = self.driver.find_elements(by, value)
+            for element in elements:
+                if element.is_displayed():
+                    return True, element, None
+            return False, None, {'matches': len(elements), 'displayed': 0, 'url': self.driver.current_url}
+
+        return self.until(probe, timeout, f'visible {value}', 'element_visible', label, strict)
+
+    def field_value(self, xpath, predicate, timeout=5, label='field value', strict=False):
+        """
+        Wait for a displayed field matching xpath whose value or selected
+        option text satisfies predicate(text). Returns that text.
+        """
+        def probe():
+            fields = self.driver.execute_script(FIELD_VALUES_SCRIPT, xpath)
+            for field in fields:
+                for text in (field['value'], field['text']):
+                    if text and predicate(text):
+                        return True, text, fields
+            return False, None, {'fields': fields[:5]}
+
+        return self.until(probe, timeout, label, 'field_value', label, strict)
+
+    def value_settled(self, element, expected=None, timeout=3, stable_ms=VALUE_STABLE_MS,
+                      label='field value', strict=False):
+        """
+        Wait until element's value has not changed for stable_ms (and equals
+        expected, if given). Returns the settled value.
+        """
+        history = {'value': None, 'since': None}
+
+        def probe():
+            value = self.driver.execute_script(VALUE_SCRIPT, element)
+            now = time.perf_counter()
+            if value != history['value'] or history['since'] is None:
+                history['value'], history['since'] = value, now
+            stable = (now - history['since']) * 1000 >= stable_ms
+            matches = expected is None or value == expected
+            return stable and matches, value, {'value': value, 'expected': expected,
+                                               'stable_ms': round((now - history['since']) * 1000)}
+
+        return self.until(probe, timeout, f'{label} to settle', 'value_settled', label, strict)